@@ -0,0 +1,309 @@
+"""
+qap_ts.py: Tabu search for the quadratic assignment problem (QAP).
+
+A solution is a permutation 'pi': facility i is placed at location pi[i],
+and its cost is sum_{i,j} f[i,j] * d[pi[i],pi[j]].  The neighborhood is
+the set of swaps of the locations of two facilities.
+
+The search keeps the matrix 'delta' of the cost differences for every
+swap (i,j).  It is computed once in O(n^3) with matrix products, and then
+updated in O(n^2) numpy operations after each move, as in Taillard's
+robust tabu search (Parallel Computing 17, 1991).  Flow and distance
+matrices need not be symmetric.
+
+This file contains a set of functions to illustrate:
+  - construction
+  - tabu search with a numpy-based swap-gain matrix
+  - robust tabu search (random tenure, aspiration, long-term memory)
+
+Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
+"""
+import random
+import numpy as np
+
+Infinity = float('inf')
+LOG = False     # whether or not to print intermediate solutions
+
+
+def mk_rnd_data(n, scale=10):
+    """Make a random, symmetric instance with 'n' facilities/locations."""
+    f = np.zeros((n, n), dtype=np.int64)
+    d = np.zeros((n, n), dtype=np.int64)
+    for i in range(n-1):
+        for j in range(i+1, n):
+            f[i,j] = f[j,i] = int(random.random() * scale)
+            d[i,j] = d[j,i] = int(random.random() * scale)
+    return n, f, d
+
+
+def as_matrix(n, a):
+    """Convert a matrix given as a dictionary {(i,j): value} into an array."""
+    if isinstance(a, dict):
+        m = np.zeros((n, n), dtype=np.int64)
+        for (i, j), v in a.items():
+            m[i,j] = v
+        return m
+    return np.ascontiguousarray(a, dtype=np.int64)
+
+
+def evaluate__(n, f, d, pi):
+    """Cost of permutation 'pi', computed directly (for checking)."""
+    pi = np.asarray(pi)
+    return int((f * d[np.ix_(pi, pi)]).sum())
+
+
+def swap_gains(f, dp, rows):
+    """Cost differences of swapping facility r (for each r in 'rows') with every s.
+
+    'dp' is the distance matrix permuted by the current solution,
+    dp[i,j] = d[pi[i],pi[j]].  Returns a len(rows) x n array.
+    The cost for all rows is O(n^3); for a constant number of rows, O(n^2).
+    """
+    r = np.asarray(rows)
+    fr, fc = f[r,:], f[:,r].T               # f[r,k], f[k,r]
+    dr, dc = dp[r,:], dp[:,r].T             # dp[r,k], dp[k,r]
+    fd = np.einsum('ik,ik->i', f, dp)       # sum_k f[s,k] dp[s,k]
+    fdt = np.einsum('ki,ki->i', f, dp)      # sum_k f[k,s] dp[k,s]
+    frr, drr = np.diagonal(f)[r,None], np.diagonal(dp)[r,None]
+    fss, dss = np.diagonal(f)[None,:], np.diagonal(dp)[None,:]
+    frs, fsr = fr, fc                       # f[r,s], f[s,r]
+    drs, dsr = dr, dc                       # dp[r,s], dp[s,r]
+
+    # sum over all k of (f[k,r]-f[k,s])*(dp[k,s]-dp[k,r]) + (f[r,k]-f[s,k])*(dp[s,k]-dp[r,k])
+    g = fc @ dp - fdt[r,None] - fdt[None,:] + dc @ f \
+        + fr @ dp.T - fd[r,None] - fd[None,:] + dr @ f.T
+    # remove terms k = r and k = s, and add those for the swapped pair
+    g -= (frr - frs) * (drs - drr) + (fsr - fss) * (dss - dsr)     # first sum, k = r,s
+    g -= (frr - fsr) * (dsr - drr) + (frs - fss) * (dss - drs)     # second sum, k = r,s
+    g += (frr - fss) * (dss - drr) + (frs - fsr) * (dsr - drs)
+    g[np.arange(len(r)), r] = 0
+    return g
+
+
+def evaluate(n, f, d, pi):
+    """Evaluate solution 'pi'.
+
+    Returns its cost, and the n x n matrix 'delta', where delta[i,j] is the
+    cost difference obtained by swapping the locations of i and j.
+    """
+    pi = np.asarray(pi)
+    dp = d[np.ix_(pi, pi)]
+    cost = int((f * dp).sum())
+    delta = swap_gains(f, dp, np.arange(n))
+    return cost, delta
+
+
+def construct(n, f, d):
+    """Random permutation."""
+    pi = list(range(n))
+    random.shuffle(pi)
+    return pi
+
+
+def find_move(n, f, d, pi, delta, tabu, iteration):
+    """Find the best non-tabu swap.
+
+    Swapping i and j is tabu if it places either of them on a location
+    it left less than 'tabulen' iterations ago, i.e., if
+    tabu[i,pi[j]] > iteration or tabu[j,pi[i]] > iteration.
+    If all moves are tabu, the tabu list is cleared.
+
+    Returns the two facilities to swap and the cost difference,
+    or None if there is no move (n < 2).
+    """
+    if n < 2:
+        return None
+    tp = tabu[:, pi] > iteration                # tp[i,j]: i cannot go to pi[j]
+    forbidden = tp | tp.T
+    forbidden[np.tril_indices(n)] = True        # consider each pair i < j only once
+    if forbidden.all():
+        if LOG: print("blocked, no non-tabu move")
+        tabu[:,:] = 0
+        forbidden[np.triu_indices(n, 1)] = False
+    gains = np.where(forbidden, np.iinfo(np.int64).max, delta)
+    istar, jstar = divmod(int(gains.argmin()), n)
+    return istar, jstar, int(gains[istar, jstar])
+
+
+def swap(f, d, pi, dp, delta, istar, jstar):
+    """Swap the locations of 'istar' and 'jstar', updating 'dp' and 'delta'.
+
+    For pairs (u,v) disjoint from {istar, jstar} delta is updated in O(1)
+    each, with Taillard's formula; the rows and columns of istar and jstar
+    are recomputed.  Overall O(n^2), all in numpy array operations.
+    """
+    r, s = istar, jstar
+    pi[r], pi[s] = pi[s], pi[r]
+    dp[[r, s],:] = dp[[s, r],:]
+    dp[:,[r, s]] = dp[:,[s, r]]
+
+    x = f[r,:] - f[s,:]         # f[r,u] - f[s,u]
+    y = dp[s,:] - dp[r,:]       # dp'[s,u] - dp'[r,u]
+    xt = f[:,r] - f[:,s]        # f[u,r] - f[u,s]
+    yt = dp[:,s] - dp[:,r]      # dp'[u,s] - dp'[u,r]
+    delta += np.subtract.outer(x, x) * np.subtract.outer(y, y)
+    delta += np.subtract.outer(xt, xt) * np.subtract.outer(yt, yt)
+
+    rows = swap_gains(f, dp, [r, s])
+    delta[[r, s],:] = rows
+    delta[:,[r, s]] = rows.T
+
+
+def tabu_search(n, f, d, max_iter, length, report=None):
+    """ Perform tabu search for QAP.
+
+    Parameters
+    ----------
+    n : int
+        Size of the problem
+    f : numpy.ndarray or dict
+        Flow matrix
+    d : numpy.ndarray or dict
+        Distance matrix
+    max_iter : int
+        Upper limit for the number of iterations in tabu search
+    length : int
+        Length of tabu list
+    report : Callback, optional
+        Callback function (e.g. print) for displaying intermediate results, by default None
+
+    Returns
+    -------
+    bestsol, bestcost
+        Tuple of best solution and best cost
+    """
+    f, d = as_matrix(n, f), as_matrix(n, d)
+    tabulen = length
+    tabu = np.zeros((n, n), dtype=np.int64)    # tabu[i,k]: iteration up to which i cannot go to k
+    pi = np.array(construct(n, f, d))
+    dp = d[np.ix_(pi, pi)]
+    cost, delta = evaluate(n, f, d, pi)
+    bestcost, bestsol = cost, pi.tolist()
+
+    if LOG: print("iteration", 0, "\tcost =", cost, ", best =", bestcost)
+    it = 0
+    for it in range(max_iter):
+        move = find_move(n, f, d, pi, delta, tabu, it)
+        if move is None:
+            break
+        istar, jstar, mindelta = move
+        cost += mindelta
+        tabu[istar, pi[istar]] = it + tabulen
+        tabu[jstar, pi[jstar]] = it + tabulen
+        swap(f, d, pi, dp, delta, istar, jstar)
+
+        if cost < bestcost:
+            bestcost = cost
+            bestsol = pi.tolist()
+            if report:
+                report(bestcost, "it:%d"%it)
+        if LOG: print("iteration", it+1, "\tcost =", cost, ", best =", bestcost)
+
+    if report:
+        report(bestcost, "it:%d"%it)
+
+    assert evaluate__(n, f, d, pi) == cost
+    return bestsol, bestcost
+
+
+#
+# robust tabu search (Taillard, 1991)
+#
+
+def find_move_robust(n, pi, delta, tabu, aspiration, cost, bestcost, iteration):
+    """Find the swap to do on robust tabu search.
+
+    Swapping i and j is tabu only if both i and j would return to a location
+    they left recently (tabu[i,pi[j]] and tabu[j,pi[i]] still to expire).
+    A move is aspired if it leads to a new best cost, or if it puts both
+    i and j on locations they have not occupied for more than 'aspiration'
+    iterations (long-term memory, forcing unvisited assignments).
+    Aspired moves have priority over the remaining non-tabu moves; if all
+    moves are tabu, the best one is taken regardless.
+
+    Returns the two facilities to swap and the cost difference,
+    or None if there is no move (n < 2).
+    """
+    tp = tabu[:, pi]                            # tp[i,j]: i can go to pi[j] after this iteration
+    tabu_ij = (tp >= iteration) & (tp.T >= iteration)
+    aspired = ((tp < iteration - aspiration) & (tp.T < iteration - aspiration)) \
+        | (delta < bestcost - cost)
+    upper = np.triu(np.ones((n, n), dtype=bool), 1)     # consider each pair i < j only once
+    big = np.iinfo(np.int64).max
+    for allowed in (aspired & upper, ~tabu_ij & upper, upper):
+        if allowed.any():
+            gains = np.where(allowed, delta, big)
+            istar, jstar = divmod(int(gains.argmin()), n)
+            return istar, jstar, int(delta[istar, jstar])
+    return None
+
+
+def robust_tabu_search(n, f, d, max_iter, tabu_min=None, tabu_max=None, aspiration=None,
+                       target=None, report=None):
+    """ Perform robust tabu search (Ro-TS) for QAP.
+
+    Parameters
+    ----------
+    n : int
+        Size of the problem
+    f : numpy.ndarray or dict
+        Flow matrix
+    d : numpy.ndarray or dict
+        Distance matrix
+    max_iter : int
+        Upper limit for the number of iterations in tabu search
+    tabu_min, tabu_max : int, optional
+        Range of the (random) tabu tenure, by default 0.9*n and 1.1*n
+    aspiration : int, optional
+        Number of iterations after which an assignment not used is forced, by default 5*n*n
+    target : int, optional
+        Stop as soon as a solution with this cost is found (e.g., the best known)
+    report : Callback, optional
+        Callback function (e.g. print) for displaying intermediate results, by default None
+
+    Returns
+    -------
+    bestsol, bestcost
+        Tuple of best solution and best cost
+    """
+    f, d = as_matrix(n, f), as_matrix(n, d)
+    if tabu_min is None:
+        tabu_min = int(0.9 * n)
+    if tabu_max is None:
+        tabu_max = int(1.1 * n) + 1
+    if aspiration is None:
+        aspiration = 5 * n * n
+
+    # tabu[i,k]: iteration up to which i cannot go back to k; initially, all
+    # distinct and negative, so that the long-term memory is not triggered at once
+    tabu = -(n * np.arange(n)[:,None] + np.arange(n)[None,:]).astype(np.int64)
+    pi = np.array(construct(n, f, d))
+    dp = d[np.ix_(pi, pi)]
+    cost, delta = evaluate(n, f, d, pi)
+    bestcost, bestsol = cost, pi.tolist()
+
+    it = 0
+    for it in range(max_iter):
+        if target is not None and bestcost <= target:
+            break
+        move = find_move_robust(n, pi, delta, tabu, aspiration, cost, bestcost, it)
+        if move is None:
+            break
+        istar, jstar, mindelta = move
+        cost += mindelta
+        tabu[istar, pi[istar]] = it + random.randint(tabu_min, tabu_max)
+        tabu[jstar, pi[jstar]] = it + random.randint(tabu_min, tabu_max)
+        swap(f, d, pi, dp, delta, istar, jstar)
+
+        if cost < bestcost:
+            bestcost = cost
+            bestsol = pi.tolist()
+            if report:
+                report(bestcost, "it:%d"%it)
+        if LOG: print("iteration", it+1, "\tcost =", cost, ", best =", bestcost)
+
+    if report:
+        report(bestcost, "it:%d"%it)
+
+    assert evaluate__(n, f, d, pi) == cost
+    return bestsol, bestcost
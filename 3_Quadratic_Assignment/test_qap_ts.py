@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+
+import qap_ts
+from qap_ts import evaluate, evaluate__, robust_tabu_search, swap, tabu_search
+
+
+def rnd_instance(n, seed):
+    """Asymmetric instance, with nonzero diagonals."""
+    rng = np.random.default_rng(seed)
+    return n, rng.integers(0, 10, (n, n)), rng.integers(0, 10, (n, n))
+
+
+def brute_delta(n, f, d, pi):
+    cost = evaluate__(n, f, d, pi)
+    delta = np.zeros((n, n), dtype=np.int64)
+    for i in range(n):
+        for j in range(n):
+            p = list(pi)
+            p[i], p[j] = p[j], p[i]
+            delta[i, j] = evaluate__(n, f, d, p) - cost
+    return delta
+
+
+def test_swap_gains():
+    n, f, d = rnd_instance(7, 1)
+    pi = np.random.default_rng(2).permutation(n)
+    cost, delta = evaluate(n, f, d, pi)
+    assert cost == evaluate__(n, f, d, pi)
+    assert (delta == brute_delta(n, f, d, pi)).all()
+
+
+def test_swap_updates_delta():
+    n, f, d = rnd_instance(8, 3)
+    rng = random.Random(4)
+    pi = np.arange(n)
+    dp = d[np.ix_(pi, pi)]
+    cost, delta = evaluate(n, f, d, pi)
+    for t in range(20):
+        i, j = rng.sample(range(n), 2)
+        cost += delta[i, j]
+        swap(f, d, pi, dp, delta, i, j)
+        assert (dp == d[np.ix_(pi, pi)]).all()
+        assert (delta == brute_delta(n, f, d, pi)).all()
+        assert cost == evaluate__(n, f, d, pi)
+
+
+@pytest.mark.parametrize("search, args", [(tabu_search, (200, 5)), (robust_tabu_search, (200,))])
+def test_search(search, args):
+    n, f, d = qap_ts.mk_rnd_data(12)
+    random.seed(5)
+    reports = []
+    pi, cost = search(n, f, d, *args, report=lambda *a: reports.append(a[0]))
+    assert sorted(pi) == list(range(n))
+    assert evaluate__(n, f, d, pi) == cost == reports[-1]
+
+
+def test_no_iterations():
+    n, f, d = qap_ts.mk_rnd_data(5)
+    reports = []
+    pi, cost = tabu_search(n, f, d, 0, 3, report=lambda *args: reports.append(args[0]))
+    assert reports == [cost] == [evaluate__(n, f, d, pi)]
+
+
+def test_find_move_all_tabu(capsys):
+    n, it = 4, 10
+    pi = np.arange(n)
+    delta = np.arange(n*n, dtype=np.int64).reshape(n, n)
+    tabu = np.full((n, n), it + 5, dtype=np.int64)     # every move is tabu
+    assert qap_ts.find_move(n, None, None, pi, delta, tabu, it) == (0, 1, 1)
+    assert (tabu == 0).all()
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("search, args", [(tabu_search, (10, 3)), (robust_tabu_search, (10,))])
+def test_no_moves(search, args):
+    f = d = np.ones((1, 1), dtype=np.int64)
+    assert search(1, f, d, *args) == ([0], 1)
+
+
+def test_find_move_robust():
+    n, it = 4, 100
+    pi = np.arange(n)
+    delta = np.zeros((n, n), dtype=np.int64)
+    delta[0, 1] = delta[1, 0] = -5
+    delta[2, 3] = delta[3, 2] = -1
+    tabu = np.full((n, n), it - 1, dtype=np.int64)
+    tabu[0, 1] = tabu[1, 0] = it + 5        # swapping 0 and 1 is tabu
+    # not improving the best: the best non-tabu move
+    assert qap_ts.find_move_robust(n, pi, delta, tabu, 1000, 10, 0, it) == (2, 3, -1)
+    # aspiration by a new best cost
+    assert qap_ts.find_move_robust(n, pi, delta, tabu, 1000, 10, 10, it) == (0, 1, -5)
+    # aspiration by long-term memory: 2 and 3 have long been away from each other's places
+    tabu[2, 3] = tabu[3, 2] = it - 2000
+    delta[2, 3] = delta[3, 2] = 4
+    assert qap_ts.find_move_robust(n, pi, delta, tabu, 1000, 10, 0, it) == (2, 3, 4)
+
+
+def test_robust_target():
+    n, f, d = qap_ts.mk_rnd_data(10)
+    random.seed(6)
+    pi, best = tabu_search(n, f, d, 300, 5)
+    reports = []
+    pi, cost = robust_tabu_search(n, f, d, 10**6, target=best, report=lambda *a: reports.append(a[1]))
+    assert cost <= best and evaluate__(n, f, d, pi) == cost
+    assert int(reports[-1][3:]) < 10**6 - 1     # stopped at the target
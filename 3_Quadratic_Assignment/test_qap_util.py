@@ -0,0 +1,38 @@
+import importlib.util
+import os
+
+import numpy as np
+
+# loaded by path: other chapters also have a module named 'util'
+spec = importlib.util.spec_from_file_location(
+    "qap_util", os.path.join(os.path.dirname(__file__), "util.py"))
+qap_util = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(qap_util)
+
+QAP = """3
+
+0 1 2
+1 0 3
+2 3 0
+
+ 0 5 6
+ 5 0 7
+ 6 7 0
+"""
+
+
+def test_read_qap(tmp_path):
+    path = tmp_path / "t.dat"
+    path.write_text(QAP)
+    n, f, d = qap_util.read_qap(str(path))
+    assert n == 3 and f.dtype == np.int64 and d.shape == (3, 3)
+    assert f[1, 2] == 3 and d[2, 0] == 6
+    assert f.flags["C_CONTIGUOUS"]
+
+
+def test_read_qap_as_dict(tmp_path):
+    path = tmp_path / "t.dat"
+    path.write_text(QAP)
+    n, f, d = qap_util.read_qap(str(path), as_dict=True)
+    assert f[1, 2] == 3 and d[0, 1] == 5 and len(f) == 9
+    assert all(type(v) is int for v in list(f.values()) + list(d.values()))
@@ -1,12 +1,20 @@
-def read_qap(filename):
-    """Read data for a QAP problem from file in QAPLIB format."""
+import numpy as np
+
+
+def read_qap(filename, as_dict=False):
+    """Read data for a QAP problem from file in QAPLIB format.
+
+    Returns the size 'n' and the flow and distance matrices 'f' and 'd',
+    as contiguous n x n int64 arrays.  With 'as_dict', the matrices are
+    returned as dictionaries {(i,j): value}, as expected by old callers.
+    """
     try:
         if len(filename) > 3 and filename[-3:] == ".gz":  # file compressed with gzip
             import gzip
 
             f = gzip.open(filename, "rb")
         else:  # usual, uncompressed file
-            f = open(filename)
+            f = open(filename, "rb")
     except IOError:
         print("could not open file", filename)
         return None
@@ -14,19 +22,20 @@ def read_qap(filename):
     data = f.read()
     f.close()
 
-    try:
-        pass
-        data = data.split()
-        n = int(data.pop(0))
-        f = {}  # for n times n flow matrix
-        d = {}  # for n times n distance matrix
-        for i in range(n):
-            for j in range(n):
-                f[i, j] = int(data.pop(0))
-        for i in range(n):
-            for j in range(n):
-                d[i, j] = int(data.pop(0))
-    except IndexError:
+    data = np.fromstring(data, dtype=np.int64, sep=" ")
+    if len(data) == 0 or len(data) < 1 + 2 * data[0] ** 2:
         print("inconsistent data on QAP file", filename)
         exit(-1)
+    n = int(data[0])
+    f = data[1 : 1 + n * n].reshape(n, n)  # n times n flow matrix
+    d = data[1 + n * n : 1 + 2 * n * n].reshape(n, n)  # n times n distance matrix
+    if as_dict:
+        return n, to_dict(f), to_dict(d)
     return n, f, d
+
+
+def to_dict(a):
+    """Convert a matrix into a dictionary {(i,j): a[i,j]}."""
+    n, m = a.shape
+    values = a.tolist()
+    return {(i, j): values[i][j] for i in range(n) for j in range(m)}
@@ -0,0 +1,57 @@
+import importlib.util
+import os
+
+import pytest
+
+# loaded by path: other chapters also have a module named 'util'
+spec = importlib.util.spec_from_file_location(
+    "mkp_util", os.path.join(os.path.dirname(__file__), "util.py"))
+mkp_util = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mkp_util)
+
+MULTI = """2
+3 2 0
+ 10 20 30
+ 1 2 3
+ 4 5
+ 6
+ 7 8
+2 1 55
+ 1.5 2
+ 3 4 5
+"""
+
+
+@pytest.fixture
+def multi(tmp_path):
+    path = tmp_path / "mknap.txt"
+    path.write_text(MULTI)
+    return str(path)
+
+
+def test_read_mkp(multi):
+    mkps = mkp_util.read_mkp(multi)
+    assert mkps == [([10., 20., 30.], [[1, 2, 3], [4, 5, 6]], [7, 8], 0.),
+                    ([1.5, 2.], [[3, 4]], [5], 55.)]
+
+
+def test_single_instance_without_count(tmp_path):
+    path = tmp_path / "one.txt"
+    path.write_text("2 1 55\n1.5 2\n3 4\n5\n")
+    assert mkp_util.read_mkp(str(path)) == [([1.5, 2.], [[3, 4]], [5], 55.)]
+
+
+def test_read_mkp_instance(multi):
+    values, weights, capacities, optimal = mkp_util.read_mkp_instance(multi, 1)
+    assert weights.shape == (1, 2) and capacities.tolist() == [5] and optimal == 55.
+    with pytest.raises(IndexError):
+        mkp_util.read_mkp_instance(multi, 2)
+
+
+def test_truncated_and_empty(tmp_path):
+    path = tmp_path / "bad.txt"
+    path.write_text("2 1 0\n1 2\n3\n")
+    with pytest.raises(ValueError):
+        mkp_util.read_mkp(str(path))
+    path.write_text("")
+    assert mkp_util.read_mkp(str(path)) == []
@@ -1,3 +1,8 @@
+import functools
+import mmap
+import os
+import re
+
 import numpy as np
 
 def read_mkp(filename, use_print=False):
@@ -23,49 +28,102 @@ def read_mkp(filename, use_print=False):
     を最大化する問題となる。
 
     一つのファイル内に複数の問題インスタンスが書いてあることもあり、その場合には問題数が1行目に書いてある
+
+    全インスタンスを Python のリストとして返す．一つずつ numpy 配列で読むには iter_mkp を使う
     """
-    with open(filename, 'r') as f:
-        txts = f.read().lstrip('\n ')
-    header_check = txts.split('\n')[0].split()
-    if len(header_check)==1:
-        txts = txts.lstrip(header_check[0])
-    txts = txts.replace('\n', ' ')
-    splitted = txts.split()
     mkps = []
-
-    while splitted:
-        n = int(splitted[0])
-        m = int(splitted[1])
-        optimal = float(splitted[2])
-        offset = 3
-
-        values = []
-        for i in range(n):
-            values.append(float(splitted[offset+i]))
-        offset += n
-        if use_print: print("values:", values)
-
-        weights = []
-        for j in range(m):
-            weight = []
-            for i in range(n):
-                weight.append(int(splitted[offset+i]))
-            weights.append(weight)
-            #print(weight)
-            offset += n
-
-        capacities = []
-        for i in range(m):
-            capacities.append(int(splitted[offset+i]))
-        offset += m
-        #print(capacities)
-
-        if use_print: 
+    for values, weights, capacities, optimal in iter_mkp(filename):
+        values = values.tolist()
+        weights = weights.tolist()
+        capacities = capacities.tolist()
+        if use_print:
+            print("values:", values)
             print("constraints:")
-            for i in range(m):
+            for i in range(len(capacities)):
                 print(f"weights {weights[i]} with capacity {capacities[i]}")
-        
         mkps.append((values, weights, capacities, optimal))
-        splitted = splitted[offset:]
-
     return mkps
+
+
+_TOKEN = re.compile(rb"\s*(\S+)")
+
+
+@functools.lru_cache(maxsize=None)
+def _skip(ntokens):
+    """ntokens 個のトークンを読み飛ばす正規表現"""
+    return re.compile(rb"(?:\s*\S+){%d}" % ntokens)
+
+
+def _span(buf, pos, ntokens):
+    """buf の位置 pos から ntokens 個のトークンが占める範囲の終端を返す"""
+    if ntokens == 0:
+        return pos
+    match = _skip(ntokens).match(buf, pos)
+    if match is None:
+        raise ValueError(f"MKPファイルのデータが不足しています (位置 {pos})")
+    return match.end()
+
+
+def iter_mkp(filename, start=0):
+    """MKPファイル内の問題インスタンスを一つずつ numpy 配列として生成するジェネレータ
+
+    ファイルはメモリマップして必要な部分だけを読み，各インスタンスは
+    (values, weights, capacities, optimal) の形で返す:
+    values は長さ n の float64 配列，weights は m x n の int64 配列，
+    capacities は長さ m の int64 配列，optimal は float．
+    start 番目 (0始まり) より前のインスタンスは，数値に変換せずにトークンを
+    読み飛ばすだけなので，大きなファイルでも任意のインスタンスに直接アクセスできる．
+    形式は read_mkp を参照．
+    """
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        pos = 0
+        first = _TOKEN.match(buf, pos)
+        if first is None:
+            return
+        eol = buf.find(b'\n', first.end())
+        if eol < 0:
+            eol = len(buf)
+        if _TOKEN.match(buf, first.end(), eol) is None:   # 1行目が問題数のみ
+            pos = first.end()
+
+        k = 0
+        while True:
+            header = []
+            for _ in range(3):
+                match = _TOKEN.match(buf, pos)
+                if match is None:
+                    if header:
+                        raise ValueError("MKPファイルのデータが不足しています")
+                    return
+                header.append(match.group(1))
+                pos = match.end()
+            n, m, optimal = int(header[0]), int(header[1]), float(header[2])
+
+            if k < start:   # 変換せずに読み飛ばす
+                pos = _span(buf, pos, n + m*n + m)
+                k += 1
+                continue
+
+            end = _span(buf, pos, n)
+            values = np.fromstring(buf[pos:end], dtype=np.float64, sep=' ')
+            pos, end = end, _span(buf, end, m*n + m)
+            data = np.fromstring(buf[pos:end], dtype=np.int64, sep=' ')
+            pos = end
+            weights = data[:m*n].reshape(m, n)
+            capacities = data[m*n:]
+            yield values, weights, capacities, optimal
+            k += 1
+    finally:
+        buf.close()
+
+
+def read_mkp_instance(filename, k):
+    """MKPファイル内の k 番目 (0始まり) の問題インスタンスを numpy 配列として返す"""
+    for mkp in iter_mkp(filename, start=k):
+        return mkp
+    raise IndexError(f"{filename} には {k+1} 個目のインスタンスがありません")
@@ -1,4 +1,5 @@
 import random
+from opt100.journal import Journal
 
 Infinity = 1.e10000
 LOG = True
@@ -157,7 +158,7 @@ def find_drop(nodes, adj, sol, b, tabu, tabulen, iteration) -> int:
     return find_drop(nodes, adj, sol, b, tabu, tabulen, iteration)
 
 
-def move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
+def move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration, journal=None) -> int:
     """実行可能解に頂点を加える
 
     Parameters
@@ -178,6 +179,8 @@ def move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
         解から頂点を削除する際のタブーリストの長さ
     iteration : int
         現在の反復回数
+    journal : Journal, optional
+        移動を記録する変更履歴, by default None
 
     Returns
     -------
@@ -187,6 +190,8 @@ def move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
     i = find_add(nodes, adj, sol, b, tabu, tabuOUT, iteration)
     tabu[i] = iteration + tabuIN
     sol.add(i)
+    if journal is not None:
+        journal.record(i, False)
 
     delta_infeas = 0
     for j in adj[i]:
@@ -196,7 +201,7 @@ def move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
     return delta_infeas
 
 
-def move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
+def move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration, journal=None) -> int:
     """実行不能解から頂点を削除する
 
     Parameters
@@ -217,6 +222,8 @@ def move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
         解から頂点を削除する際のタブーリストの長さ
     iteration : int
         現在の反復回数
+    journal : Journal, optional
+        移動を記録する変更履歴, by default None
 
     Returns
     -------
@@ -227,6 +234,8 @@ def move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, iteration) -> int:
 
     tabu[i] = iteration + tabuOUT
     sol.remove(i)
+    if journal is not None:
+        journal.record(i, True)
 
     delta_infeas = 0
     for j in adj[i]:
@@ -264,7 +273,9 @@ def tabu_search(nodes, adj, sol, max_iter, tabulen, report=None):
 
     card, infeas, b = evaluate(nodes, adj, sol)
     assert infeas == 0 # ここでは実行可能解が出ているはず
-    bestsol, bestcard = set(sol), card
+    bestcard = card
+    journal = Journal(sol, cap=n) # 最良解は移動の記録から復元する
+    journal.mark()
 
     if LOG:
         print(f"iter: 0 \tcard: {card} ({infeas} conflicts) \tbest: {bestcard}")
@@ -273,20 +284,22 @@ def tabu_search(nodes, adj, sol, max_iter, tabulen, report=None):
         tabuIN = 1 + int(tabulen/100 * card)
         tabuOUT = 1 + int(tabulen/100 * (n-card))
         if infeas == 0:
-            infeas += move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it)
+            infeas += move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it, journal)
             card += 1
         else:
-            infeas += move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it)
+            infeas += move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it, journal)
             card -= 1
 
         if infeas == 0 and card > bestcard:
-            bestsol, bestcard = set(sol), card
+            bestcard = card
+            journal.mark()
             if report:
                 report(card, "iter:", it)
 
         if LOG:
             print(f"iter: {it+1} \tcard: {card} ({infeas} conflicts) \tbest: {bestcard}")
 
+    bestsol = journal.best()
     # sanity check
     xcard, xinfeas, xb = evaluate(nodes, adj, bestsol)
     assert bestcard == xcard and xinfeas == 0
@@ -295,6 +308,14 @@ def tabu_search(nodes, adj, sol, max_iter, tabulen, report=None):
 
 # Tabu search with diversification & intensification
 
+def indicator(nodes, sol) -> list:
+    """解 (頂点集合) の指示ベクトルを返す (エリート解のプールで共有するため)"""
+    x = [0 for i in nodes]
+    for i in sol:
+        x[i] = 1
+    return x
+
+
 def diversify(nodes, adj, v) -> set:
     """指定された頂点を含む極大なクリークをランダムに返す
 
@@ -329,11 +350,16 @@ def diversify(nodes, adj, v) -> set:
     return sol
 
 
-def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
+def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None, pool=None):
     """集中化と多様化を取り入れたタブーサーチを実行する．
     集中化ではそれまでに発見した最良解を暫定解に設定して探索する．
     多様化では最もタブーから遠い頂点を含む極大クリークを暫定解に設定して探索する．
     適当な反復回数(スイッチするたびに増加させる)で解の更新がなければ集中化と多様化をスイッチする．
+    pool (他のプロセスと共有するエリート解のプール) が与えられた場合は，集中化と多様化を
+    スイッチするたびと終了時に (前回から改善していれば) 最良解をプールに登録し，
+    集中化ではプールから取り出した解から探索する．プールの最良解が自身の最良解より
+    良ければ，それを最良解として採用し report で報告する．
+    sol は直接更新され，常に現在の解を保持する．
 
     Parameters
     ----------
@@ -349,19 +375,33 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
         タブーリストの長さ
     report : callable, optional
         print など, by default None
+    pool : opt100.multistart.ElitePool, optional
+        エリート解のプール (解は各頂点の 0/1 の指示ベクトル)．クリークの位数を最大化するので
+        ElitePool(n, minimize=False) で作成すること, by default None
 
     Returns
     -------
     tuple
         Best solution found and its cardinality
+
+    Raises
+    ------
+    ValueError
+        pool が最小化用のとき
     """
+    if pool is not None and pool.minimize:
+        raise ValueError("the pool must be created with minimize=False")
     n = len(nodes)
     tabu = [0 for i in nodes]
 
     card, infeas, b = evaluate(nodes, adj, sol)
     assert infeas == 0
 
-    bestsol, bestcard, bestb = set(sol), card, list(b)
+    bestcard = card
+    bestb = list(b) # 最良解の b (更新は高々最大クリークの位数回なので，複製しておく)
+    journal = Journal(sol, cap=n) # 最良解は移動の記録から復元する
+    journal.mark()
+    published = 0 # 最後にプールに登録した解の位数
 
     D = 1
     count = 0
@@ -373,17 +413,19 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
         tabuIN = 1 + int(tabulen/100 * card)
         tabuOUT = 1 + int(tabulen/100 * (n-card))
         if infeas == 0:
-            infeas += move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it)
+            infeas += move_in(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it, journal)
             card += 1
         else:
-            infeas += move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it)
+            infeas += move_out(nodes, adj, sol, b, tabu, tabuIN, tabuOUT, it, journal)
             card -= 1
 
         if LOG:
             print(f"iter: {it+1} \tnon-improved: {count}/{D} \tcard: {card} ({infeas} conflicts) \tbest: {bestcard}")
 
         if infeas == 0 and card > bestcard:
-            bestsol, bestcard, bestb = set(sol), card, list(b)
+            bestcard = card
+            bestb = list(b)
+            journal.mark()
             if report:
                 report(card, "iter:", it)
             if LOG:
@@ -396,11 +438,33 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
             count += 1
 
         if count > D:
+            bestsol = journal.best()
+            if pool is not None and bestcard > published:
+                pool.publish(bestcard, indicator(nodes, bestsol))
+                published = bestcard
             if D%2==0:
                 if LOG:
                     print("*** intensifying: switching to best found solution ***")
-                sol, card, b = set(bestsol), bestcard, list(bestb)
-                infeas = 0
+                restart = bestsol
+                if pool is not None:
+                    elite = pool.best()
+                    if elite is not None and elite[0] > bestcard:   # 他のプロセスの最良解を採用
+                        bestsol = set(i for i in nodes if elite[1][i])
+                        bestcard, _, bestb = evaluate(nodes, adj, bestsol)
+                        published = bestcard
+                        sol.clear()
+                        sol.update(bestsol)
+                        if report:
+                            report(bestcard, "iter:", it)
+                    elite = pool.fetch()
+                    restart = bestsol if elite is None else set(i for i in nodes if elite[1][i])
+                sol.clear()
+                sol.update(restart)
+                if restart == bestsol:  # 最良解の b を再利用し，評価し直さない
+                    card, infeas, b = bestcard, 0, list(bestb)
+                else:
+                    card, infeas, b = evaluate(nodes, adj, sol)
+                journal = Journal(sol, bestsol, n)
             else:
                 if LOG:
                     print("*** diversifying: constructing maximal clique forom less used vertex ***")
@@ -414,10 +478,14 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
                         cand.append(j)
                 v = random.choice(cand)
 
-                sol = diversify(nodes, adj, v)
+                sol.clear()
+                sol.update(diversify(nodes, adj, v))
                 card, infeas, b = evaluate(nodes, adj, sol)
+                journal = Journal(sol, bestsol, n)
                 if infeas == 0 and card > bestcard:
-                    bestsol, bestcard, bestb = set(sol), card, list(b)
+                    bestcard = card
+                    bestb = list(b)
+                    journal.mark()
                     if report:
                         report(card, "iter:", it)
                 tabu = [min(tabu[i], it) for i in nodes]
@@ -428,6 +496,9 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report=None):
         if infeas == 0:
             lastcard = card
 
+    bestsol = journal.best()
+    if pool is not None and bestcard > published:
+        pool.publish(bestcard, indicator(nodes, bestsol))
     # sanity check
     xcard, xinfeas, xb = evaluate(nodes, adj, bestsol)
     assert bestcard == xcard and xinfeas == 0
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+import tabu_search as ts
+from opt100.multistart import ElitePool
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(ts, "LOG", False)
+
+
+def test_tabu_search_feasible(rnd_graph):
+    nodes, adj = rnd_graph(50, 0.3, 1)
+    random.seed(0)
+    best, card = ts.tabu_search(nodes, adj, ts.construct(nodes, adj), 500, 10)
+    assert ts.evaluate(nodes, adj, best)[:2] == (card, 0)
+
+
+def test_adopts_and_reports_pool_best(rnd_graph):
+    nodes, adj = rnd_graph(60, 0.2, 1)
+    random.seed(1)
+    elite, elite_card = ts.ts_intens_divers(nodes, adj, ts.construct(nodes, adj), 3000, 10)
+    pool = ElitePool(len(nodes), minimize=False)
+    pool.publish(elite_card, ts.indicator(nodes, elite))
+
+    random.seed(2)
+    sol = ts.construct(nodes, adj)
+    calls = []
+    def report(card, *args):
+        calls.append((card, set(sol)))
+
+    best, card = ts.ts_intens_divers(nodes, adj, sol, 20, 10, report, pool)
+    assert (elite_card, elite) in calls
+    assert type(card) is int and card >= elite_card
+    assert ts.evaluate(nodes, adj, best)[:2] == (card, 0)
+
+
+def test_minimizing_pool_rejected(rnd_graph):
+    nodes, adj = rnd_graph(10, 0.2, 1)
+    with pytest.raises(ValueError):
+        ts.ts_intens_divers(nodes, adj, ts.construct(nodes, adj), 10, 10, pool=ElitePool(10))
+
+
+def test_intensification_not_reevaluated(rnd_graph, monkeypatch, capsys):
+    nodes, adj = rnd_graph(60, 0.3, 3)
+    calls = []
+    evaluate = ts.evaluate
+    def counting(nodes, adj, sol):
+        calls.append(len(sol))
+        return evaluate(nodes, adj, sol)
+    monkeypatch.setattr(ts, "evaluate", counting)
+    monkeypatch.setattr(ts, "LOG", True)
+    random.seed(4)
+    best, card = ts.ts_intens_divers(nodes, adj, ts.construct(nodes, adj), 2000, 10)
+    out = capsys.readouterr().out
+    assert "switching to best found solution" in out
+    # only the initial solution, each diversification and the final check are evaluated
+    assert len(calls) == 2 + out.count("*** diversifying")
+    assert evaluate(nodes, adj, best)[:2] == (card, 0)
+
+
+class SpyPool(ElitePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.published = []
+
+    def publish(self, obj, sol):
+        self.published.append(obj)
+        print("publish", obj)
+        return super().publish(obj, sol)
+
+
+def test_publishes_at_switches(rnd_graph, monkeypatch, capsys):
+    nodes, adj = rnd_graph(60, 0.3, 5)
+    monkeypatch.setattr(ts, "LOG", True)
+    pool = SpyPool(len(nodes), minimize=False)
+    random.seed(6)
+    best, card = ts.ts_intens_divers(nodes, adj, ts.construct(nodes, adj), 1000, 10, pool=pool)
+    lines = capsys.readouterr().out.splitlines()
+    # published just before switching between intensification and diversification, or at the end
+    at = [k for k in range(len(lines)) if lines[k].startswith("publish")]
+    assert at and all(k == len(lines)-1 or lines[k+1].startswith("*** diversifying")
+                      or "switching to best" in lines[k+1] for k in at)
+    assert pool.published == sorted(set(pool.published))     # only improvements
+    assert pool.best() == (card, ts.indicator(nodes, best))
@@ -0,0 +1,89 @@
+"""
+bench_sa.py: cost per trial of the simulated annealing in gpp_sa.
+
+On a random sparse graph, reports the time per trial of
+  - Replicas.sweep, for 1 and more chains, at a high, a medium and a low
+    temperature, with blocks of trials ('batch') and one trial at a time
+    (batch=1, where every trial goes through NumPy);
+  - the scalar 'annealing', on a fixed number of stages.
+
+Usage: python bench_sa.py [n] [--deg D]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+import gpp_sa
+from gpp_ts import construct
+
+
+class Stages(gpp_sa.Schedule):
+    """Geometric cooling, stopping after a fixed number of stages."""
+
+    def __init__(self, nstages, tempfactor=0.9):
+        gpp_sa.Schedule.__init__(self, nstages, 0.)
+        self.nstages, self.tempfactor = nstages, tempfactor
+
+    def next(self, T, changes, trials):
+        self.nstages -= 1
+        return T * self.tempfactor if self.nstages > 0 else None
+
+    def cool(self, T, changes, trials):
+        return T * self.tempfactor
+
+
+def rnd_graph(n, deg, seed=0):
+    rng = random.Random(seed)
+    adj = [set() for i in range(n)]
+    for t in range(n * deg // 2):
+        i, j = rng.randrange(n), rng.randrange(n)
+        if i != j:
+            adj[i].add(j)
+            adj[j].add(i)
+    return list(range(n)), adj
+
+
+def bench_sweep(nodes, adj, R, T, batch, steps):
+    """Time per trial (microseconds) and acceptance rate of one sweep of 'R' chains."""
+    random.seed(1)
+    chains = gpp_sa.Replicas(nodes, adj, [construct(nodes) for r in range(R)], 1.)
+    rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    accepted, improved = chains.sweep(T, steps, rng, batch=batch)
+    elapsed = time.perf_counter() - start
+    return elapsed / (steps*R) * 1.e6, accepted.mean() / steps
+
+
+def bench_annealing(nodes, adj, L, nstages):
+    """Time per trial (microseconds) of the scalar annealing."""
+    random.seed(1)
+    start = time.perf_counter()
+    gpp_sa.annealing(nodes, adj, construct(nodes), 0.5, L, 0.9, 0, 0., 1., None,
+                     schedule=Stages(nstages))
+    elapsed = time.perf_counter() - start
+    return elapsed / (L*(nstages+1)) * 1.e6
+
+
+def main(n, deg):
+    nodes, adj = rnd_graph(n, deg)
+    print("%-10s %4s %6s %8s %12s %10s" % ("", "R", "T", "batch", "us/trial", "accepted"))
+    for R in (1, 16):
+        steps = 20000 // R
+        for T in (2., 0.5, 0.1):
+            for batch in (1, gpp_sa.BATCH):
+                t, rate = bench_sweep(nodes, adj, R, T, batch, steps)
+                print("%-10s %4d %6g %8d %12.2f %10.3f" % ("sweep", R, T, batch, t, rate))
+    t = bench_annealing(nodes, adj, 2*n, 20)
+    print("%-10s %4d %6s %8d %12.2f" % ("annealing", 1, "-", gpp_sa.BATCH, t))
+
+
+if __name__ == "__main__":
+    deg = 8
+    args = sys.argv[1:]
+    if "--deg" in args:
+        k = args.index("--deg")
+        deg = int(args[k+1])
+        del args[k:k+2]
+    main(int(args[0]) if args else 2000, deg)
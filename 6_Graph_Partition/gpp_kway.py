@@ -0,0 +1,338 @@
+"""
+gpp_kway.py: Tabu search and simulated annealing for k-way graph partitioning.
+
+Generalization of the bisection in gpp_ts and gpp_sa: given a graph with
+(optionally) weighted nodes and edges, and a number of parts 'k', find
+a partition of the nodes into 'k' parts, each with weight at most
+(1+eps) times the average, that minimizes the weight of the edges
+crossing from one part to another.
+
+The solution is represented by a vector, where sol[i] is the part of
+node i (an integer from 0 to k-1).  The search keeps, for each node i,
+the connectivity 'conn[i]': a dictionary with the weight of the edges
+from i into each part adjacent to it.  Moving a node to another part
+updates it in O(deg); the set of nodes with neighbors in other parts
+(the boundary) is kept as well, as only these nodes are candidates for
+improving moves.
+
+Imbalance is penalized, as in gpp_sa, by 'alpha' times the total weight
+in excess of the part capacity; only solutions within capacity are kept
+as the best found (in a Journal, as in gpp_ts).
+
+This file contains a set of functions to illustrate:
+  - construction for k parts
+  - tabu search
+  - simulated annealing
+
+Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
+"""
+import heapq
+import math
+import random
+
+from opt100.journal import Journal
+
+LOG = False     # whether or not to print intermediate solutions
+Infinity = 1.e10000
+
+
+def weighted_adj(nodes, adj):
+    """Adjacency with weights: list of pairs (j, w) for each node.
+
+    Edge weights are taken from 'adj' if it is a CSRGraph with weights,
+    and are 1 otherwise.
+    """
+    if getattr(adj, "weights", None) is not None:
+        return [list(zip(adj[i], adj.edge_weights(i).tolist())) for i in nodes]
+    return [[(j, 1) for j in adj[i]] for i in nodes]
+
+
+def construct(nodes, k, vweights=None):
+    """Assign nodes, in random order (heaviest first, if weighted), to the
+    currently lightest part."""
+    order = list(nodes)
+    random.shuffle(order)
+    if vweights is not None:
+        order.sort(key=lambda i: -vweights[i])
+    heap = [(0, p) for p in range(k)]
+    sol = [0 for i in nodes]
+    for i in order:
+        w, p = heapq.heappop(heap)
+        sol[i] = p
+        heapq.heappush(heap, (w + (1 if vweights is None else vweights[i]), p))
+    return sol
+
+
+def evaluate(nodes, wadj, sol, k, vweights=None):
+    """Evaluate a solution.
+
+    Determines:
+      - the cost of a solution, i.e., the weight of the edges going
+        from one part to another;
+      - W[p] - weight of part p;
+      - conn[i][p] - weight of the edges from i to nodes in part p
+        (only for parts adjacent to i);
+      - boundary - set of the nodes adjacent to other parts.
+    """
+    W = [0 for p in range(k)]
+    conn = [{} for i in nodes]
+    boundary = set()
+    cost = 0
+    for i in nodes:
+        W[sol[i]] += 1 if vweights is None else vweights[i]
+        c = conn[i]
+        for j, w in wadj[i]:
+            p = sol[j]
+            c[p] = c.get(p, 0) + w
+            if p != sol[i]:
+                cost += w
+                boundary.add(i)
+    return cost/2, W, conn, boundary
+
+
+def capacity(nodes, k, eps, vweights=None):
+    """Maximum weight of a part."""
+    total = len(nodes) if vweights is None else sum(vweights)
+    return (1+eps) * total / k
+
+
+def excess(W, limit):
+    """Total weight of parts in excess of 'limit'."""
+    return sum(w - limit for w in W if w > limit)
+
+
+def penalty(W, p, q, v, limit):
+    """Change in the excess weight, when moving weight 'v' from part 'p' to part 'q'."""
+    return max(W[p] - v - limit, 0) - max(W[p] - limit, 0) + \
+        max(W[q] + v - limit, 0) - max(W[q] - limit, 0)
+
+
+def move(i, q, wadj, sol, conn, W, boundary, v):
+    """Move node 'i' (with weight 'v') into part 'q', updating the structures."""
+    p = sol[i]
+    sol[i] = q
+    W[p] -= v
+    W[q] += v
+    if any(r != q for r in conn[i]):
+        boundary.add(i)
+    else:
+        boundary.discard(i)
+    for j, w in wadj[i]:
+        c = conn[j]
+        c[p] -= w
+        if c[p] == 0:
+            del c[p]
+        c[q] = c.get(q, 0) + w
+        s = sol[j]
+        if s == p or s == q:
+            if any(r != s for r in c):
+                boundary.add(j)
+            else:
+                boundary.discard(j)
+
+
+def find_move(sol, conn, W, boundary, tabu, iteration, cost, bestcost, alpha, limit, vweights):
+    """Find the best non-tabu move of a boundary node into an adjacent part.
+
+    Moves are evaluated by the change in cost plus 'alpha' times the
+    change in excess weight; tabu moves are accepted if they lead to a
+    solution within capacity better than the best found ('aspiration').
+    """
+    over = excess(W, limit)
+    mindelta = Infinity
+    cand = []
+    v = 1
+    for i in boundary:
+        p = sol[i]
+        c = conn[i]
+        cp = c.get(p, 0)
+        if vweights is not None:
+            v = vweights[i]
+        pout = max(W[p] - v - limit, 0) - max(W[p] - limit, 0)
+        for q in c:
+            if q == p:
+                continue
+            dcost = cp - c[q]
+            dpen = pout + max(W[q] + v - limit, 0) - max(W[q] - limit, 0)
+            if tabu[i][q] > iteration and \
+                    not (over + dpen <= 0 and cost + dcost < bestcost):
+                continue
+            delta = dcost + alpha*dpen
+            if delta < mindelta:
+                mindelta = delta
+                cand = [(i, q, dcost)]
+            elif delta == mindelta:
+                cand.append((i, q, dcost))
+    if cand == []:
+        return None
+    return random.choice(cand)
+
+
+def tabu_search(nodes, adj, k, sol, max_iter, tabulen, eps=0.03, alpha=1., vweights=None, report=None):
+    """Execute a tabu search run for k-way partitioning.
+
+    Parameters:
+     * nodes, adj - graph definition (edge weights are used if 'adj' is a weighted CSRGraph)
+     * k - number of parts
+     * sol - initial solution (e.g., from 'construct'), modified in place
+     * max_iter - number of iterations
+     * tabulen - after moving a node out of a part, moving it back is
+       tabu for 'tabulen' iterations
+     * eps - allowed imbalance: each part's weight is at most (1+eps) times the average
+     * alpha - penalty per unit of weight in excess of the capacity
+     * vweights - list of node weights (default: 1 for every node)
+     * report - function used for output of best found solutions
+
+    Returns the best solution within capacity, and its cost (None and
+    Infinity if no such solution was found).
+    """
+    wadj = weighted_adj(nodes, adj)
+    cost, W, conn, boundary = evaluate(nodes, wadj, sol, k, vweights)
+    limit = capacity(nodes, k, eps, vweights)
+    tabu = [[0]*k for i in nodes]   # tabu[i][p]: iteration up to which moving node 'i' into part 'p' is tabu
+
+    journal = Journal(sol)
+    bestcost = Infinity
+    if excess(W, limit) <= 0:
+        bestcost = cost
+        journal.mark()
+        if report:
+            report(bestcost, "it:%d" % 0)
+    for it in range(max_iter):
+        mv = find_move(sol, conn, W, boundary, tabu, it, cost, bestcost, alpha, limit, vweights)
+        if mv is None:
+            if not boundary:     # no node is adjacent to another part
+                break
+            if LOG:
+                print( "blocked, no non-tabu move")
+            tabu = [[0]*k for i in nodes]
+            continue
+        i, q, dcost = mv
+        tabu[i][sol[i]] = it + tabulen
+        journal.record(i, sol[i])
+        move(i, q, wadj, sol, conn, W, boundary, 1 if vweights is None else vweights[i])
+        cost += dcost
+        if LOG:
+            print( "tabu search, iteration", it, "cost", cost, "part weights", W)
+
+        if cost < bestcost and excess(W, limit) <= 0:
+            bestcost = cost
+            journal.mark()
+            if report:
+                report(bestcost, "it:%d" % it)
+
+    bestsol = journal.best()
+    # # check correctness of incremental evaluation
+    # z,W,conn,boundary = evaluate(nodes, wadj, bestsol, k, vweights)
+    # assert z == bestcost
+
+    return bestsol, bestcost
+
+
+def find_move_rnd(nodes, wadj, sol, conn, W, k, alpha, limit, vweights):
+    """Random move: a random node into the part of one of its neighbors
+    (or into a random part, if all its neighbors are in its own part)."""
+    i = random.choice(nodes)
+    p = sol[i]
+    q = sol[random.choice(wadj[i])[0]] if wadj[i] else p
+    if q == p:
+        q = random.randrange(k-1)
+        if q >= p:
+            q += 1
+    c = conn[i]
+    v = 1 if vweights is None else vweights[i]
+    dcost = c.get(p, 0) - c.get(q, 0)
+    return i, q, dcost, dcost + alpha*penalty(W, p, q, v, limit)
+
+
+def metropolis(T, delta):
+    "Metropolis criterion for new configuration acceptance"
+    if delta <= 0 or random.random() <= math.exp(-(delta)/T):
+        return True
+    else:
+        return False
+
+
+def estimate_temperature(nodes, wadj, sol, conn, W, k, X0, alpha, limit, vweights):
+    """Estimate initial temperature, for a rate 'X0' of acceptance of
+    the non-improving moves in a series of random trials."""
+    ntrials = 10*len(sol)
+    nsucc = 0
+    deltaZ = 0.0
+    for t in range(ntrials):
+        i, q, dcost, delta = find_move_rnd(nodes, wadj, sol, conn, W, k, alpha, limit, vweights)
+        if delta > 0:
+            nsucc += 1
+            deltaZ += delta
+    if nsucc != 0:
+        deltaZ /= nsucc
+    T = -deltaZ/math.log(X0)
+    if LOG:
+        print( "initial acceptance rate:", X0)
+        print( "initial temperature:", T)
+        print()
+    return T
+
+
+def annealing(nodes, adj, k, sol, initprob, L, tempfactor, freezelim, minpercent, alpha, report,
+              eps=0.03, vweights=None):
+    """Simulated annealing for k-way graph partitioning
+
+    Parameters:
+     * nodes, adj - graph definition (edge weights are used if 'adj' is a weighted CSRGraph)
+     * k - number of parts
+     * sol - initial solution (e.g., from 'construct'), modified in place
+     * initprob - initial acceptance rate
+     * L - number of tentatives at each temperature
+     * tempfactor - cooling ratio
+     * freezelim - max number of iterations with less that minpercent acceptances
+     * minpercent - percentage of accepted moves (changing the objective) for being not frozen
+     * alpha - penalty per unit of weight in excess of the capacity
+     * report - function used for output of best found solutions
+     * eps - allowed imbalance: each part's weight is at most (1+eps) times the average
+     * vweights - list of node weights (default: 1 for every node)
+
+    Returns the best solution within capacity, and its cost (None and
+    Infinity if no such solution was found).
+    """
+    nodes = list(nodes)
+    wadj = weighted_adj(nodes, adj)
+    z, W, conn, boundary = evaluate(nodes, wadj, sol, k, vweights)
+    limit = capacity(nodes, k, eps, vweights)
+    journal = Journal(sol)
+    zstar = Infinity
+    if excess(W, limit) <= 0:
+        zstar = z
+        journal.mark()
+        if report:
+            report(zstar)
+
+    T = estimate_temperature(nodes, wadj, sol, conn, W, k, initprob, alpha, limit, vweights)
+    if T == 0:  # frozen, return imediately
+        return journal.best(), zstar
+
+    nfrozen = 0
+    while nfrozen < freezelim:
+        changes, trials = 0, 0
+        while trials < L:
+            trials += 1
+            i, q, dcost, delta = find_move_rnd(nodes, wadj, sol, conn, W, k, alpha, limit, vweights)
+            if metropolis(T, delta):
+                if delta != 0:      # moves on plateaus do not count for freezing
+                    changes += 1
+                journal.record(i, sol[i])
+                move(i, q, wadj, sol, conn, W, boundary, 1 if vweights is None else vweights[i])
+                z += dcost
+                if z < zstar and excess(W, limit) <= 0:
+                    zstar = z
+                    journal.mark()
+                    nfrozen = 0
+                    if report:
+                        report(zstar)
+        if LOG:
+            print( "temp:", T, " current objective:", z, "part weights:", W)
+        T *= tempfactor
+        if float(changes)/trials < minpercent:
+            nfrozen += 1
+
+    return journal.best(), zstar
@@ -0,0 +1,325 @@
+"""
+gpp_ml.py: Multilevel graph partitioning (coarsen, partition, refine).
+
+Local search from a random partition of a large sparse graph moves one
+node at a time, and takes very long to move whole regions of the graph
+across the cut.  The multilevel scheme (as in METIS, Karypis and Kumar,
+1998) works on a hierarchy of smaller graphs:
+
+  - coarsening: pairs of adjacent nodes, preferably joined by heavy
+    edges, are merged into one node, repeatedly, until the graph has a
+    few hundred nodes; merged nodes add up their weights, and parallel
+    edges add up into weighted edges;
+  - initial partition: the coarsest graph is partitioned from several
+    random starts, keeping the best;
+  - uncoarsening: the partition is projected back to each finer graph,
+    and improved by moving nodes on the boundary of the partition
+    (Fiduccia-Mattheyses passes).
+
+The cut of a partition is the same on a graph and on its coarser
+versions, so each level starts from the cost of the previous one.
+
+Graphs at each level are kept in compressed sparse row (CSR) format:
+node i has neighbors 'nbrs[offsets[i]:offsets[i+1]]' and the
+corresponding edge weights 'ewgt[offsets[i]:offsets[i+1]]'; 'vwgt[i]'
+is the weight of node i.
+
+Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
+"""
+import heapq
+import random
+
+import numpy as np
+
+from gpp_ts import csr_arrays
+
+LOG = False     # whether or not to print information on each level
+MATCH_ROUNDS = 4        # rounds of proposals in heavy-edge matching
+MIN_REDUCTION = 0.95    # stop coarsening if a level keeps more than this fraction of nodes
+
+
+class Level:
+    """Graph at one level of the hierarchy, with 'cmap[i]', the node of the
+    coarser graph where node 'i' was merged (set when coarsening it)."""
+
+    def __init__(self, offsets, nbrs, ewgt, vwgt):
+        self.offsets, self.nbrs, self.ewgt, self.vwgt = offsets, nbrs, ewgt, vwgt
+        self.n = len(vwgt)
+        self.rows = np.repeat(np.arange(self.n), np.diff(offsets))
+        self.cmap = None
+
+
+def csr_level(nodes, adj, vweights=None):
+    """Make the finest level, from a graph given as usual in this repository
+    (adjacency lists/sets, or a CSRGraph from graphtools)."""
+    return Level(*csr_arrays(nodes, adj, vweights))
+
+
+def heavy_edge_matching(g, maxvw, rng):
+    """Match nodes of level 'g' with a neighbor, preferring heavy edges.
+
+    In each round every unmatched node proposes to its unmatched neighbor
+    through the heaviest edge (ties broken at random), and mutual proposals
+    are matched.  Nodes left unmatched after MATCH_ROUNDS rounds are then
+    visited in random order, and matched greedily; finally, isolated nodes
+    are matched among themselves.  Pairs whose weight would exceed 'maxvw'
+    are not matched.
+    Returns array 'match', with -1 for unmatched nodes.
+    """
+    n = g.n
+    match = np.full(n, -1, dtype=np.int64)
+    score = g.ewgt * (1 + 1e-9*rng.random(len(g.ewgt)))     # random tie breaking
+    for r in range(MATCH_ROUNDS):
+        free = match < 0
+        mask = free[g.rows] & free[g.nbrs] & (g.vwgt[g.rows] + g.vwgt[g.nbrs] <= maxvw)
+        rows, cols, sc = g.rows[mask], g.nbrs[mask], score[mask]
+        if len(rows) == 0:
+            break
+        first = np.concatenate(([True], rows[1:] != rows[:-1]))     # rows are sorted
+        group = np.cumsum(first) - 1
+        best = np.flatnonzero(sc == np.maximum.reduceat(sc, np.flatnonzero(first))[group])
+        best = best[np.concatenate(([True], group[best[1:]] != group[best[:-1]]))]
+        prop = np.full(n, -1, dtype=np.int64)
+        cand = rows[best]
+        prop[cand] = cols[best]
+        mutual = cand[prop[prop[cand]] == cand]
+        match[mutual] = prop[mutual]
+
+    deg = np.diff(g.offsets)
+    isfree = (match < 0) & (deg > 0)
+    free = np.flatnonzero(isfree)
+    if len(free):
+        rows = np.flatnonzero(isfree[g.rows])   # edges of the free nodes
+        nbrs, sc = g.nbrs[rows].tolist(), score[rows].tolist()
+        start = np.concatenate(([0], np.cumsum(deg[free]))).tolist()
+        vwgt, mate, free = g.vwgt.tolist(), match.tolist(), free.tolist()
+        for k in rng.permutation(len(free)).tolist():
+            i = free[k]
+            if mate[i] >= 0:
+                continue
+            best, jstar = None, -1
+            for e in range(start[k], start[k+1]):
+                j = nbrs[e]
+                if mate[j] < 0 and vwgt[i] + vwgt[j] <= maxvw and (best is None or sc[e] > best):
+                    best, jstar = sc[e], j
+            if jstar >= 0:
+                mate[i], mate[jstar] = jstar, i
+        match = np.array(mate, dtype=np.int64)
+
+    isolated = np.flatnonzero(deg == 0)
+    isolated = isolated[np.argsort(g.vwgt[isolated], kind="stable")]
+    a, b = isolated[0:len(isolated)-1:2], isolated[1::2]
+    ok = g.vwgt[a] + g.vwgt[b] <= maxvw
+    match[a[ok]], match[b[ok]] = b[ok], a[ok]
+    return match
+
+
+def coarsen(g, maxvw, rng):
+    """Merge the nodes of level 'g' matched by 'heavy_edge_matching' into
+    a coarser level; sets 'g.cmap'."""
+    n = g.n
+    match = heavy_edge_matching(g, maxvw, rng)
+    idx = np.arange(n)
+    leader = np.where(match >= 0, np.minimum(idx, match), idx)
+    isleader = leader == idx
+    ids = np.cumsum(isleader) - 1
+    cmap = ids[leader]
+    nc = int(isleader.sum())
+
+    cr, cc = cmap[g.rows], cmap[g.nbrs]
+    keep = cr != cc                 # edges inside merged nodes disappear
+    key = cr[keep] * nc + cc[keep]
+    w = g.ewgt[keep]
+    order = np.argsort(key, kind="stable")
+    key, w = key[order], w[order]
+    if len(key):
+        first = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1])))
+        w = np.add.reduceat(w, first)     # parallel edges add up
+        key = key[first]
+    rows, nbrs = key // nc, key % nc
+    offsets = np.zeros(nc+1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=nc), out=offsets[1:])
+    vwgt = np.bincount(cmap, weights=g.vwgt, minlength=nc)
+    g.cmap = cmap
+    return Level(offsets, nbrs, w, vwgt)
+
+
+def evaluate(g, part):
+    """Cost (weighted cut) and balance (weight of partition 0 minus that of
+    partition 1) of partition 'part' (an array) of level 'g'; also returns
+    the weight of edges from each node to the other partition ('ext') and
+    to its own partition ('int')."""
+    cross = part[g.rows] != part[g.nbrs]
+    ext = np.bincount(g.rows, weights=g.ewgt * cross, minlength=g.n)
+    intl = np.bincount(g.rows, weights=g.ewgt * ~cross, minlength=g.n)
+    bal = g.vwgt[part == 0].sum() - g.vwgt[part == 1].sum()
+    return ext.sum()/2, bal, ext, intl
+
+
+def refine(g, part, tol, rng, candidates=None, max_passes=8, limit=100):
+    """Improve partition 'part' of level 'g' with Fiduccia-Mattheyses passes.
+
+    In each pass nodes are moved, best gain first, each at most once; moves
+    keeping the imbalance within 'tol' plus twice the largest node weight, or
+    reducing it, are allowed.  The pass stops after 'limit' moves without
+    improvement, and the moves after the best partition seen are undone.
+    Partitions with imbalance within 'tol' are preferred; then, lower cost.
+    Only nodes on the boundary of the partition, or in 'candidates' for
+    the first pass, are considered for moving.  Ties between gains are
+    broken by random priorities drawn from 'rng' (a numpy Generator).
+
+    Returns the refined partition (an array), its cost, and its balance.
+    """
+    cost, bal, ext, intl = evaluate(g, part)
+    offsets, nbrs, ewgt, vwgt = g.offsets.tolist(), g.nbrs.tolist(), g.ewgt.tolist(), g.vwgt.tolist()
+    sol = part.tolist()
+    ext, intl = ext.tolist(), intl.tolist()
+    allow = tol + 2*g.vwgt.max()
+
+    def flip(i):
+        p = sol[i]
+        sol[i] = 1-p
+        ext[i], intl[i] = intl[i], ext[i]
+        for k in range(offsets[i], offsets[i+1]):
+            j, w = nbrs[k], ewgt[k]
+            if sol[j] == p:
+                ext[j] += w
+                intl[j] -= w
+            else:
+                ext[j] -= w
+                intl[j] += w
+
+    def key(cost, bal):
+        return (max(abs(bal) - tol, 0), cost, abs(bal))
+
+    for npass in range(max_passes):
+        if candidates is None:
+            candidates = np.flatnonzero(np.array(ext) > 0).tolist()
+        gains = np.array(intl)[candidates] - np.array(ext)[candidates]
+        prio = rng.random(g.n).tolist()     # random tie breaking
+        heap = list(zip(gains.tolist(), [prio[i] for i in candidates], candidates))
+        heapq.heapify(heap)
+        candidates = None
+        locked = set()
+        moved = []
+        bestkey, nbest, bestbal = key(cost, bal), 0, bal
+        curcost, curbal, nbad = cost, bal, 0
+        while heap and nbad < limit:
+            negain, _, i = heapq.heappop(heap)
+            if i in locked or negain != intl[i]-ext[i]:    # stale entry
+                continue
+            newbal = curbal - 2*vwgt[i] if sol[i] == 0 else curbal + 2*vwgt[i]
+            if abs(newbal) > allow and abs(newbal) >= abs(curbal):
+                continue
+            curcost += negain
+            curbal = newbal
+            flip(i)
+            locked.add(i)
+            moved.append(i)
+            for k in range(offsets[i], offsets[i+1]):
+                j = nbrs[k]
+                if j not in locked:
+                    heapq.heappush(heap, (intl[j]-ext[j], prio[j], j))
+            k = key(curcost, curbal)
+            if k < bestkey:
+                bestkey, nbest, bestbal, nbad = k, len(moved), curbal, 0
+            else:
+                nbad += 1
+        for i in reversed(moved[nbest:]):
+            flip(i)
+        if nbest == 0:
+            break
+        cost, bal = bestkey[1], bestbal
+        if LOG:
+            print("  pass %d: %d moves, cost %g, balance %g" % (npass, nbest, cost, bal))
+    return np.array(sol, dtype=np.int8), float(cost), bal
+
+
+def bfs_order(g, rng):
+    """Nodes of level 'g' in breadth-first order, from a random node (and
+    from other random nodes, for graphs with several components)."""
+    offsets, nbrs = g.offsets.tolist(), g.nbrs.tolist()
+    seen = [False] * g.n
+    order = []
+    for s in rng.permutation(g.n).tolist():
+        if seen[s]:
+            continue
+        seen[s] = True
+        k = len(order)
+        order.append(s)
+        while k < len(order):
+            i = order[k]
+            k += 1
+            for j in nbrs[offsets[i]:offsets[i+1]]:
+                if not seen[j]:
+                    seen[j] = True
+                    order.append(j)
+    return np.array(order)
+
+
+def initial_partition(g, tol, ntrials, rng):
+    """Partition level 'g' from 'ntrials' starts, each grown from a random
+    node in breadth-first order up to half of the total weight, and refined."""
+    half = g.vwgt.sum() / 2
+    best = None
+    for t in range(ntrials):
+        order = bfs_order(g, rng)
+        part = np.zeros(g.n, dtype=np.int8)
+        part[order[np.cumsum(g.vwgt[order]) > half]] = 1
+        part, cost, bal = refine(g, part, tol, rng, candidates=range(g.n))
+        k = (max(abs(bal) - tol, 0), cost)
+        if best is None or k < best[0]:
+            best = (k, part, cost, bal)
+    return best[1:]
+
+
+def multilevel(nodes, adj, eps=0., coarsen_to=200, ntrials=8, vweights=None, report=None):
+    """Multilevel graph partitioning.
+
+    Parameters:
+     * nodes, adj - graph definition (adjacency lists/sets, or a CSRGraph;
+       edge weights of a CSRGraph are taken into account)
+     * eps - tolerance on the imbalance, as a fraction of the total node weight
+     * coarsen_to - stop coarsening when the graph has at most this number of nodes
+     * ntrials - number of random starts for partitioning the coarsest graph
+     * vweights - list of node weights (default: 1 for every node)
+     * report - function used for output of the cost after each level
+
+    The imbalance allowed is the largest of 'eps' times the total weight and
+    the largest node weight: with unit node weights, an even number of
+    nodes and 'eps=0', each part has exactly half of the nodes, as in gpp_ts.
+
+    Returns the partition (list with 0 or 1 for each node) and its cost.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    g = csr_level(nodes, adj, vweights)
+    total = g.vwgt.sum()
+    maxvw = max(1.5 * total / coarsen_to, g.vwgt.max())   # limit on the weight of merged nodes
+    levels = [g]
+    while g.n > coarsen_to:
+        c = coarsen(g, maxvw, rng)
+        if c.n > MIN_REDUCTION * g.n:
+            g.cmap = None
+            break
+        levels.append(c)
+        g = c
+        if LOG:
+            print("level %d: %d nodes, %d edges" % (len(levels)-1, g.n, len(g.nbrs)//2))
+
+    def tolerance(g):   # exact balance may be impossible with the weights of merged nodes
+        return max(eps * total, g.vwgt.max())
+
+    part, cost, bal = initial_partition(g, tolerance(g), ntrials, rng)
+    if report:
+        report(cost, "level:%d" % (len(levels)-1))
+    for lvl in range(len(levels)-2, -1, -1):
+        g = levels[lvl]
+        part = part[g.cmap]
+        tol = tolerance(g)
+        part, cost, bal = refine(g, part, tol, rng)
+        if abs(bal) > tol:    # still imbalanced: try moving any node from the heavier side
+            heavy = 0 if bal > 0 else 1
+            part, cost, bal = refine(g, part, tol, rng, candidates=np.flatnonzero(part == heavy).tolist())
+        if report:
+            report(cost, "level:%d" % lvl)
+    return part.tolist(), cost
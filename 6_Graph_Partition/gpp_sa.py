@@ -1,38 +1,47 @@
+import abc
 import random
 import math
+import time
+import numpy as np
 
-LOG = True     # whether or not to print intermediate solutions
-from gpp_ts import construct
+LOG = False    # whether or not to print intermediate solutions
+Infinity = 1.e10000
+BATCH = 1024        # number of trials whose random numbers are drawn at once
+from gpp_ts import construct, weights, Boundary, csr_arrays
+from opt100.journal import Journal
 
-def evaluate(nodes, adj, sol, alpha):
+def evaluate(nodes, adj, sol, alpha, vweights=None):
     """Evaluate a solution.
 
     Input:
-      - nodes, adj - the instance's graph
+      - nodes, adj - the instance's graph (edges are weighted if 'adj'
+        is a CSRGraph with weights)
       - sol - the solution to evaluate
       - alpha - a penalty for imbalanced solutions
+      - vweights - weights of the vertices (default: 1 for each vertex)
 
     Determines:
-      - the cost of a solution, i.e., the number of edges going
-        from one partition to the other;
-      - bal - balance, i.e., the number of vertices in excess in partition 0
-      - s[i] - number of edges adjacent to i in the same partition;
-      - d[i] - number of edges adjacent to i in a different partition.
+      - the cost of a solution, i.e., the number (or total weight) of
+        edges going from one partition to the other;
+      - bal - balance, i.e., the number (weight) of vertices in excess in partition 0
+      - s[i] - number (weight) of edges adjacent to i in the same partition;
+      - d[i] - number (weight) of edges adjacent to i in a different partition.
     """
     s = [0 for i in nodes]
     d = [0 for i in nodes]
 
     bal = 0
     for i in nodes:
+        v = 1 if vweights is None else vweights[i]
         if sol[i] == 0:
-            bal += 1
+            bal += v
         else:
-            bal -= 1
-        for j in adj[i]:
+            bal -= v
+        for j, w in zip(adj[i], weights(adj, i)):
             if sol[i] == sol[j]:
-                s[i] += 1
+                s[i] += w
             else:
-                d[i] += 1
+                d[i] += w
 
     cost = 0
     for i in nodes:
@@ -43,45 +52,104 @@ def evaluate(nodes, adj, sol, alpha):
     return cost, bal, s, d
 
 
-def find_move_rnd(n, sol, alpha, s, d, bal):
-    """Find a random node to move from one part into the other."""
+def find_move_rnd(n, sol, alpha, s, d, bal, vweights=None, boundary=None, istar=None):
+    """Find a random node to move from one part into the other.
+
+    If 'boundary' (a gpp_ts.Boundary set) is given and not empty, the
+    node is drawn from it; otherwise, it is 'istar' if given (a node
+    drawn beforehand), or a random node.
+    """
     
-    istar = random.randint(0,n-1)
+    if boundary:
+        istar = boundary.choice()
+    elif istar is None:
+        istar = random.randint(0,n-1)
 
     part = sol[istar]
-    if part == 0 and bal > 0 or part == 1 and bal < 0:    # moving into the small partition
-        penalty = -2*alpha
+    if vweights is None:
+        if part == 0 and bal > 0 or part == 1 and bal < 0:    # moving into the small partition
+            penalty = -2*alpha
+        else:
+            penalty = 2*alpha
     else:
-        penalty = 2*alpha
+        v = vweights[istar]
+        newbal = bal - 2*v if part == 0 else bal + 2*v
+        penalty = alpha*(abs(newbal) - abs(bal))
 
     delta = s[istar] - d[istar] + penalty
     return istar,delta
 
 
-def update_move(adj, sol, s, d, bal, istar):
-    """Execute the chosen move."""
+def update_move(adj, sol, s, d, bal, istar, vweights=None, boundary=None):
+    """Execute the chosen move (updating 'boundary', if given)."""
 
     part = sol[istar]
     sol[istar] = 1-part   # change the partition for the chosen node
     
     # update cost structure for node istar
     s[istar],d[istar] = d[istar],s[istar]       # istar swaped partitions, so swap s and d
-    for j in adj[istar]:
+    for j, w in zip(adj[istar], weights(adj, istar)):
         if sol[j] == part:
-            s[j] -= 1
-            d[j] += 1
+            s[j] -= w
+            d[j] += w
         else:
-            s[j] += 1
-            d[j] -= 1
+            s[j] += w
+            d[j] -= w
+    if boundary is not None:
+        boundary.update(istar, d[istar])
+        for j in adj[istar]:
+            boundary.update(j, d[j])
 
     # update balance information
+    v = 1 if vweights is None else vweights[istar]
     if part == 0:
-        bal -= 2
+        bal -= 2*v
     else:
-        bal += 2
+        bal += 2*v
     return bal
 
 
+class Monitor:
+    """Metrics and trace output for 'annealing', by level:
+
+     1 - counters of accepted and rejected moves at each temperature
+         (lists 'temps', 'accepted', 'rejected'), and the timeline of the
+         best cost found ('timeline', with tuples (trial, seconds, cost));
+     2 - also print a line for each temperature, and one for each
+         'sample' accepted moves (with 'out').
+
+    Without a monitor, the annealing loop only checks for it once per
+    temperature, and (for level 2) once per accepted move.
+    """
+
+    def __init__(self, level=1, sample=1000, out=print):
+        self.level, self.sample, self.out = level, sample, out
+        self.temps, self.accepted, self.rejected, self.timeline = [], [], [], []
+        self.ntrials = 0        # trials at previous temperatures
+        self.nmoves = 0         # accepted moves
+        self.start = time.time()
+
+    def move(self, istar, delta, z, bal):
+        """Called for each accepted move, at level 2."""
+        self.nmoves += 1
+        if self.nmoves % self.sample == 0:
+            self.out("move %d: node %d, delta=%g, objective %g (bal = %g)" % (self.nmoves, istar, delta, z, bal))
+
+    def best(self, trials, z):
+        """Called when a new best solution is found, after 'trials' trials at the current temperature."""
+        self.timeline.append((self.ntrials + trials, time.time() - self.start, z))
+
+    def temperature(self, T, changes, trials, z, bal):
+        """Called at the end of each temperature (0 for the first stage,
+        where the initial temperature is estimated)."""
+        self.temps.append(T)
+        self.accepted.append(changes)
+        self.rejected.append(trials - changes)
+        self.ntrials += trials
+        if self.level >= 2:
+            self.out("temp: %g, %d/%d accepted, current objective %g (bal = %g)" % (T, changes, trials, z, bal))
+
+
 def metropolis(T, delta):
     "Metropolis criterion for new configuration acceptance"
     if delta <= 0 or random.random() <= math.exp(-(delta)/T):
@@ -90,27 +158,33 @@ def metropolis(T, delta):
         return False
 
 
-def estimate_temperature(n, sol, s, d, bal, X0, alpha):
+def acceptance_temperature(deltas, X):
+    """Temperature at which the average of the cost increases 'deltas' is
+    accepted with probability 'X' (0 if 'deltas' is empty)."""
+    if not deltas:
+        return 0.
+    return -sum(deltas)/len(deltas)/math.log(X)
+
+
+def estimate_temperature(n, sol, s, d, bal, X0, alpha, vweights=None, boundary=None):
     """Estimate initial temperature:
     check empirically based on a series of 'ntrials', that the estimated
-    temperature leads to a rate 'X0'% acceptance:
+    temperature leads to a rate 'X0'% acceptance.
+
+    ('annealing' does not use this separate pass: it samples the cost
+    increases on its first stage, see 'Schedule'.)
     """
 
     ntrials = 10*len(sol)
-    nsucc = 0
-    deltaZ = 0.0
+    deltas = []
     for i in range(0,ntrials):
-        istar,delta = find_move_rnd(n, sol, alpha, s, d, bal)
+        istar,delta = find_move_rnd(n, sol, alpha, s, d, bal, vweights, boundary)
         if delta > 0:
-            nsucc += 1
-            deltaZ += delta
-
-    if nsucc != 0:
-        deltaZ /= nsucc
+            deltas.append(delta)
 
-    # temperature approximation based on deltaZ
-    # (average difference on the non-improving objectives)
-    T = -deltaZ/math.log(X0)
+    # temperature approximation based on the average difference
+    # on the non-improving objectives
+    T = acceptance_temperature(deltas, X0)
     if LOG:
         print( "initial acceptance rate:", X0)
         print( "initial temperature:", T)
@@ -118,80 +192,496 @@ def estimate_temperature(n, sol, s, d, bal, X0, alpha):
     return T
 
 
+class Schedule(abc.ABC):
+    """Cooling schedule for 'annealing'; base class, with the freezing test.
+
+    The first stage of the annealing only accepts moves that do not
+    increase the cost, and keeps the increases of the others; with them,
+    'start(deltas, X0)' determines the initial temperature, for a rate
+    'X0' of acceptance of non-improving moves.  After each stage (of
+    'trials' trials, with 'changes' accepted moves) at temperature T,
+    'next(T, changes, trials)' returns the temperature for the next one,
+    or None for stopping; 'improved()' is called when a new best solution
+    is found.
+
+    The search is frozen after 'freezelim' stages with less than a
+    fraction 'minpercent' of accepted moves, since the last improvement.
+    Then it stops or, while there are 'reheats' left, restarts at
+    'reheat' times the initial temperature.  Subclasses must define
+    'cool'; the base class cannot be instantiated.
+    """
+    deadline = None     # wall-clock time limit (as time.time()), also checked within stages
+
+    def __init__(self, freezelim, minpercent, reheats=0, reheat=0.5):
+        self.freezelim, self.minpercent = freezelim, minpercent
+        self.reheats, self.reheat = reheats, reheat
+
+    def start(self, deltas, X0):
+        self.T0 = acceptance_temperature(deltas, X0)
+        self.X0 = X0
+        self.nfrozen = 0
+        self.left = self.reheats      # reheats still available
+        return self.T0
+
+    def improved(self):
+        self.nfrozen = 0
+
+    def next(self, T, changes, trials):
+        if float(changes)/trials < self.minpercent:
+            self.nfrozen += 1
+        if self.nfrozen < self.freezelim:
+            return self.cool(T, changes, trials)
+        if self.left == 0:
+            return None
+        self.left -= 1
+        self.nfrozen = 0
+        if LOG:
+            print( "frozen, reheating")
+        return self.restart()
+
+    def restart(self):
+        """Temperature for reheating."""
+        return self.reheat * self.T0
+
+    @abc.abstractmethod
+    def cool(self, T, changes, trials):
+        """Temperature for the next stage, after a stage at temperature 'T'
+        (None for stopping)."""
+
+
+class Geometric(Schedule):
+    """Fixed cooling: the temperature is multiplied by 'tempfactor' after each stage."""
+
+    def __init__(self, tempfactor, freezelim, minpercent, reheats=0, reheat=0.5):
+        Schedule.__init__(self, freezelim, minpercent, reheats, reheat)
+        self.tempfactor = tempfactor
+
+    def cool(self, T, changes, trials):
+        return T * self.tempfactor
+
+
+class Adaptive(Schedule):
+    """Cooling by feedback from the acceptance rate.
+
+    The target rate of acceptance starts at X0, and is multiplied by
+    'tempfactor' after each stage.  As the rate at temperature T is about
+    exp(-delta/T), for the average cost increase delta, the temperature
+    is scaled by log(rate)/log(target) for getting closer to the target
+    (but at most halved or doubled).  Thus, it cools slowly while few
+    moves are accepted, and fast while too many are.  After reheating to
+    'reheat' times T0, the target restarts at X0**(1/reheat).
+    """
 
-def annealing(nodes, adj, sol, initprob, L, tempfactor, freezelim, minpercent, alpha, report):
+    def __init__(self, tempfactor, freezelim, minpercent, reheats=0, reheat=0.5):
+        Schedule.__init__(self, freezelim, minpercent, reheats, reheat)
+        self.tempfactor = tempfactor
+
+    def start(self, deltas, X0):
+        self.target = X0
+        return Schedule.start(self, deltas, X0)
+
+    def restart(self):
+        self.target = self.X0 ** (1/self.reheat)
+        return Schedule.restart(self)
+
+    def cool(self, T, changes, trials):
+        rate = float(changes)/trials
+        self.target *= self.tempfactor
+        if rate <= 0:
+            return 2*T
+        if rate >= 1:
+            return T/2
+        return T * min(max(math.log(rate)/math.log(self.target), 0.5), 2.)
+
+
+class Deadline(Schedule):
+    """Cooling for finishing at a wall-clock 'deadline' (as time.time()).
+
+    The temperature decreases exponentially with the elapsed time, from
+    T0 when the schedule starts to the temperature at which the average
+    cost increase is accepted with probability 'final', at the deadline;
+    the run stops then, not when frozen.
+    """
+
+    def __init__(self, deadline, final=0.001):
+        Schedule.__init__(self, Infinity, 0)
+        self.deadline, self.final = deadline, final
+
+    def start(self, deltas, X0):
+        T0 = Schedule.start(self, deltas, X0)
+        self.Tf = acceptance_temperature(deltas, self.final)
+        self.t0 = time.time()
+        return T0
+
+    def cool(self, T, changes, trials):
+        now = time.time()
+        if now >= self.deadline:
+            return None
+        return self.T0 * (self.Tf/self.T0) ** ((now - self.t0) / (self.deadline - self.t0))
+
+
+
+def annealing(nodes, adj, sol, initprob, L, tempfactor, freezelim, minpercent, alpha, report,
+              vweights=None, tol=0, boundary=False, monitor=None, schedule=None):
     """Simulated annealing for the graph partitioning problem
 
     Parameters:
-     * nodes, adj - graph definition
+     * nodes, adj - graph definition (edges are weighted if 'adj' is a CSRGraph with weights)
      * sol - initial solution
      * initprob - initial acceptance rate
      * L - number of tentatives at each temperature
      * tempfactor - cooling ratio
      * freezelim - max number of iterations with less that minpercent acceptances
      * minpercent - percentage of accepted moves for being not frozen
+     (the last three are only used for the default schedule)
      * report - function used for output of best found solutions
+     * vweights - weights of the vertices (default: 1 for each vertex)
+     * tol - largest difference between the weights of the two partitions
+       for a solution to be considered balanced (its cost includes the
+       penalty 'alpha' times that difference)
+     * boundary - if true, only nodes on the boundary of the partition are
+       proposed for moving (see gpp_ts.Boundary)
+     * monitor - a Monitor, collecting metrics and trace output (if LOG
+       is set and no monitor is given, every accepted move is printed)
+     * schedule - a Schedule, e.g. Adaptive or Deadline (default:
+       Geometric(tempfactor, freezelim, minpercent))
+
+    The initial temperature is estimated from the cost increases sampled
+    on the first stage, where only moves not increasing the cost are
+    accepted; if none was found, the search stops after that stage.
      """
+    if monitor is None and LOG:
+        monitor = Monitor(level=2, sample=1)
+    trace = monitor is not None and monitor.level >= 2
+    if monitor is not None:
+        monitor.start = time.time()
     n = len(nodes)
-    z,bal,s,d = evaluate(nodes, adj, sol, alpha)
-    if bal == 0:        # partition is balanced
-        solstar,zstar = list(sol), z        # best solution found so far
+    z,bal,s,d = evaluate(nodes, adj, sol, alpha, vweights)
+    bound = Boundary(nodes, d) if boundary else None
+    journal = Journal(sol)      # keeps the best solution found so far
+    zstar = Infinity
+    if abs(bal) <= tol:         # partition is balanced
+        zstar = z
+        journal.mark()
         if report:
             report(zstar)
 
-    T = estimate_temperature(n, sol, s, d, bal, initprob, alpha)
-    if LOG:
-        print( "initial temp:", T, " current objective:", z, "(bal = %d)" % bal)
-        print( "current solution:", sol)
-        print()
-        
-    if T == 0:  # frozen, return imediately
-        print( "Could not determine initial temperature, giving up")
-        exit(-1)
-        
-
+    if schedule is None:
+        schedule = Geometric(tempfactor, freezelim, minpercent)
+    deadline = schedule.deadline
+    record = journal.record
+    rng = np.random.default_rng(random.getrandbits(64))
 
-    nfrozen = 0 # count frozen iterations
-    while nfrozen < freezelim:
+    T = 0.
+    deltas = []         # cost increases sampled on the first stage
+    while True:
         changes, trials = 0,0
         while trials < L:
+            if deadline is not None and trials % 256 == 0 and time.time() >= deadline:
+                break
+            t = trials % BATCH
+            if t == 0:      # draw the nodes and the acceptance thresholds of the next trials
+                k = min(BATCH, L - trials)
+                draws = rng.integers(0, n, k).tolist()
+                limits = [0.]*k if T == 0 else (np.log(rng.random(k)) * -T).tolist()
             trials += 1
-            istar,delta = find_move_rnd(n, sol, alpha, s, d, bal)
-            if metropolis(T, delta):
+            istar,delta = find_move_rnd(n, sol, alpha, s, d, bal, vweights, bound, draws[t])
+            if deltas is not None and delta > 0:
+                deltas.append(delta)
+                continue
+            if delta <= limits[t]:  # Metropolis criterion: u <= exp(-delta/T)
                 changes += 1
-
-                if LOG:
-                    print( "accepted move on index %d, with delta=%g" % (istar,delta))
-
-                bal = update_move(adj, sol, s, d, bal, istar)
+                bal = update_move(adj, sol, s, d, bal, istar, vweights, bound)
+                record(istar, 1-sol[istar])
                 z += delta
+                if trace:
+                    monitor.move(istar, delta, z, bal)
 
-                if bal == 0:    # partition is balanced
+                if abs(bal) <= tol:     # partition is balanced
                     if z < zstar: # best solution found so far
-                        solstar,zstar = list(sol),z
-                        nfrozen = 0
+                        zstar = z
+                        journal.mark()
+                        schedule.improved()
+                        if monitor:
+                            monitor.best(trials, zstar)
                         if report:
                             report(zstar)
 
-                if LOG:
-                    print( "temp:", T, " current objective:", z, "(bal = %d)" % bal)
-                    print( "%d changes, frozen = %d/%d" % (changes, nfrozen+1, freezelim), \
-                          "tentative = %d/%d" % (trials,L))
-                    print( "current solution:", sol)
-                    print()
-
-                    # # check if there was some error on cost evaluation:
-                    # zp,balp,sp,dp = evaluate(nodes, adj, sol, alpha)
-                    # assert balp == bal
-                    # assert abs(zp-z) < 1.e-9    # floating point approx.equality
-
-        T *= tempfactor # decrease temperature
-        if float(changes)/trials < minpercent:
-            nfrozen += 1
+                # # check if there was some error on cost evaluation:
+                # zp,balp,sp,dp = evaluate(nodes, adj, sol, alpha, vweights)
+                # assert balp == bal
+                # assert abs(zp-z) < 1.e-9    # floating point approx.equality
+
+        if trials == 0:     # deadline reached
+            break
+        if monitor:
+            monitor.temperature(T, changes, trials, z, bal)
+        if deltas is not None:
+            T = schedule.start(deltas, initprob)
+            deltas = None
+            if LOG:
+                print( "initial temp:", T, " current objective:", z, "(bal = %d)" % bal)
+                print( "current solution:", sol)
+                print()
+            if T == 0:  # frozen, return imediately
+                break
+        else:
+            T = schedule.next(T, changes, trials) # decrease temperature
+            if T is None:
+                break
 
     if report:
         report(zstar)
-    return solstar, zstar
+    return journal.best(), zstar
             
 
 
+
+class Replicas:
+    """State of R independent annealing chains, as rows of 2D arrays.
+
+    Each row holds a solution of the same graph, and the cost structure
+    of 'evaluate': X[r,i] is the partition of node i in chain r, S[r,i] and
+    D[r,i] the weight of its edges to the same and to the other partition;
+    bal[r] and z[r] are the chain's balance and (penalized) cost, and
+    best[r], zbest[r] the best balanced solution it found.
+    The changes in cost of a block of trials are computed for all the
+    chains at once, with NumPy operations (see 'sweep').
+    """
+
+    def __init__(self, nodes, adj, sols, alpha, vweights=None, tol=0):
+        self.offsets, self.nbrs, self.ewgt, self.vwgt = csr_arrays(nodes, adj, vweights)
+        self.deg = np.diff(self.offsets)
+        rows = np.repeat(np.arange(len(self.vwgt)), self.deg)
+        off, nb, ew = self.offsets.tolist(), self.nbrs.tolist(), self.ewgt.tolist()
+        self.adjw = [list(zip(nb[off[i]:off[i+1]], ew[off[i]:off[i+1]])) for i in range(len(off)-1)]
+        self.vwlist = self.vwgt.tolist()
+        self.alpha, self.tol = alpha, tol
+        self.X = np.array(sols, dtype=np.int8)
+        self.R, self.n = self.X.shape
+        self.S = np.zeros((self.R, self.n))
+        self.D = np.zeros((self.R, self.n))
+        for r in range(self.R):
+            cross = self.X[r, rows] != self.X[r, self.nbrs]
+            self.D[r] = np.bincount(rows, weights=self.ewgt * cross, minlength=self.n)
+            self.S[r] = np.bincount(rows, weights=self.ewgt * ~cross, minlength=self.n)
+        self.bal = (self.vwgt * (1 - 2*self.X)).sum(axis=1)
+        self.z = self.D.sum(axis=1)/2 + alpha*abs(self.bal)
+        self.best = self.X.copy()
+        self.zbest = np.where(abs(self.bal) <= tol, self.z, Infinity)
+
+    def deltas(self, rows, i):
+        """Change in the cost of chains 'rows' when moving their nodes 'i',
+        and their new balance."""
+        v = self.vwgt[i]
+        newbal = self.bal[rows] - 2*v*(1 - 2*self.X[rows, i])
+        delta = self.S[rows, i] - self.D[rows, i] + self.alpha*(abs(newbal) - abs(self.bal[rows]))
+        return delta, newbal
+
+    def estimate_temperature(self, X0, rng):
+        """Temperature for a rate 'X0' of acceptance of non-improving moves,
+        estimated on 10*n random trials (spread over the chains)."""
+        k = -(-10*self.n // self.R)
+        rows = np.repeat(np.arange(self.R), k)
+        delta, newbal = self.deltas(rows, rng.integers(0, self.n, len(rows)))
+        delta = delta[delta > 0]
+        if len(delta) == 0:
+            return 0.
+        return -delta.mean()/math.log(X0)
+
+    def sweep(self, T, steps, rng, batch=BATCH):
+        """Do 'steps' trials in each chain, at temperature 'T' (a number,
+        or an array with one temperature per chain).
+
+        Trials are done in blocks of 'batch': the nodes and random numbers
+        of a block are drawn at once for all the chains, and the changes in
+        cost of all its trials are computed in one NumPy operation, with a
+        lower bound on the balance penalty.  Each chain then goes through
+        the block in order; trials rejected even with that bound are
+        skipped, unless their node or one of its neighbors was moved
+        earlier in the block, and the others are evaluated again before
+        deciding.  Returns the number of accepted moves in each chain,
+        and a boolean array telling which chains improved their best
+        solution.
+        """
+        R, n = self.R, self.n
+        accepted = np.zeros(R, dtype=np.int64)
+        improved = np.zeros(R, dtype=bool)
+        T = np.broadcast_to(np.asarray(T, dtype=float), (R,))
+        alpha, tol, adjw, vw = self.alpha, self.tol, self.adjw, self.vwlist
+        chain = np.arange(R)[:,None]
+        done = 0
+        while done < steps:
+            B = min(batch, steps - done)
+            I = rng.integers(0, n, (R, B))
+            thr = np.log(rng.random((R, B))) * -T[:,None]     # accept if delta <= thr, i.e., u <= exp(-delta/T)
+            sd = self.S[chain, I] - self.D[chain, I]
+            cand = sd - 2*alpha*self.vwgt[I] <= thr          # the balance penalty is at least -2*alpha*v
+            for r in range(R):
+                X, S, D = self.X[r], self.S[r], self.D[r]
+                bal, z, zbest = float(self.bal[r]), float(self.z[r]), float(self.zbest[r])
+                moved = set()   # nodes whose S, D or partition changed in this block
+                for i, c, sdi, th in zip(I[r].tolist(), cand[r].tolist(), sd[r].tolist(), thr[r].tolist()):
+                    if i in moved:
+                        sdi = S[i] - D[i]
+                    elif not c:
+                        continue
+                    part = 1 - X[i]         # new partition of node i
+                    newbal = bal - 2*vw[i] if part else bal + 2*vw[i]
+                    delta = sdi + alpha*(abs(newbal) - abs(bal))
+                    if delta > th:
+                        continue
+                    X[i] = part
+                    S[i], D[i] = D[i], S[i]
+                    moved.add(i)
+                    for j, w in adjw[i]:
+                        if X[j] == part:
+                            S[j] += w
+                            D[j] -= w
+                        else:
+                            S[j] -= w
+                            D[j] += w
+                        moved.add(j)
+                    bal = newbal
+                    z += delta
+                    accepted[r] += 1
+                    if abs(bal) <= tol and z < zbest:
+                        zbest = z
+                        self.best[r] = X
+                        improved[r] = True
+                self.bal[r], self.z[r], self.zbest[r] = bal, z, zbest
+            done += B
+        return accepted, improved
+
+def annealing_batch(nodes, adj, sols, initprob, L, tempfactor, freezelim, minpercent, alpha,
+                    report=None, vweights=None, tol=0):
+    """Simulated annealing of several independent chains, vectorised with NumPy.
+
+    Parameters are as in 'annealing', except for:
+     * sols - list with an initial solution for each chain
+    All the chains follow the same cooling schedule, and the run stops
+    when every chain is frozen (a chain improving its best solution is
+    not frozen).
+
+    Returns the best solution found by any chain, and its cost.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    chains = Replicas(nodes, adj, sols, alpha, vweights, tol)
+    r = int(chains.zbest.argmin())
+    solstar, zstar = None, Infinity
+    if chains.zbest[r] < Infinity:
+        solstar, zstar = chains.best[r].tolist(), float(chains.zbest[r])
+        if report:
+            report(zstar)
+
+    T = chains.estimate_temperature(initprob, rng)
+    if T == 0:  # frozen, return imediately
+        return solstar, zstar
+
+    nfrozen = np.zeros(chains.R, dtype=np.int64)
+    while (nfrozen < freezelim).any():
+        accepted, improved = chains.sweep(T, L, rng)
+        nfrozen[improved] = 0
+        r = int(chains.zbest.argmin())
+        if chains.zbest[r] < zstar:
+            solstar, zstar = chains.best[r].tolist(), float(chains.zbest[r])
+            if report:
+                report(zstar)
+        if LOG:
+            print( "temp:", T, " objectives:", chains.z.min(), "-", chains.z.max(), \
+                  " acceptance: %g" % (accepted.mean()/L))
+        T *= tempfactor
+        nfrozen[accepted < minpercent*L] += 1
+
+    return solstar, zstar
+
+
+def temperature_ladder(Tmin, Tmax, R):
+    """Geometric sequence of 'R' temperatures, from 'Tmin' to 'Tmax'."""
+    if R == 1:
+        return [Tmin]
+    return [Tmin * (Tmax/Tmin)**(k/(R-1)) for k in range(R)]
+
+
+def parallel_tempering(nodes, adj, sols, temps, nsweeps, L, alpha, report=None, vweights=None, tol=0):
+    """Parallel tempering (replica exchange) for the graph partitioning problem.
+
+    Parameters:
+     * nodes, adj - graph definition
+     * sols - list with an initial solution for each replica
+     * temps - temperature of each level of the ladder (increasing; as
+       many as replicas), e.g. from 'temperature_ladder'
+     * nsweeps - number of sweeps; each sweep does 'L' trials in every
+       replica, at the temperature of its level, followed by attempts to
+       exchange the replicas of neighboring levels (alternately the pairs
+       of levels (0,1), (2,3), ... and (1,2), (3,4), ...)
+     * alpha - a penalty for imbalanced solutions
+     * report - function used for output of best found solutions
+     * vweights, tol - vertex weights and balance tolerance, as in 'annealing'
+
+    The replicas are vectorised with NumPy (see Replicas); exchanging two
+    replicas swaps their temperatures, not their solutions.  The
+    exchange of replicas with costs z_a (at level k) and z_b (at level
+    k+1) is accepted with probability min(1, exp((1/T_k - 1/T_k+1)*(z_a - z_b))).
+
+    Returns the best solution, its cost, and statistics for tuning the
+    ladder: a dictionary with the move acceptance rate of each replica
+    ('acceptance'), the number of round trips each replica made from the
+    lowest level to the highest and back ('round_trips'), and the
+    exchange acceptance rate between each pair of neighboring levels
+    ('exchange').  Replicas with few or no round trips show a ladder
+    where exchanges do not carry solutions across the temperatures.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    chains = Replicas(nodes, adj, sols, alpha, vweights, tol)
+    R = chains.R
+    assert len(temps) == R
+    temps = np.asarray(temps, dtype=float)
+    replica = np.arange(R)      # replica[k]: replica at level k
+    level = np.arange(R)        # level[r]: level of replica r
+    moves = np.zeros(R)         # accepted moves of each replica
+    trips = np.zeros(R, dtype=int)      # round trips (lowest, highest, lowest level) of each replica
+    heading = np.zeros(R, dtype=int)    # 1: was at the lowest level, -1: then at the highest
+    heading[0] = 1
+    tried = np.zeros(R-1)       # exchange attempts between levels k and k+1
+    swapped = np.zeros(R-1)     # accepted exchanges between levels k and k+1
+
+    r = int(chains.zbest.argmin())
+    solstar, zstar = None, Infinity
+    if chains.zbest[r] < Infinity:
+        solstar, zstar = chains.best[r].tolist(), float(chains.zbest[r])
+        if report:
+            report(zstar)
+
+    for sweep in range(nsweeps):
+        accepted, improved = chains.sweep(temps[level], L, rng)
+        moves += accepted
+        r = int(chains.zbest.argmin())
+        if chains.zbest[r] < zstar:
+            solstar, zstar = chains.best[r].tolist(), float(chains.zbest[r])
+            if report:
+                report(zstar)
+
+        k = np.arange(sweep % 2, R-1, 2)    # lower level of each pair
+        a, b = replica[k], replica[k+1]
+        x = (1/temps[k] - 1/temps[k+1]) * (chains.z[a] - chains.z[b])
+        ok = np.log(rng.random(len(k))) < x
+        tried[k] += 1
+        swapped[k[ok]] += 1
+        replica[k[ok]], replica[k[ok]+1] = b[ok], a[ok]
+        level[replica] = np.arange(R)
+        if R > 1:
+            top = replica[R-1]
+            if heading[top] == 1:
+                heading[top] = -1
+            back = replica[0]
+            if heading[back] == -1:
+                trips[back] += 1
+            heading[back] = 1
+        if LOG:
+            print( "sweep %d: best %g, costs by level:" % (sweep, zstar), chains.z[replica])
+
+    stats = {"acceptance": (moves / (nsweeps*L)).tolist(),
+             "round_trips": trips.tolist(),
+             "exchange": (swapped / np.maximum(tried, 1)).tolist()}
+    return solstar, zstar, stats
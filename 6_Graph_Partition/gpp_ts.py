@@ -6,9 +6,15 @@ problem where: given a graph with an even number of nodes, find a
 partition into half of the nodes that minimizes the number of edges
 crossing it to the other partition.
 
+For graphs with weighted edges (a CSRGraph from graphtools, with
+weights) the weight of the edges crossing the partition is minimized.
+
 This file contains a set of functions to illustrate:
   - construction heuristics
   - tabu search
+  - gain buckets (Fiduccia-Mattheyses) for selecting moves
+  - boundary sets, restricting moves to nodes adjacent to the other partition
+  - an undo log, for keeping the best solution without copying it
 
 Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
 """
@@ -16,8 +22,44 @@ Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
 
 LOG = False     # whether or not to print intermediate solutions
 import random
+from itertools import chain, repeat
+import numpy as np
+from opt100.journal import Journal
 Infinity = 1.e10000
 
+
+def weights(adj, i):
+    """Weights of the edges adjacent to node 'i', aligned with 'adj[i]'
+    (1 for each edge, if the graph is not weighted)."""
+    if getattr(adj, "weights", None) is None:
+        return repeat(1)
+    return adj.edge_weights(i).tolist()
+
+
+def csr_arrays(nodes, adj, vweights=None):
+    """Graph in compressed sparse row (CSR) arrays, from adjacency
+    lists/sets or a CSRGraph from graphtools.
+
+    Returns (offsets, nbrs, ewgt, vwgt): node i has neighbors
+    'nbrs[offsets[i]:offsets[i+1]]', with edge weights 'ewgt' at the same
+    positions, and 'vwgt[i]' is its weight (1 if not weighted).
+    """
+    n = len(nodes)
+    if hasattr(adj, "offsets"):     # CSRGraph
+        offsets = np.asarray(adj.offsets, dtype=np.int64)
+        nbrs = np.asarray(adj.neighbors, dtype=np.int64)
+        ewgt = None if adj.weights is None else np.asarray(adj.weights, dtype=np.float64)
+    else:
+        deg = np.fromiter((len(adj[i]) for i in nodes), dtype=np.int64, count=n)
+        offsets = np.zeros(n+1, dtype=np.int64)
+        np.cumsum(deg, out=offsets[1:])
+        nbrs = np.fromiter(chain.from_iterable(adj[i] for i in nodes), dtype=np.int64, count=offsets[-1])
+        ewgt = None
+    if ewgt is None:
+        ewgt = np.ones(len(nbrs))
+    vwgt = np.ones(n) if vweights is None else np.asarray(vweights, dtype=np.float64)
+    return offsets, nbrs, ewgt, vwgt
+
 def construct(nodes):
     """A simple construction method.
 
@@ -37,10 +79,10 @@ def evaluate(nodes, adj, sol):
     """Evaluate a solution.
 
     Determines:
-      - the cost of a solution, i.e., the number of edges going
-        from one partition to the other;
-      - s[i] - number of edges adjacent to i in the same partition;
-      - d[i] - number of edges adjacent to i in a different partition.
+      - the cost of a solution, i.e., the number (or total weight) of
+        edges going from one partition to the other;
+      - s[i] - number (weight) of edges adjacent to i in the same partition;
+      - d[i] - number (weight) of edges adjacent to i in a different partition.
     """
     assert sum(sol) == len(nodes)//2
     cost = 0
@@ -48,11 +90,11 @@ def evaluate(nodes, adj, sol):
     d = [0 for i in nodes]
 
     for i in nodes:
-        for j in adj[i]:
+        for j, w in zip(adj[i], weights(adj, i)):
             if sol[i] == sol[j]:
-                s[i] += 1
+                s[i] += w
             else:
-                d[i] += 1
+                d[i] += w
     for i in nodes:
         cost += d[i]
     return cost/2, s, d
@@ -79,7 +121,7 @@ def find_move_rnd(part, nodes, adj, sol, s, d, tabu, tabulen, iteration):
 
     # there are no non-tabu moves, clear tabu list
     print( "blocked, no non-tabu move")
-    tabu = [0 for i in nodes]
+    tabu = [0 for i in tabu]
     return find_move_rnd(part, nodes, adj, sol, s, d, tabu, tabulen, iteration)
     
 
@@ -98,58 +140,237 @@ def find_move(part, nodes, adj, sol, s, d, tabu, tabulen, iteration):
         return istar, mindelta
     
     print( "blocked, no non-tabu move")
-    tabu = [0 for i in nodes]
+    tabu = [0 for i in tabu]
     return find_move(part, nodes, adj, sol, s, d, tabu, tabulen, iteration)
     
 
-def move(part, nodes, adj, sol, s, d, tabu, tabulen, iteration):
-    """Determine and execute the best non-tabu move."""
+class GainBuckets:
+    """Gain buckets (Fiduccia and Mattheyses, 1982) for selecting moves.
+
+    The non-tabu nodes of each partition are kept in doubly-linked lists,
+    one for each value of the gain d[i]-s[i] of moving the node to the
+    other partition (i.e., minus the delta of 'find_move').  The best
+    non-tabu move is at the head of the highest non-empty list.
+
+    Tabu nodes are taken out of the lists, and put back at the iteration
+    when their tabu status expires.  After a move, only the moved node
+    and its neighbors change lists, so updates take O(deg).
+
+    Gains index the lists, so edge weights must be integers.
+    """
+
+    def __init__(self, nodes, adj, sol, s, d, tabu=None, iteration=0):
+        n = len(nodes)
+        if getattr(adj, "weights", None) is None:
+            wdeg = [len(adj[i]) for i in nodes]
+        else:
+            if adj.weights.dtype.kind not in "iub" and (adj.weights != adj.weights.round()).any():
+                raise ValueError("gain buckets need integer edge weights")
+            wdeg = [int(sum(weights(adj, i))) for i in nodes]
+        self.offset = max(wdeg + [0])   # gains are in [-offset,offset]
+        nb = 2*self.offset + 1
+        self.head = [[-1]*nb, [-1]*nb]  # head[part][gain+offset]: first node in list, or -1
+        self.nxt = [-1]*n
+        self.prv = [-1]*n
+        self.bucket = [None]*n          # list where each node is, None if tabu
+        self.top = [-1, -1]             # upper bound on the highest non-empty list of each part
+        self.pending = {}               # pending[it]: nodes to put back on iteration 'it'
+        for i in nodes:
+            if tabu is None or tabu[i] <= iteration:
+                self.insert(i, sol[i], d[i]-s[i])
+            else:
+                self.pending.setdefault(tabu[i], []).append(i)
+
+    def insert(self, i, part, gain):
+        b = int(gain) + self.offset
+        head = self.head[part]
+        j = head[b]
+        self.nxt[i], self.prv[i] = j, -1
+        if j >= 0:
+            self.prv[j] = i
+        head[b] = i
+        self.bucket[i] = (part, b)
+        if b > self.top[part]:
+            self.top[part] = b
+
+    def remove(self, i):
+        part, b = self.bucket[i]
+        p, q = self.prv[i], self.nxt[i]
+        if p >= 0:
+            self.nxt[p] = q
+        else:
+            self.head[part][b] = q
+        if q >= 0:
+            self.prv[q] = p
+        self.bucket[i] = None
+
+    def best(self, part):
+        """Node with the largest gain among non-tabu nodes in 'part', or -1."""
+        head = self.head[part]
+        b = self.top[part]
+        while b >= 0 and head[b] < 0:
+            b -= 1
+        self.top[part] = b
+        return head[b] if b >= 0 else -1
+
+    def release(self, iteration, sol, s, d, tabu):
+        """Put back nodes whose tabu status expires at 'iteration'."""
+        for i in self.pending.pop(iteration, []):
+            if self.bucket[i] is None and tabu[i] == iteration:
+                self.insert(i, sol[i], d[i]-s[i])
+
+    def clear(self, sol, s, d, tabu):
+        """Remove the tabu status of all nodes."""
+        for nodes in self.pending.values():
+            for i in nodes:
+                tabu[i] = 0
+                if self.bucket[i] is None:
+                    self.insert(i, sol[i], d[i]-s[i])
+        self.pending = {}
+
+    def find_move(self, part, sol, s, d, tabu, iteration):
+        """Find the best non-tabu move into partition type 'part'."""
+        self.release(iteration, sol, s, d, tabu)
+        i = self.best(1-part)
+        if i < 0:
+            if LOG: print( "blocked, no non-tabu move")
+            self.clear(sol, s, d, tabu)
+            i = self.best(1-part)
+        return i, s[i] - d[i]
+
+    def update(self, i, adj, sol, s, d, tabu, iteration):
+        """Update the lists after node 'i' was moved, becoming tabu."""
+        self.remove(i)
+        if tabu[i] <= iteration:
+            self.insert(i, sol[i], d[i]-s[i])
+        else:
+            self.pending.setdefault(tabu[i], []).append(i)
+        bucket, remove, insert = self.bucket, self.remove, self.insert
+        for j in adj[i]:
+            if bucket[j] is not None:
+                remove(j)
+                insert(j, sol[j], d[j]-s[j])
+
+
+class Boundary:
+    """Set of the nodes on the boundary of the partition, i.e., with d[i] > 0.
+
+    Moving an interior node (d[i] == 0) can only increase the cut, so
+    the search may restrict candidate moves to this set.  Nodes are kept
+    in a list, with their positions in a dictionary, for O(1) insertion,
+    removal, and random choice.
+    """
+
+    def __init__(self, nodes, d):
+        self.items = [i for i in nodes if d[i] > 0]
+        self.pos = {i: k for k, i in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, i):
+        return i in self.pos
+
+    def update(self, i, di):
+        """Insert or remove node 'i', after d[i] was changed to 'di'."""
+        if di > 0:
+            if i not in self.pos:
+                self.pos[i] = len(self.items)
+                self.items.append(i)
+        elif i in self.pos:
+            k = self.pos.pop(i)
+            last = self.items.pop()
+            if last != i:
+                self.items[k] = last
+                self.pos[last] = k
+
+    def choice(self):
+        """Random boundary node."""
+        return random.choice(self.items)
+
+
+def move(part, nodes, adj, sol, s, d, tabu, tabulen, iteration, buckets=None, boundary=None, journal=None):
+    """Determine and execute the best non-tabu move.
+
+    If 'buckets' (a GainBuckets structure) is given, the move is selected
+    through it, with deterministic tabu status, instead of scanning all
+    nodes with probabilistic tabu status in 'find_move_rnd'.
+
+    If 'boundary' (a Boundary set) is given, it is updated, and only its
+    nodes are scanned (all nodes, if the partition has no boundary).
+    The move is recorded in 'journal' (a Journal), if given.
+    """
 
     # find the best move
     # i, delta = find_move(part, nodes, adj, sol, s, d, tabu, tabulen, iteration)
-    i, delta = find_move_rnd(part, nodes, adj, sol, s, d, tabu, tabulen, iteration)
+    if buckets is None:
+        cand = boundary if boundary else nodes
+        i, delta = find_move_rnd(part, cand, adj, sol, s, d, tabu, tabulen, iteration)
+    else:
+        i, delta = buckets.find_move(part, sol, s, d, tabu, iteration)
     sol[i] = part
+    if journal is not None:
+        journal.record(i, 1-part)
     tabu[i] = iteration + tabulen
     # tabu[i] = iteration + randint(1,tabulen) # another possibility
 
     # update cost structure for node i
     s[i],d[i] = d[i],s[i]       # i swaped partitions, so swap s and d
-    for j in adj[i]:
+    for j, w in zip(adj[i], weights(adj, i)):
         if sol[j] != part:
-            s[j] -= 1
-            d[j] += 1
+            s[j] -= w
+            d[j] += w
         else:
-            s[j] += 1
-            d[j] -= 1
+            s[j] += w
+            d[j] -= w
+    if boundary is not None:
+        boundary.update(i, d[i])
+        for j in adj[i]:
+            boundary.update(j, d[j])
+    if buckets is not None:
+        buckets.update(i, adj, sol, s, d, tabu, iteration)
     return delta
 
         
-def tabu_search(nodes, adj, sol, max_iter, tabulen, report = None):
-    """Execute a tabu search run."""
+def tabu_search(nodes, adj, sol, max_iter, tabulen, report = None, fm = False, boundary = False):
+    """Execute a tabu search run.
+
+    If 'fm' is true, moves are selected with gain buckets (see GainBuckets),
+    in O(1) instead of O(n) per move.  Otherwise, if 'boundary' is true,
+    only nodes on the boundary of the partition are candidates for moving
+    (see Boundary).
+    """
     assert len(nodes)%2 == 0    # graph partitioning is only for graphs with an even number of nodes
     cost, s, d = evaluate(nodes, adj, sol)
     tabu = [0 for i in nodes]   # iteration up to which node 'i' is tabu
+    buckets = GainBuckets(nodes, adj, sol, s, d) if fm else None
+    bound = Boundary(nodes, d) if boundary and not fm else None
+    journal = Journal(sol)
 
     bestcost = Infinity
     for it in range(max_iter):
         if LOG:
             print( "tabu search, iteration", it)
             print( "initial sol:     ", sol)
-        cost += move(1, nodes, adj, sol, s, d, tabu, tabulen, it)
+        cost += move(1, nodes, adj, sol, s, d, tabu, tabulen, it, buckets, bound, journal)
         if LOG:
             print( "intermediate sol:", sol)
-        cost += move(0, nodes, adj, sol, s, d, tabu, tabulen, it)
+        cost += move(0, nodes, adj, sol, s, d, tabu, tabulen, it, buckets, bound, journal)
         if LOG:
             print( "completed sol:   ", sol)
             
         if cost < bestcost:
             bestcost = cost
-            bestsol = list(sol)
+            journal.mark()
             if report:
                 report(bestcost, "it:%d"%it)
             
     if report:
         report(bestcost, "it:%d"%it)
+    bestsol = journal.best()
 
     # # check correctness of incremental evaluation
     # z,s,d = evaluate(nodes, adj, bestsol)
@@ -40,35 +40,56 @@ def diversify(sol, nodes):
         sol[ind1[i]] = 1-bit
 
 
-def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report):
-    """Execute a tabu search run, with intensification/diversification."""
+def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report, pool=None, fm=False, boundary=False):
+    """Execute a tabu search run, with intensification/diversification.
+
+    If 'fm' is true, moves are selected with gain buckets (see gpp_ts.GainBuckets);
+    otherwise, if 'boundary' is true, only nodes on the boundary of the
+    partition are candidates for moving (see gpp_ts.Boundary).
+
+    If 'pool' (an opt100.multistart.ElitePool, shared with other processes) is given,
+    the run's best solution is published there at each diversification
+    (if it improved since the last one) and at the end, and diversification restarts
+    from a solution taken from the pool instead of the run's own best;
+    if the pool holds a solution better than the run's best, it is adopted
+    (and reported).  'sol' is changed in place, and always holds the
+    current solution.
+    """
     assert len(nodes)%2 == 0    # graph partitioning is only for graphs with an even number of nodes
     cost, s, d = evaluate(nodes, adj, sol)
     tabu = [0 for i in nodes]
+    buckets = GainBuckets(nodes, adj, sol, s, d) if fm else None
+    boundary = boundary and not fm
+    bound = Boundary(nodes, d) if boundary else None
+    journal = Journal(sol)
 
     bestcost = Infinity
     lastcost = Infinity
+    published = Infinity    # cost of the last solution published in the pool
     D = 1
     count = 0
     for it in range(max_iter):
         if LOG:
             print( "tabu search, iteration", it)
             print( "initial sol:     ", sol)
-        cost += move(1, nodes, adj, sol, s, d, tabu, tabulen, it)
+        cost += move(1, nodes, adj, sol, s, d, tabu, tabulen, it, buckets, bound, journal)
         if LOG:
             print( "intermediate sol:", sol)
-        cost += move(0, nodes, adj, sol, s, d, tabu, tabulen, it)
+        cost += move(0, nodes, adj, sol, s, d, tabu, tabulen, it, buckets, bound, journal)
         if LOG:
             print( "completed sol:   ", sol)
 
         if cost < bestcost:
             bestcost = cost
-            bestsol = list(sol)
+            journal.mark()
             if report:
                 report(bestcost, "it:%d"%it)
             if LOG:
                 print( "*** intensifying ***")
-            tabu = [0 for i in nodes]
+            if fm:
+                buckets.clear(sol, s, d, tabu)  # zeroes 'tabu' of the nodes still tabu
+            else:
+                tabu = [0 for i in nodes]
             count = 0
         elif cost < lastcost:
             count = 0
@@ -80,13 +101,37 @@ def ts_intens_divers(nodes, adj, sol, max_iter, tabulen, report):
             if LOG:
                 print( "*** diversifying ***")
             tabu = [0 for i in nodes]
-            sol = list(bestsol)
+            bestsol = journal.best()
+            sol[:] = bestsol
+            if pool is not None:
+                if bestcost < published:
+                    pool.publish(bestcost, bestsol)
+                    published = bestcost
+                elite = pool.best()
+                if elite is not None and elite[0] < bestcost:   # progress of other processes
+                    bestcost = type(bestcost)(elite[0])         # the pool keeps floats
+                    sol[:] = elite[1]
+                    bestsol = list(sol)
+                    published = bestcost
+                    if report:
+                        report(bestcost, "it:%d"%it, "(from pool)")
+                elite = pool.fetch()
+                if elite is not None:
+                    sol[:] = elite[1]
             diversify(sol, nodes)
+            journal = Journal(sol, bestsol)
             cost, s, d = evaluate(nodes, adj, sol)
+            if fm:
+                buckets = GainBuckets(nodes, adj, sol, s, d)
+            if boundary:
+                bound = Boundary(nodes, d)
             D += 1
         if LOG:
             print( count, D, "iteration", it, "cost", cost, "/ best:", bestcost )
         lastcost = cost
+    bestsol = journal.best()
+    if pool is not None and bestcost < published:
+        pool.publish(bestcost, bestsol)
     return bestsol, bestcost
 
 
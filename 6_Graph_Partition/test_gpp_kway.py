@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from gpp_kway import (annealing, capacity, construct, evaluate, find_move, move, tabu_search,
+                      weighted_adj)
+
+
+def test_find_move_tabu():
+    nodes, adj = [0, 1, 2, 3], [{1}, {0, 2}, {1, 3}, {2}]      # path 0-1-2-3
+    k, sol = 2, [0, 0, 1, 1]
+    cost, W, conn, boundary = evaluate(nodes, weighted_adj(nodes, adj), sol, k)
+    tabu = [[0]*k for i in nodes]
+    tabu[1][1] = tabu[2][0] = 10        # both moves across the cut are tabu
+    assert find_move(sol, conn, W, boundary, tabu, 5, cost, 0, 1., 3, None) is None
+    # aspiration: a move within capacity better than the best found
+    assert find_move(sol, conn, W, boundary, tabu, 5, cost, 2, 1., 3, None) is not None
+
+
+def test_move_updates_structures(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 1)
+    wadj = weighted_adj(nodes, adj)
+    random.seed(0)
+    k = 3
+    sol = construct(nodes, k)
+    cost, W, conn, boundary = evaluate(nodes, wadj, sol, k)
+    for t in range(50):
+        i, q = random.choice(nodes), random.randrange(k)
+        if q == sol[i]:
+            continue
+        cost += sum(w for j, w in wadj[i] if sol[j] == sol[i]) - sum(w for j, w in wadj[i] if sol[j] == q)
+        move(i, q, wadj, sol, conn, W, boundary, 1)
+        assert (cost, W, conn, boundary) == evaluate(nodes, wadj, sol, k)
+
+
+@pytest.mark.parametrize("search", ["tabu", "annealing"])
+def test_kway_capacity(search, rnd_graph):
+    nodes, adj = rnd_graph(60, 0.1, 2)
+    rng = random.Random(3)
+    vweights = [rng.randint(1, 4) for i in nodes]
+    k, eps = 4, 0.05
+    random.seed(4)
+    sol = construct(nodes, k, vweights)
+    if search == "tabu":
+        best, cost = tabu_search(nodes, adj, k, sol, 500, 7, eps=eps, vweights=vweights)
+    else:
+        best, cost = annealing(nodes, adj, k, sol, 0.3, 200, 0.9, 5, 0.02, 1., None,
+                               eps=eps, vweights=vweights)
+    z, W, conn, boundary = evaluate(nodes, weighted_adj(nodes, adj), best, k, vweights)
+    assert z == cost
+    assert max(W) <= capacity(nodes, k, eps, vweights)
+    assert sorted(set(best)) == list(range(k))
@@ -0,0 +1,32 @@
+import random
+
+import numpy as np
+
+from gpp_ts import evaluate
+from gpp_ml import multilevel
+
+
+def rnd_graph(n, deg, seed):
+    rng = random.Random(seed)
+    adj = [set() for i in range(n)]
+    for i in range(n):
+        for t in range(deg // 2):
+            j = rng.randrange(n)
+            if j != i:
+                adj[i].add(j)
+                adj[j].add(i)
+    return list(range(n)), adj
+
+
+def test_multilevel():
+    nodes, adj = rnd_graph(600, 6, 1)
+    runs = []
+    for npseed in (1, 2):
+        random.seed(5)
+        np.random.seed(npseed)      # must not matter
+        runs.append(multilevel(nodes, adj, coarsen_to=100))
+    assert runs[0] == runs[1]
+    part, cost = runs[0]
+    assert type(cost) is float
+    assert sum(part) == len(nodes) // 2
+    assert evaluate(nodes, adj, part)[0] == cost
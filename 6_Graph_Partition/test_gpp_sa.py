@@ -0,0 +1,147 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from gpp_ts import construct
+from gpp_sa import (Adaptive, Deadline, Geometric, Monitor, Replicas, Schedule, annealing, annealing_batch,
+                    evaluate, find_move_rnd, parallel_tempering, temperature_ladder, update_move)
+
+
+def test_annealing_boundary(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 2)
+    random.seed(3)
+    best, cost = annealing(nodes, adj, construct(nodes), 0.5, 200, 0.9, 5, 0.05, 1., None,
+                           boundary=True)
+    z, bal, s, d = evaluate(nodes, adj, best, 1.)
+    assert bal == 0 and z == cost
+
+
+def test_replicas_sweep(rnd_graph):
+    nodes, adj = rnd_graph(30, 0.2, 4)
+    random.seed(5)
+    sols = [construct(nodes) for r in range(6)]
+    chains = Replicas(nodes, adj, sols, 1.)
+    rng = np.random.default_rng(6)
+    accepted, improved = chains.sweep(np.linspace(0.5, 3, 6), 300, rng, batch=64)
+    assert accepted.sum() > 0
+    for r in range(6):
+        z, bal, s, d = evaluate(nodes, adj, chains.X[r].tolist(), 1.)
+        assert (chains.z[r], chains.bal[r]) == (z, bal)
+        assert chains.S[r].tolist() == s and chains.D[r].tolist() == d
+        if chains.zbest[r] < float("inf"):
+            zb, bb, s, d = evaluate(nodes, adj, chains.best[r].tolist(), 1.)
+            assert bb == 0 and zb == chains.zbest[r]
+
+
+@pytest.mark.parametrize("R", [1, 3])
+def test_replicas_sweep_is_sequential(rnd_graph, R):
+    """Blocks of trials give the same moves as doing the trials one by one."""
+    nodes, adj = rnd_graph(40, 0.15, 13)
+    random.seed(14)
+    sols = [construct(nodes) for r in range(R)]
+    chains = Replicas(nodes, adj, sols, 1.)
+    T, steps = 1., 500
+    accepted, improved = chains.sweep(T, steps, np.random.default_rng(15), batch=steps)
+    rng = np.random.default_rng(15)         # the same draws, done one by one
+    I = rng.integers(0, len(nodes), (R, steps))
+    limits = np.log(rng.random((R, steps))) * -T
+    for r in range(R):
+        sol = list(sols[r])
+        z, bal, s, d = evaluate(nodes, adj, sol, 1.)
+        moves = 0
+        for t in range(steps):
+            i, delta = find_move_rnd(len(nodes), sol, 1., s, d, bal, istar=int(I[r, t]))
+            if delta <= limits[r, t]:
+                bal = update_move(adj, sol, s, d, bal, i)
+                moves += 1
+        assert chains.X[r].tolist() == sol and accepted[r] == moves
+
+
+def test_annealing_batch(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 7)
+    random.seed(8)
+    sols = [construct(nodes) for r in range(8)]
+    best, cost = annealing_batch(nodes, adj, sols, 0.5, 100, 0.8, 3, 0.05, 1.)
+    z, bal, s, d = evaluate(nodes, adj, best, 1.)
+    assert bal == 0 and z == cost and type(cost) is float
+
+
+def test_temperature_ladder():
+    temps = temperature_ladder(0.5, 8., 5)
+    assert temps[0] == 0.5 and temps[-1] == pytest.approx(8.)
+    assert temps == pytest.approx([0.5, 1., 2., 4., 8.])
+    assert temperature_ladder(0.5, 8., 1) == [0.5]
+
+
+def test_parallel_tempering(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 9)
+    random.seed(10)
+    sols = [construct(nodes) for r in range(4)]
+    found = []
+    best, cost, stats = parallel_tempering(nodes, adj, sols, temperature_ladder(0.3, 3., 4), 30, 50, 1.,
+                                           report=found.append)
+    z, bal, s, d = evaluate(nodes, adj, best, 1.)
+    assert bal == 0 and z == cost and found[-1] == cost
+    assert found == sorted(found, reverse=True)
+    assert len(stats["acceptance"]) == 4 and len(stats["exchange"]) == 3
+    assert all(0 <= rate <= 1 for rate in stats["acceptance"] + stats["exchange"])
+    assert len(stats["round_trips"]) == 4
+
+
+def test_parallel_tempering_round_trips(rnd_graph):
+    nodes, adj = rnd_graph(20, 0.2, 11)
+    random.seed(12)
+    sols = [construct(nodes) for r in range(2)]
+    # equal temperatures: every exchange is accepted, so the two replicas
+    # swap levels on even sweeps (levels 0 and 1 are the only pair)
+    best, cost, stats = parallel_tempering(nodes, adj, sols, [1., 1.], 10, 5, 1.)
+    assert stats["exchange"] == [1.]
+    assert stats["round_trips"] == [2, 2]
+
+
+@pytest.mark.parametrize("level", [1, 2])
+def test_monitor(level, capsys, rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 11)
+    random.seed(12)
+    lines = []
+    monitor = Monitor(level=level, sample=10, out=lines.append)
+    best, cost = annealing(nodes, adj, construct(nodes), 0.5, 100, 0.8, 3, 0.05, 1., None,
+                           monitor=monitor)
+    assert capsys.readouterr().out == ""
+    ntemps = len(monitor.temps)
+    assert ntemps > 1 and len(monitor.accepted) == len(monitor.rejected) == ntemps
+    assert monitor.timeline[-1][2] == cost
+    assert [t[2] for t in monitor.timeline] == sorted((t[2] for t in monitor.timeline), reverse=True)
+    assert monitor.ntrials == sum(monitor.accepted) + sum(monitor.rejected)
+    if level == 1:
+        assert lines == []
+    else:
+        assert sum(line.startswith("temp:") for line in lines) == ntemps
+        assert sum(line.startswith("move") for line in lines) == monitor.nmoves // 10
+
+
+def test_schedule_is_abstract():
+    with pytest.raises(TypeError):
+        Schedule(10, 0.1)
+    class Incomplete(Schedule):
+        pass
+    with pytest.raises(TypeError):
+        Incomplete(10, 0.1)
+
+
+@pytest.mark.parametrize("make", [
+    lambda: None,
+    lambda: Geometric(0.9, 5, 0.05, reheats=1),
+    lambda: Adaptive(0.9, 5, 0.05),
+    lambda: Deadline(time.time() + 0.3),
+])
+def test_annealing_cost(make, rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 1)
+    random.seed(0)
+    schedule = make()
+    best, cost = annealing(nodes, adj, construct(nodes), 0.5, 200, 0.9, 5, 0.05, 1., None,
+                           schedule=schedule)
+    z, bal, s, d = evaluate(nodes, adj, best, 1.)
+    assert bal == 0 and z == cost
@@ -0,0 +1,61 @@
+import random
+
+from gpp_ts import Boundary, GainBuckets, construct, evaluate, move, tabu_search
+
+
+def lists(buckets, nodes):
+    return {i: buckets.bucket[i] for i in nodes}
+
+
+def test_gain_buckets_cost(rnd_graph):
+    nodes, adj = rnd_graph(50, 0.1, 1)
+    random.seed(0)
+    best, cost = tabu_search(nodes, adj, construct(nodes), 500, 8, fm=True)
+    assert sum(best) == len(nodes)//2
+    assert evaluate(nodes, adj, best)[0] == cost
+
+
+def test_gain_buckets_follow_moves(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 2)
+    random.seed(0)
+    sol = construct(nodes)
+    cost, s, d = evaluate(nodes, adj, sol)
+    tabu = [0 for i in nodes]
+    buckets = GainBuckets(nodes, adj, sol, s, d)
+    for it in range(30):
+        cost += move(1, nodes, adj, sol, s, d, tabu, 5, it, buckets)
+        cost += move(0, nodes, adj, sol, s, d, tabu, 5, it, buckets)
+        assert (cost, s, d) == evaluate(nodes, adj, sol)
+        fresh = GainBuckets(nodes, adj, sol, s, d, tabu, it)
+        assert lists(buckets, nodes) == lists(fresh, nodes)
+
+    buckets.clear(sol, s, d, tabu)
+    assert all(t <= it for t in tabu)
+    assert lists(buckets, nodes) == lists(GainBuckets(nodes, adj, sol, s, d), nodes)
+
+
+def test_gain_buckets_all_tabu(capsys, rnd_graph):
+    nodes, adj = rnd_graph(20, 0.2, 4)
+    random.seed(2)
+    sol = construct(nodes)
+    cost, s, d = evaluate(nodes, adj, sol)
+    tabu = [10 for i in nodes]      # every node tabu up to iteration 10
+    buckets = GainBuckets(nodes, adj, sol, s, d, tabu, 0)
+    i, delta = buckets.find_move(1, sol, s, d, tabu, 0)
+    assert sol[i] == 0 and all(t == 0 for t in tabu)
+    assert capsys.readouterr().out == ""
+
+
+def test_boundary_follows_moves(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.1, 3)
+    random.seed(1)
+    sol = construct(nodes)
+    cost, s, d = evaluate(nodes, adj, sol)
+    tabu = [0 for i in nodes]
+    bound = Boundary(nodes, d)
+    for it in range(30):
+        cost += move(1, nodes, adj, sol, s, d, tabu, 5, it, boundary=bound)
+        cost += move(0, nodes, adj, sol, s, d, tabu, 5, it, boundary=bound)
+        assert (cost, s, d) == evaluate(nodes, adj, sol)
+        assert set(bound) == {i for i in nodes if d[i] > 0}
+        assert all(bound.items[bound.pos[i]] == i for i in bound)
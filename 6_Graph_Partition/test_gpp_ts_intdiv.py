@@ -0,0 +1,63 @@
+import random
+
+from opt100.multistart import ElitePool
+import gpp_ts_intdiv
+from gpp_ts import construct, evaluate
+from gpp_ts_intdiv import ts_intens_divers
+
+
+def test_adopts_and_reports_pool_best(rnd_graph):
+    nodes, adj = rnd_graph(60, 0.1, 1)
+    random.seed(1)
+    elite, elite_cost = ts_intens_divers(nodes, adj, construct(nodes), 2000, 10, None)
+    pool = ElitePool(len(nodes))
+    pool.publish(elite_cost, elite)
+
+    random.seed(2)
+    sol = construct(nodes)
+    calls = []
+    def report(cost, *args):
+        calls.append((cost, list(sol), args))
+
+    best, cost = ts_intens_divers(nodes, adj, sol, 30, 10, report, pool)
+    adopted = [c for c in calls if "(from pool)" in c[2]]
+    assert adopted
+    assert adopted[0][0] == elite_cost and type(adopted[0][0]) is type(elite_cost)
+    assert evaluate(nodes, adj, adopted[0][1])[0] == elite_cost
+    assert cost <= elite_cost and type(cost) is type(elite_cost)
+    assert evaluate(nodes, adj, best)[0] == cost == calls[-1][0]
+
+
+def test_fm_and_boundary_costs(rnd_graph):
+    nodes, adj = rnd_graph(40, 0.15, 3)
+    for fm, boundary in [(False, False), (True, False), (False, True)]:
+        random.seed(0)
+        best, cost = ts_intens_divers(nodes, adj, construct(nodes), 300, 5, None,
+                                      fm=fm, boundary=boundary)
+        assert sum(best) == len(nodes)//2
+        assert evaluate(nodes, adj, best)[0] == cost
+
+
+class SpyPool(ElitePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.published = []
+
+    def publish(self, obj, sol):
+        self.published.append(obj)
+        print("publish", obj)
+        return super().publish(obj, sol)
+
+
+def test_publishes_at_diversification(rnd_graph, monkeypatch, capsys):
+    nodes, adj = rnd_graph(60, 0.1, 5)
+    monkeypatch.setattr(gpp_ts_intdiv, "LOG", True)
+    pool = SpyPool(len(nodes))
+    random.seed(6)
+    best, cost = ts_intens_divers(nodes, adj, construct(nodes), 300, 10, None, pool)
+    lines = capsys.readouterr().out.splitlines()
+    # published when diversifying (after the message), or at the end
+    at = [k for k in range(len(lines)) if lines[k].startswith("publish")]
+    assert at and all(lines[k-1] == "*** diversifying ***" or k == len(lines)-1 for k in at)
+    assert pool.published == sorted(set(pool.published), reverse=True)     # only improvements
+    assert pool.best() == (cost, best)
@@ -0,0 +1,63 @@
+import importlib.util
+import os
+import random
+
+import numpy as np
+import pytest
+
+import gpp_sa
+import gpp_ts
+
+# CSRGraph lives in chapter 7; loaded by path, without registering the module
+spec = importlib.util.spec_from_file_location(
+    "gpp_test_graphtools",
+    os.path.join(os.path.dirname(__file__), os.pardir, "7_Graph_Coloring", "graphtools.py"))
+graphtools = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(graphtools)
+
+
+def weighted_graph(n, prob, seed, integer=True):
+    rng = np.random.default_rng(seed)
+    i, j = np.nonzero(np.triu(rng.random((n, n)) < prob, 1))
+    w = rng.integers(1, 6, len(i)) if integer else rng.random(len(i)) + 0.5
+    return list(range(n)), graphtools.CSRGraph.from_edges(n, i, j, w)
+
+
+def cut(adj, sol):
+    total = 0
+    for a in range(adj.n):
+        for b, c in zip(adj[a], adj.edge_weights(a).tolist()):
+            if a < b and sol[a] != sol[b]:
+                total += c
+    return total
+
+
+@pytest.mark.parametrize("fm, boundary", [(False, False), (True, False), (False, True)])
+def test_ts_edge_weights(fm, boundary):
+    nodes, adj = weighted_graph(40, 0.15, 1)
+    random.seed(0)
+    best, cost = gpp_ts.tabu_search(nodes, adj, gpp_ts.construct(nodes), 300, 5, fm=fm,
+                                    boundary=boundary)
+    assert gpp_ts.evaluate(nodes, adj, best)[0] == cost == cut(adj, best)
+
+
+def test_buckets_need_integer_weights():
+    nodes, adj = weighted_graph(20, 0.2, 2, integer=False)
+    sol = gpp_ts.construct(nodes)
+    cost, s, d = gpp_ts.evaluate(nodes, adj, sol)
+    with pytest.raises(ValueError):
+        gpp_ts.GainBuckets(nodes, adj, sol, s, d)
+
+
+def test_sa_vertex_weights():
+    nodes, adj = weighted_graph(40, 0.15, 3)
+    rng = random.Random(4)
+    vweights = [rng.randint(1, 3) for i in nodes]
+    tol = 2
+    random.seed(5)
+    best, cost = gpp_sa.annealing(nodes, adj, gpp_ts.construct(nodes), 0.5, 200, 0.9, 5, 0.05,
+                                  1., None, vweights=vweights, tol=tol)
+    z, bal, s, d = gpp_sa.evaluate(nodes, adj, best, 1., vweights)
+    assert abs(bal) <= tol and z == cost
+    assert bal == sum(v if p == 0 else -v for v, p in zip(vweights, best))
+    assert z == cut(adj, best) + abs(bal)
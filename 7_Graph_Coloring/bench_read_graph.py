@@ -0,0 +1,60 @@
+"""
+bench_read_graph.py: throughput of the DIMACS graph readers in graphtools.
+
+Random graphs of increasing size are written in DIMACS format (plain and
+gzip-compressed) to a temporary directory and read back, reporting the
+time and reading speed in MB/s for each file.
+
+Usage: python bench_read_graph.py [n1 n2 ...] [--prob P]
+"""
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import graphtools as gts
+
+
+def bench(filename, compact, nrep=3):
+    """Best wall-clock time, over 'nrep' repetitions, for reading 'filename'."""
+    best = None
+    for _ in range(nrep):
+        start = time.perf_counter()
+        gts.read_graph(filename, compact=compact)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(sizes, prob):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        print("%-24s %10s %10s %8s %10s %10s" % ("file", "nodes", "edges", "MB", "sec", "MB/s"))
+        for n in sizes:
+            nodes, adj = gts.rnd_adj_fast(n, prob, compact=True)
+            name = os.path.join(tmpdir, "rnd_%d.col" % n)
+            gts.write_graph(name, nodes, adj)
+            with open(name, "rb") as src, gzip.open(name + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            for filename in (name, name + ".gz"):
+                mb = os.path.getsize(filename) / 1.e6
+                for compact in (True, False):
+                    t = bench(filename, compact)
+                    label = os.path.basename(filename) + ("" if compact else " (sets)")
+                    print("%-24s %10d %10d %8.1f %10.3f %10.1f" % (label, n, adj.nedges(), mb, t, mb/t))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    prob = 0.5
+    args = sys.argv[1:]
+    if "--prob" in args:
+        k = args.index("--prob")
+        prob = float(args[k+1])
+        del args[k:k+2]
+    sizes = [int(a) for a in args] or [250, 500, 1000, 2000]
+    main(sizes, prob)
@@ -1,9 +1,12 @@
 import bisect
 import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 Infinity = 1.e10000
-LOG = True
+LOG = False    # whether or not to print intermediate information
 
-from gcp_ts import rsatur, evaluate, tabu_search
+from gcp_ts import rsatur, evaluate, tabu_search, csr
 
 #
 # functions related to the genetic algorithm
@@ -178,3 +181,212 @@ def crossover(nodes,s1,s2,K):
 #         print sol
 #     else:
 #         print sol[:30], "..."
+
+
+#
+# hybrid evolutionary algorithm, with partition crossover
+#
+
+def color_classes(color, K):
+    """Color classes of solution 'color', as bitsets: bit i of the
+    k-th integer is set if node i has color k."""
+    color = np.asarray(color)
+    return [int.from_bytes(np.packbits(color == k, bitorder="little").tobytes(), "little")
+            for k in range(K)]
+
+
+def partition_key(color):
+    """Key identifying the partition defined by solution 'color',
+    independently of the names of the colors (they are renumbered by
+    order of first occurrence): the renumbered colors, as bytes."""
+    color = np.asarray(color)
+    values, first = np.unique(color, return_index=True)
+    rename = np.empty(values.max() + 1, dtype=np.int32)
+    rename[values[np.argsort(first)]] = np.arange(len(values))
+    return rename[color].tobytes()
+
+
+def distance(s1, s2, K):
+    """Distance between the partitions of solutions 's1' and 's2' (arrays):
+    number of nodes not in the same class, with classes matched greedily
+    by size of their intersection."""
+    overlap = np.bincount(s1*K + s2, minlength=K*K).reshape(K, K)
+    same = 0
+    for k in range(K):
+        i, j = divmod(int(overlap.argmax()), K)
+        if overlap[i, j] == 0:
+            break
+        same += overlap[i, j]
+        overlap[i, :] = 0
+        overlap[:, j] = 0
+    return len(s1) - int(same)
+
+
+def gpx(c1, c2, n, K):
+    """Greedy partition crossover (Galinier and Hao, 1999).
+
+    From parents with color classes 'c1' and 'c2' (bitsets, see
+    'color_classes'), each color of the child is the largest class of
+    one of the parents, alternately, after removing the nodes already
+    colored.  Nodes left uncolored get a random color.
+    Returns the child solution (a list).
+    """
+    parents = [list(c1), list(c2)]
+    new = np.full(n, -1, dtype=np.int32)
+    nbytes = (n + 7) // 8
+    for l in range(K):
+        src = parents[l % 2]
+        sizes = [bin(c).count("1") for c in src]
+        kmax = max(range(K), key=sizes.__getitem__)
+        if sizes[kmax] == 0:    # all nodes colored
+            break
+        taken = src[kmax]
+        bits = np.frombuffer(taken.to_bytes(nbytes, "little"), dtype=np.uint8)
+        new[np.unpackbits(bits, bitorder="little")[:n].astype(bool)] = l
+        for p in parents:
+            for k in range(K):
+                p[k] &= ~taken
+    free = np.flatnonzero(new < 0)
+    new[free] = [random.randint(0,K-1) for i in free]
+    return new.tolist()
+
+
+# worker state, set by '_init'
+_hea = None
+
+
+def _init(nodes, g, K, tabulen, tabuiter):
+    global _hea
+    _hea = (nodes, g, K, tabulen, tabuiter)
+
+
+def _offspring(p1, p2, seed):
+    """New element: crossover of parents 'p1' and 'p2' (solution lists;
+    if None, a solution is made with rsatur), improved with tabu search."""
+    nodes, g, K, tabulen, tabuiter = _hea
+    random.seed(seed)
+    if p1 is None:
+        newsol = rsatur(nodes, g, K)
+    else:
+        newsol = gpx(color_classes(p1, K), color_classes(p2, K), len(nodes), K)
+    newsol, obj = tabu_search(nodes, g, K, newsol, tabulen, tabuiter)
+    return obj, newsol
+
+
+def hea(nodes, adj, K, ngen, nelem, tabulen, tabuiter, workers=1, mindist=None, report=None):
+    """Hybrid evolutionary algorithm for K colors (Galinier and Hao, 1999).
+
+    Each new element of the population (of 'nelem' elements) is made by
+    greedy partition crossover ('gpx') of two random parents, and
+    improved by 'tabuiter' iterations of tabu search.  The search stops
+    after 'ngen' generations, or when a solution with no conflicts is
+    found.
+
+    Population diversity is managed as follows:
+      * elements are identified by their partition (see
+        'partition_key'), and repeated ones are discarded;
+      * a new element closer than 'mindist' (default: n/10, see
+        'distance') to some element replaces it only if it has fewer
+        conflicts, and is discarded otherwise;
+      * if not, it replaces the worst element, if it is not worse.
+
+    Each generation makes 'workers' new elements, on a pool of 'workers'
+    processes if it is larger than 1 (with 'fork', where available, the
+    graph is shared with them, not copied).
+
+    Parameters:
+     * nodes, adj - graph definition (adjacency list, or CSRGraph)
+     * K - number of colors
+     * ngen - number of generations
+     * nelem - number of elements to keep in population
+     * tabulen, tabuiter - tabu tenure and number of iterations of the tabu search
+     * workers - number of new elements per generation, made in parallel
+     * mindist - minimum distance between elements of the population
+     * report - function to call to log best found solutions
+
+    Returns the best solution found and its number of conflicts.
+    """
+    g = csr(nodes, adj)
+    n = len(nodes)
+    if mindist is None:
+        mindist = n // 10
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init,
+                                       initargs=(nodes, g, K, tabulen, tabuiter))
+        def generate(tasks):
+            return list(executor.map(_offspring, *zip(*tasks)))
+    else:
+        executor = None
+        _init(nodes, g, K, tabulen, tabuiter)
+        def generate(tasks):
+            state = random.getstate()     # tasks are seeded, keep the main sequence
+            res = [_offspring(*t) for t in tasks]
+            random.setstate(state)
+            return res
+
+    sols, objs, keys, arrays = [], [], [], []     # population
+    known = set()       # keys of the population, for finding repetitions
+    best_sol, best_obj = None, Infinity
+
+    def insert(obj, newsol):
+        """Insert a new element, according to the rules for diversity."""
+        key = partition_key(newsol)
+        if key in known:
+            if LOG:
+                print( "solution already exists in population")
+            return
+        x = np.array(newsol)
+        if len(sols) < nelem:
+            j = len(sols)
+            sols.append(None); objs.append(None); keys.append(None); arrays.append(None)
+        else:
+            dist = [distance(x, y, K) for y in arrays]
+            j = int(np.argmin(dist))
+            if dist[j] >= mindist:
+                j = int(np.argmax(objs))    # worst element
+                if obj > objs[j]:
+                    return
+            elif obj >= objs[j]:
+                if LOG:
+                    print( "solution too close to element %d, skipping" % j)
+                return
+        known.discard(keys[j])
+        known.add(key)
+        sols[j], objs[j], keys[j], arrays[j] = newsol, obj, key, x
+
+    try:
+        # initial population, from rsatur (at most 'ngen' rounds, if there are repetitions)
+        rounds = 0
+        while len(sols) < nelem and rounds < ngen and best_obj > 0:
+            tasks = [(None, None, random.getrandbits(32)) for w in range(max(workers, nelem - len(sols)))]
+            for obj, newsol in generate(tasks):
+                insert(obj, newsol)
+                if obj < best_obj:
+                    best_sol, best_obj = newsol, obj
+                    if report:
+                        report(best_obj, "\t%d colors\tgeneration:%d" % (K,0))
+            rounds += 1
+
+        for gen in range(ngen):
+            if best_obj == 0:   # feasible solution for K colors found
+                break
+            tasks = []
+            for w in range(workers):
+                p1, p2 = random.sample(range(len(sols)), 2) if len(sols) > 1 else (0, 0)
+                tasks.append((sols[p1], sols[p2], random.getrandbits(32)))
+            for obj, newsol in generate(tasks):
+                if obj < best_obj:
+                    best_sol, best_obj = newsol, obj
+                    if report:
+                        report(best_obj, "\t%d colors\tgeneration:%d" % (K,gen))
+                insert(obj, newsol)
+            if LOG:
+                print( "generation %d: conflicts %d to %d" % (gen, min(objs), max(objs)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return best_sol, best_obj
+
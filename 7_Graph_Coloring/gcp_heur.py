@@ -1,3 +1,6 @@
+import heapq
+import numpy as np
+
 # LOG = True	# whether or not to print intermediate solutions
 LOG = False	# whether or not to print intermediate solutions
 
@@ -49,51 +52,89 @@ def largest_first(nodes, adj):
     # return seq_assignment([i for _,i in nnodes], adj)
 
 
+class SaturationQueue:
+    """Priority queue of the uncolored vertices, for DSatur.
+
+    The priority of a vertex is its saturation degree (number of distinct
+    colors in its neighbors), then its number of uncolored neighbors.
+    The colors adjacent to vertex 'i' are kept in bitmask 'colors[i]'
+    (bit k set for color k).
+
+    The queue is a heap with lazy updates: an entry is pushed when a
+    saturation degree increases, and entries popped with an outdated
+    priority are dropped, or pushed again if only the number of uncolored
+    neighbors decreased.  Thus, updates are O(log n), and coloring the
+    whole graph takes O((n+m) log n).
+    """
+
+    def __init__(self, nodes, adj):
+        self.adj = adj
+        self.colors = [0 for i in nodes]
+        self.sat = [0 for i in nodes]
+        self.unc = [len(adj[i]) for i in nodes]
+        self.colored = [False for i in nodes]
+        self.left = len(self.unc)           # number of uncolored vertices
+        self.heap = [(0, -self.unc[i], i) for i in nodes]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return self.left
+
+    def pop(self):
+        """Remove and return the uncolored vertex with maximum priority."""
+        heap, sat, unc, colored = self.heap, self.sat, self.unc, self.colored
+        while True:
+            s, u, i = heapq.heappop(heap)
+            if colored[i] or -s != sat[i]:     # outdated entry
+                continue
+            if -u != unc[i]:
+                heapq.heappush(heap, (s, -unc[i], i))
+                continue
+            self.left -= 1
+            return i
+
+    def color(self, i, k):
+        """Assign color 'k' to vertex 'i' (already popped), updating its neighbors."""
+        colors, sat, unc, colored = self.colors, self.sat, self.unc, self.colored
+        colored[i] = True
+        bit = 1 << k
+        for j in self.adj[i]:
+            if colored[j]:
+                continue
+            unc[j] -= 1
+            if not colors[j] & bit:
+                colors[j] |= bit
+                sat[j] += 1
+                heapq.heappush(self.heap, (-sat[j], -unc[j], j))
+
+
 def dsatur(nodes, adj):
     """Dsatur algorithm (Brelaz, 1979).
     
     Dynamically choose the vertex to color next, selecting one that is
-    adjacent to the largest number of distinctly colored vertices.
+    adjacent to the largest number of distinctly colored vertices
+    (ties are broken by the number of uncolored neighbors; see
+    'SaturationQueue').
     Returns the solution found and the number of colors used.
     """
-    unc_adj = [set(adj[i]) for i in nodes]      # currently uncolored adjacent nodes
-    adj_colors = [set([]) for i in nodes]       # set of adjacent colors, for each vertex
     color = [None for i in nodes]       # solution vector
+    Q = SaturationQueue(nodes, adj)
 
     K = 0
-    U = set(nodes)      # yet uncolored vertices
-    while U:
+    while Q:
         # choose vertex with maximum saturation degree
-        max_colors = -1
-        for i in U:
-            n = len(adj_colors[i])
-            if n > max_colors:
-                max_colors = n
-                max_uncolored = -1
-            # break ties: get index of node with maximal degree on uncolored nodes
-            if n == max_colors:
-                adj_uncolored = len(unc_adj[i])
-                if adj_uncolored > max_uncolored:
-                    u_star = i
-                    max_uncolored = adj_uncolored
+        u_star = Q.pop()
+        mask = Q.colors[u_star]
         if LOG:
             print( "u*:", u_star,)
-            print( "\tadj_colors[%d]:\t%s" % (u_star, adj_colors[u_star]),)
+            print( "\tadj_colors[%d]:\t%s" % (u_star, [k for k in range(K) if mask >> k & 1]),)
 
-        # find a color for node 'u_star'
-        for k in range(K):
-            if k not in adj_colors[u_star]:
-                k_star = k
-                break
-        else:   # must use a new color
-            k_star = K
+        # find a color for node 'u_star': the lowest not in 'mask' (a new one, if all are)
+        k_star = (~mask & (mask + 1)).bit_length() - 1
+        if k_star == K:
             K += 1
         color[u_star] = k_star
-        for i in unc_adj[u_star]:
-            unc_adj[i].remove(u_star)
-            adj_colors[i].add(k_star)
-
-        U.remove(u_star)
+        Q.color(u_star, k_star)
 
         if LOG:
             print( "--> color[%d]:%s" % (u_star, color[u_star]))
@@ -216,6 +257,112 @@ def recursive_largest_fit_2(nodes, adj):
     return color, K
 
 
+#
+# variants with sets of vertices as bitsets (Python integers, bit i for vertex i)
+#
+
+def adjacency_bits(nodes, adj):
+    """Bitsets of the neighbors of each vertex."""
+    n = len(nodes)
+    row = np.zeros(n, dtype=bool)
+    bits = []
+    for i in nodes:
+        nbrs = getattr(adj[i], "array", None)     # neighbors array, if 'adj' is a CSRGraph
+        if nbrs is None:
+            nbrs = list(adj[i])
+        row[nbrs] = True
+        bits.append(int.from_bytes(np.packbits(row, bitorder="little").tobytes(), "little"))
+        row[nbrs] = False
+    return bits
+
+
+def members(x, n):
+    """Array with the vertices in bitset 'x' (of 'n' vertices), in increasing order."""
+    b = np.frombuffer(x.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(b, bitorder="little")[:n])
+
+
+def seq_assignment_bits(nodes, adj, nbits=None):
+    """Sequential color assignment, as 'seq_assignment', with the color
+    classes as bitsets: color k can be given to node i if the bitwise
+    'and' of its class with the neighbors of i is empty.
+
+    'nbits' are the bitsets of the neighbors (computed, if not given).
+    Returns the solution found and the number of colors used.
+    """
+    if nbits is None:
+        nbits = adjacency_bits(nodes, adj)
+    classes = []        # classes[k]: bitset of the nodes with color k
+    color = [None for i in nodes]       # solution vector
+    for i in nodes:
+        nb = nbits[i]
+        for k, c in enumerate(classes):
+            if not c & nb:
+                break
+        else:
+            k = len(classes)
+            classes.append(0)
+        classes[k] |= 1 << i
+        color[i] = k
+        if LOG:
+            print( "--> color[%d]: %s" % (i, color[i]))
+    return color, len(classes)
+
+
+def recursive_largest_fit_bits(nodes, adj, nbits=None):
+    """Recursive largest fit algorithm (Leighton, 1979), as
+    'recursive_largest_fit', with the sets of vertices as bitsets.
+
+    The number of uncolored (or uncolorable) neighbors of a vertex is
+    the number of bits of the 'and' of two bitsets, so each step costs
+    O(n/64) word operations per candidate vertex.
+
+    'nbits' are the bitsets of the neighbors (computed, if not given).
+    Returns the solution found and the number of colors used.
+    """
+    if nbits is None:
+        nbits = adjacency_bits(nodes, adj)
+    n = len(nodes)
+    K = 0               # current color class
+    color = [None for i in nodes]       # solution vector
+    unc = (1 << n) - 1  # yet uncolored vertices
+    while unc:
+        # phase 1: color vertex with max number of connections to uncolored vertices
+        max_edges = -1
+        for i in members(unc, n).tolist():
+            e = bin(nbits[i] & unc).count("1")
+            if e > max_edges:
+                max_edges = e
+                u_star = i
+        color[u_star] = K
+        unc &= ~(1 << u_star)
+        U = nbits[u_star] & unc             # uncolorable with current color
+        V = unc & ~U                        # colorable with current color
+        if LOG:
+            print( "phase 1, u* =", u_star, "\tU =", members(U, n), "\tV =", members(V, n))
+
+        # phase 2: check for other vertices that can have the same color (K)
+        while V:
+            # determine colorable vertex with maximum uncolorable adjacencies:
+            max_edges = -1
+            for i in members(V, n).tolist():
+                e = bin(nbits[i] & U).count("1")
+                if e > max_edges:
+                    max_edges = e
+                    u_star = i
+            color[u_star] = K
+            unc &= ~(1 << u_star)
+            not_colored = nbits[u_star] & V     # not colorable with K
+            V &= ~(not_colored | (1 << u_star))
+            U |= not_colored
+            if LOG:
+                print( "phase 2, u* =", u_star, "\tU =", members(U, n), "\tV =", members(V, n))
+
+        K += 1  # switch to next color class
+
+    return color, K
+
+
 def check(nodes,adj,color):
     """Auxiliary function, for checking if a coloring is valid."""
     for i in nodes:
@@ -1,7 +1,13 @@
 import random
+import time
+import numpy as np
 Infinity = 1.e10000
 LOG = False
 
+from opt100.journal import Journal
+from graphtools import CSRGraph
+from gcp_heur import dsatur, SaturationQueue
+
 
 #
 # general-purpose, utility functions
@@ -17,171 +23,285 @@ def evaluate(nodes, adj, color):
     return total
 
 
-def calc_bad_degree(nodes, adj, color, K):
+def csr(nodes, adj):
+    """Adjacency 'adj' as a CSRGraph (converted, if it is an adjacency list)."""
+    if isinstance(adj, CSRGraph):
+        return adj
+    return CSRGraph.from_adj([adj[i] for i in nodes])
+
+
+def calc_bad_degree(g, color, K):
     """Calculate the number of conflicts for each node switching to each color.
 
-    Returns two structures:
-      * dictionary 'bad_degree[i,k]', which contains the conflicts
-        that will be obtained if node 'i' switches to color k
-      * list 'best_color', holding, for each node, index 'k' of color that will
-        produce the minimum of conflicts is assigned to the node.
+    Returns an n x K array 'bad_degree', where 'bad_degree[i,k]' is the
+    number of neighbors of node 'i' (in CSRGraph 'g') with color 'k', i.e.,
+    the conflicts that will be obtained if node 'i' switches to color k.
     """
-    n = len(nodes)
-    bad_degree = {}
-    for i in nodes:
-        for k in range(K):
-            bad_degree[i,k] = 0
+    rows = np.repeat(np.arange(g.n), g.degrees())
+    counts = np.bincount(rows*K + color[g.neighbors], minlength=g.n*K)
+    return counts.reshape(g.n, K).astype(np.int32)
 
-    # calculate bad degree for each node
-    for i in nodes:
-        for j in adj[i]:
-            kj = color[j]
-            bad_degree[i,kj] += 1
 
-    # calculate the best color for each node, on the current setting
-    best_color = [None for i in nodes]
-    for i in nodes:
-        min_bd = Infinity
-        for k in range(K):
-            if color[i] != k and bad_degree[i,k] < min_bd:
-                min_bd = bad_degree[i,k]
-                best_color[i] = k
-    
-    return bad_degree, best_color
+class Conflicting:
+    """Set of the nodes in conflict with some neighbor.
+
+    The nodes are kept in the first 'size' positions of array 'items'
+    ('pos[i]' is the position of node 'i', or -1), so that the moves of
+    all of them can be evaluated with array operations.
+    """
+
+    def __init__(self, bad_degree, color):
+        n = len(color)
+        nodes = np.flatnonzero(bad_degree[np.arange(n), color] > 0)
+        self.items = np.empty(n, dtype=np.int32)
+        self.pos = np.full(n, -1, dtype=np.int32)
+        self.size = len(nodes)
+        self.items[:self.size] = nodes
+        self.pos[nodes] = np.arange(self.size)
+
+    def __len__(self):
+        return self.size
+
+    def array(self):
+        return self.items[:self.size]
+
+    def add(self, i):
+        if self.pos[i] < 0:
+            self.items[self.size] = i
+            self.pos[i] = self.size
+            self.size += 1
+
+    def discard(self, i):
+        p = self.pos[i]
+        if p >= 0:
+            self.size -= 1
+            last = self.items[self.size]
+            self.items[p] = last
+            self.pos[last] = p
+            self.pos[i] = -1
+
 
 #
 # functions related to tabu-search
 #
 
-def tabu_search(nodes, adj, K, color, tabulen, max_iter, report = None):
+def tabu_search(nodes, adj, K, color, tabulen, max_iter, report = None, deadline = None):
     """Execute a tabu search for Graph Coloring starting from solution 'color'.
 
     The number of colores allowed is fixed to 'K'.  This function will search
     a coloring such that the number of conflicts (adjacent nodes with the same
     color) is minimum.  If a solution with no conflicts is found, it is
     returned immediately.
+
+    This is the TabuCol algorithm (Hertz and de Werra, 1987): the
+    conflicts of each node with each color are kept in an n x K array,
+    updated in O(deg) at each move, and only the moves of nodes in
+    conflict are evaluated, with array operations, in O(K) per node.
     
     Parameters:
-     * nodes, adj - graph definition
+     * nodes, adj - graph definition (adjacency list, or CSRGraph)
      * K - number of colors allowed
-     * colors - initial solution
+     * colors - initial solution, updated with the best one when the
+       search ends; if it is a numpy array of int32, it is changed in
+       place during the search (and holds the best solution when
+       'report' is called)
      * tabulen - lenght of the tabu status
      * max_iter - allowed number of iterations
      * report - function used for output of best found solutions
+     * deadline - if given, the search also stops at this wall-clock time (as time.time())
 
     Returns the best solution found and its number of conflicts.
     """
-    tabu = {}
-    for i in nodes:
-        for k in range(K):
-            tabu[i,k] = 0
-
-    best_sol = list(color)
-    sum_bad_degree = evaluate(nodes, adj, color)
-    bad_degree,best_color = calc_bad_degree(nodes,adj,color,K)
+    g = csr(nodes, adj)
+    if isinstance(color, np.ndarray) and color.dtype == np.int32:
+        col = color
+    else:
+        col = np.array(color, dtype=np.int32)
+    tabu = np.full((g.n, K), -1, dtype=np.int32)    # color k is tabu for i up to iteration tabu[i,k]
+    bad_degree = calc_bad_degree(g, col, K)
+    conflicting = Conflicting(bad_degree, col)
+
+    journal = Journal(col)
+    journal.mark()
+    sum_bad_degree = int(bad_degree[np.arange(g.n), col].sum())
     best_obj = sum_bad_degree
 
     for it in range(max_iter):
-        try:
-            i_star, delta = find_move(nodes, adj, K, color, bad_degree, best_color)
-        except UnboundLocalError:            # search blocked
-            if report:
+        if deadline is not None and time.time() >= deadline:
+            break
+        mv = find_move(K, col, bad_degree, conflicting, tabu, it, sum_bad_degree, best_obj)
+        if mv is None:            # search blocked
+            if report and sum_bad_degree > 0:
                 print( "search blocked, returning")
-            return best_sol, best_obj
+            break
+        i_star, k_star, delta = mv
 
-        move(nodes, adj, K, color, bad_degree, best_color, i_star, it, tabu, tabulen)
+        journal.record(i_star, col[i_star])
+        move(g, col, bad_degree, conflicting, i_star, k_star, it, tabu, tabulen)
         sum_bad_degree += delta
 
         if LOG:
-            print( "color:", color)
+            print( "color:", col)
             print( "iteration", it+1, "\tsum_bad_degree:", sum_bad_degree)
             print()
 
         if sum_bad_degree < best_obj:	# update best found solution
             best_obj = sum_bad_degree
-            best_sol = list(color)
+            journal.mark()
             if report:
                 report(best_obj, "\t%d colors\titer:%d" % (K,it))
         if sum_bad_degree == 0:
             break       # found a feasible solution for this K, no need to continue
     
     # report final solution
+    best_sol = journal.best()
+    if col is color:
+        color[:] = best_sol
+        best_sol = color
+    else:
+        best_sol = best_sol.tolist()
+        color[:] = best_sol
     if report:
         report(best_obj, "\t%d colors\titer:%d" % (K,it))
     assert best_obj == evaluate(nodes, adj, best_sol)
     return best_sol, best_obj
 
 
-def find_move(nodes, adj, K, color, bad_degree, best_color):
-    """Find a non-tabu color exchange in a node on solution 'color'.
+def find_move(K, color, bad_degree, conflicting, tabu, it, obj, best_obj):
+    """Find the best non-tabu color change of a node in conflict.
 
-    Tabu information is implicit in 'best_color': tabu indices are
-    have value 'None'.  The non-tabu neigbor solution (node and respective
-    color) with largest improvement on the 'bad_degree' is selected.
+    A tabu move is accepted if it leads to a solution better than
+    'best_obj' (aspiration criterion); ties are broken randomly.
 
-    Returns the chosen node (color is implicit in 'best_color'), and the
-    improvement on bad degree to which the movement leads.
+    Returns the chosen node, its new color, and the change in the
+    number of conflicts to which the movement leads (or None, if there
+    is no allowed move).
     """
-    min_bd = Infinity
-    n = len(nodes)
-    init = random.randint(0,n)
-
-    for i_ in nodes:
-        i = (i_ + init) %  n    # randomize initial search position
-        ki = color[i]
-        kb = best_color[i]
-        if bad_degree[i,ki] > 0 and kb != None: # search only nodes with bad degree > 0
-            delta = bad_degree[i,kb] - bad_degree[i,ki]
-            if delta < min_bd:
-                min_bd = delta
-                i_star = i
-            # if delta < 0:     # use this for first-improve
-            #     return i_star, 2*min_bd
-
-    # raises exception if search is blocked (as i_star is not instantiated)
-    return i_star, 2*min_bd
-
-
-def move(nodes, adj, K, color, bad_degree, best_color, i_star, it, tabu, tabulen):
+    C = conflicting.array()
+    if len(C) == 0:
+        return None
+    rows = np.arange(len(C))
+    B = bad_degree[C]
+    delta = B - B[rows, color[C]][:,None]
+    forbid = (tabu[C] >= it) & (obj + 2*delta >= best_obj)  # tabu, unless for aspiration
+    forbid[rows, color[C]] = True
+    big = len(color)    # larger than any change in the conflicts of a node
+    delta[forbid] = big
+    min_bd = delta.min()
+    if min_bd == big:
+        return None
+    cand = np.flatnonzero(delta == min_bd)
+    i, k = divmod(int(cand[random.randrange(len(cand))]), K)
+    return int(C[i]), k, 2*int(min_bd)
+
+
+def move(g, color, bad_degree, conflicting, i_star, k_star, it, tabu, tabulen):
     """Execute a movement on solution 'color', and update the tabu information.
 
-    Node 'i_star' is changed from its previous color to its 'best_color'.
+    Node 'i_star' is changed from its previous color to color 'k_star';
+    the conflicts of its neighbors and the set of nodes in conflict are
+    updated.
     """
     old_color = color[i_star]
-    new_color = best_color[i_star]
+    nbrs = g.neighbors[g.offsets[i_star]:g.offsets[i_star+1]]
 
     # update bad_degree table
-    for j in adj[i_star]:
-        bad_degree[j,old_color] -= 1
-        bad_degree[j,new_color] += 1
+    bad_degree[nbrs, old_color] -= 1
+    bad_degree[nbrs, k_star] += 1
 
     # do the move
-    color[i_star] = new_color
+    color[i_star] = k_star
     if LOG:
-        print( 'color[%d]  %d --> %d' % (i_star, old_color, color[i_star]) )
+        print( 'color[%d]  %d --> %d' % (i_star, old_color, k_star) )
 
     # update tabu list
     tabu[i_star, old_color] = it + int(tabulen * random.random()) + 1
 
-    # update best color for i_star and each node adjacent
-    changed = list(adj[i_star])
-    changed.append(i_star)
-    for j in changed:
-        min_bd = Infinity
-        kj = color[j]
-        best_color[j] = None
-        for k in range(K):
-            if bad_degree[j,k] == 0:    # aspiration criterion
-                best_color[j] = k
-                break
-            if kj != k and tabu[j,k] < it:
-                if bad_degree[j,k] < min_bd:
-                    min_bd = bad_degree[j,k]
-                    best_color[j] = k
-                # if min_bd == 0:       # not necessary with aspiration
-                #     break
+    # update the set of nodes in conflict
+    cn = color[nbrs]
+    for j in nbrs[(cn == old_color) & (bad_degree[nbrs, old_color] == 0)].tolist():
+        conflicting.discard(j)
+    for j in nbrs[(cn == k_star) & (bad_degree[nbrs, k_star] == 1)].tolist():
+        conflicting.add(j)
+    if bad_degree[i_star, k_star] > 0:
+        conflicting.add(i_star)
+    else:
+        conflicting.discard(i_star)
     
 
+#
+# search for the chromatic number
+#
+
+def drop_color(g, color, K, k):
+    """Make a coloring with K-1 colors from 'color', with K colors.
+
+    The nodes of class 'k' are uncolored, and class K-1 is renamed k;
+    then, in random order, each uncolored node gets the color with
+    fewest conflicts with the colored neighbors (ties broken randomly).
+    Returns the new solution.
+    """
+    color = np.array(color)
+    removed = np.flatnonzero(color == k)
+    color[color == K-1] = k
+    color[removed] = -1
+    order = removed.tolist()
+    random.shuffle(order)
+    for i in order:
+        c = color[g.neighbors[g.offsets[i]:g.offsets[i+1]]]
+        counts = np.bincount(c[c >= 0], minlength=K-1)
+        cand = np.flatnonzero(counts == counts.min())
+        color[i] = cand[random.randrange(len(cand))]
+    return color.tolist()
+
+
+def chromatic_descent(nodes, adj, tabulen, max_iter, time_limit, report = None):
+    """Search for a coloring with as few colors as possible, within 'time_limit' seconds.
+
+    Starts from the coloring of DSatur, with K colors, and then tries
+    K-1, K-2, ... colors with the tabu search.  The search for K-1
+    colors starts from the last feasible coloring, with its smallest
+    class recolored (see 'drop_color').  Each run of the tabu search does
+    up to 'max_iter' iterations; if it ends with conflicts, the next run
+    starts from its best solution.
+
+    Parameters:
+     * nodes, adj - graph definition (adjacency list, or CSRGraph)
+     * tabulen - lenght of the tabu status
+     * max_iter - number of iterations of each tabu search run
+     * time_limit - wall-clock limit, in seconds
+     * report - function used for output of colorings found, called
+       as report(K, ...)
+
+    Returns the best coloring found, its number of colors, and the
+    trace: a list of pairs (elapsed time, K), for each coloring found.
+    """
+    start = time.time()
+    deadline = start + time_limit
+    g = csr(nodes, adj)
+    best, K = dsatur(nodes, adj)
+    trace = [(time.time() - start, K)]
+    if report:
+        report(K, "\ttime:%.2f" % trace[-1][0])
+
+    color = None
+    while K > 1 and time.time() < deadline:
+        if color is None:       # warm start from the last feasible coloring
+            sizes = np.bincount(best, minlength=K)
+            color = drop_color(g, best, K, int(sizes.argmin()))
+        color, obj = tabu_search(nodes, g, K-1, color, tabulen, max_iter, deadline=deadline)
+        if obj == 0:
+            best, K = color, K-1
+            color = None
+            trace.append((time.time() - start, K))
+            if report:
+                report(K, "\ttime:%.2f" % trace[-1][0])
+        elif LOG:
+            print( "%d colors: %d conflicts left" % (K-1, obj))
+
+    return best, K, trace
+
+
 #
 # construction methods
 #
@@ -190,46 +310,31 @@ def rsatur(nodes, adj, K):
     """Saturation algorithm adapted to produce K classes.
 
     Dynamically choose the vertex to color next, selecting one that is
-    adjacent to the largest number of distinctly colored vertices.
+    adjacent to the largest number of distinctly colored vertices
+    (see gcp_heur.SaturationQueue), and assign it a random color among
+    those not used in its neighbors.
     If a non-conflicting color cannot be found, randomly choose a color
     from the K classes.    
     Returns the solution constructed.
     """
-    unc_adj = [set(adj[i]) for i in nodes]      # currently uncolored adjacent nodes
-    adj_colors = [set([]) for i in nodes]       # colors adjacent to each vertex
     color = [None for i in nodes]       # solution vector
+    Q = SaturationQueue(nodes, adj)
+    allcolors = (1 << K) - 1
 
-    U = set(nodes)
-    while U:
+    while Q:
         # choose vertex with maximum saturation degree
-        max_colors = -1
-        for i in U:
-            n = len(adj_colors[i])
-            if n > max_colors:
-                max_colors = n
-                max_uncolored = -1
-            # break ties: get index of node with maximal degree on uncolored nodes
-            if n == max_colors:
-                adj_uncolored = len(unc_adj[i])
-                if adj_uncolored > max_uncolored:
-                    u_star = i
-                    max_uncolored = adj_uncolored
+        u_star = Q.pop()
 
         # find a color for node 'u-star'
-        colors = range(K)
-        random.shuffle(colors)
-        for k in colors:
-            if k not in adj_colors[u_star]:
-                k_star = k
-                break
+        free = allcolors & ~Q.colors[u_star]    # bitmask of non-conflicting colors
+        if free:
+            for r in range(random.randrange(bin(free).count("1"))):
+                free &= free - 1        # drop the lowest bit
+            k_star = (free & -free).bit_length() - 1
         else:   # must use a conflicting color
             k_star = random.randint(0,K-1)
         color[u_star] = k_star
-        for i in unc_adj[u_star]:
-            unc_adj[i].remove(u_star)
-            adj_colors[i].add(k_star)
-
-        U.remove(u_star)
+        Q.color(u_star, k_star)
 
     return color
 
@@ -4,6 +4,283 @@ graphtools.py: functions for making, or reading graphs in several formats
 Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
 """
 import random, math
+import hashlib, os, re, struct
+from collections.abc import Set
+import numpy as np
+
+
+class Neighbors(Set):
+    """Read-only view on the neighbors of node 'i' in a CSRGraph.
+
+    Behaves as a set of node indices (iteration, 'len', 'in', '&', ...),
+    so that it can be used wherever 'adj[i]' is a set or a list.
+    """
+    __slots__ = ("graph", "i", "array")
+
+    def __init__(self, graph, i):
+        self.graph = graph
+        self.i = i
+        self.array = graph.neighbors[graph.offsets[i]:graph.offsets[i+1]]
+
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        return iter(self.array.tolist())
+
+    def __contains__(self, j):
+        return self.graph.has_edge(self.i, j)
+
+    def __repr__(self):
+        return "Neighbors(%d: %s)" % (self.i, self.array.tolist())
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def intersection(self, other):
+        return set(j for j in other if j in self)
+
+
+class CSRGraph:
+    """Compact undirected graph, in compressed sparse row (CSR) format.
+
+    The neighbors of node 'i' are 'neighbors[offsets[i]:offsets[i+1]]',
+    sorted by increasing index; each edge (i,j) is stored twice, as j in
+    the neighbors of i and as i in the neighbors of j.  Optional edge
+    weights are kept in array 'weights', aligned with 'neighbors'.
+
+    'adj = CSRGraph(...)' can be used in place of the usual adjacency
+    list: 'adj[i]' is a set-like view on the neighbors of 'i'.
+    Adjacency tests are done with a binary search on the sorted neighbor
+    array, or on a bit matrix if 'use_bitset()' was called.
+    """
+
+    def __init__(self, offsets, neighbors, weights=None):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self.n = len(offsets) - 1
+        self.bits = None
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return Neighbors(self, i)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield Neighbors(self, i)
+
+    def __repr__(self):
+        return "CSRGraph(n=%d, m=%d)" % (self.n, self.nedges())
+
+    def nedges(self):
+        """Number of (undirected) edges in the graph."""
+        return len(self.neighbors) // 2
+
+    def degree(self, i):
+        return int(self.offsets[i+1] - self.offsets[i])
+
+    def degrees(self):
+        """Array with the degree of every node."""
+        return np.diff(self.offsets)
+
+    def edge_weights(self, i):
+        """Weights of the edges adjacent to 'i', aligned with 'adj[i]'."""
+        if self.weights is None:
+            return np.ones(self.degree(i), dtype=np.int64)
+        return self.weights[self.offsets[i]:self.offsets[i+1]]
+
+    def has_edge(self, i, j):
+        """Check whether nodes 'i' and 'j' are adjacent."""
+        if self.bits is not None:
+            return bool(self.bits[i, j >> 3] & (128 >> (j & 7)))
+        lo, hi = self.offsets[i], self.offsets[i+1]
+        k = lo + self.neighbors[lo:hi].searchsorted(j)
+        return k < hi and self.neighbors[k] == j
+
+    def use_bitset(self):
+        """Build a packed n x n adjacency bit matrix for O(1) adjacency tests.
+
+        Takes n*n/8 bytes, so it is only advisable for small or dense graphs.
+        """
+        rows = np.repeat(np.arange(self.n), self.degrees())
+        dense = np.zeros((self.n, self.n), dtype=bool)
+        dense[rows, self.neighbors] = True
+        self.bits = np.packbits(dense, axis=1)
+        return self
+
+    def edges(self):
+        """Arrays (i, j) with the end points of each edge, with i < j."""
+        rows = np.repeat(np.arange(self.n, dtype=self.neighbors.dtype), self.degrees())
+        mask = rows < self.neighbors
+        return rows[mask], self.neighbors[mask]
+
+    def to_adj(self):
+        """Convert to the usual adjacency list (list of sets)."""
+        nbrs = self.neighbors.tolist()
+        offsets = self.offsets.tolist()
+        return [set(nbrs[offsets[i]:offsets[i+1]]) for i in range(self.n)]
+
+    @classmethod
+    def from_edges(cls, n, i, j, w=None):
+        """Make a graph with 'n' nodes from arrays of edge end points 'i', 'j'.
+
+        Each edge may be given in one or both directions; self-loops and
+        repeated edges are dropped.  'w' is an optional array of edge weights.
+        """
+        i = np.asarray(i, dtype=np.int64)
+        j = np.asarray(j, dtype=np.int64)
+        keep = i != j
+        src = np.concatenate((i[keep], j[keep]))
+        dst = np.concatenate((j[keep], i[keep]))
+        key = src*n + dst
+        if w is None:
+            key.sort()
+        else:   # a repeated edge keeps the weight of its first occurrence, in both directions
+            edge = np.arange(len(key)) % np.count_nonzero(keep) if len(key) else key
+            order = np.lexsort((edge, key))
+            key = key[order]
+        first = np.ones(len(key), dtype=bool)     # drop repeated edges
+        np.not_equal(key[1:], key[:-1], out=first[1:])
+        key = key[first]
+        src, dst = key // n, key % n
+        idx = np.int32 if len(key) < 2**31 else np.int64
+        offsets = np.zeros(n+1, dtype=idx)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+        weights = None
+        if w is not None:
+            w = np.asarray(w)
+            weights = np.concatenate((w[keep], w[keep]))[order[first]]
+        return cls(offsets, dst.astype(np.int32), weights)
+
+    @classmethod
+    def from_adj(cls, adj):
+        """Make a graph from an adjacency list (list of sets or of lists)."""
+        n = len(adj)
+        deg = np.fromiter((len(a) for a in adj), dtype=np.int64, count=n)
+        i = np.repeat(np.arange(n), deg)
+        j = np.fromiter((j for a in adj for j in a), dtype=np.int64, count=int(deg.sum()))
+        return cls.from_edges(n, i, j)
+
+    def complement(self):
+        """Make the complementary graph (without self-loops)."""
+        i, j = [], []
+        allnodes = np.arange(self.n)
+        for u in range(self.n):
+            nbrs = self.neighbors[self.offsets[u]:self.offsets[u+1]]
+            v = np.setdiff1d(allnodes[u+1:], nbrs, assume_unique=True)
+            i.append(np.full(len(v), u))
+            j.append(v)
+        if self.n == 0:
+            return CSRGraph.from_edges(0, [], [])
+        return CSRGraph.from_edges(self.n, np.concatenate(i), np.concatenate(j))
+
+
+#
+# binary, memory-mapped cache of graphs read from files
+#
+
+CACHE_SUFFIX = ".csr"   # cache for 'file' is written to 'file.csr'
+CACHE_MAGIC = b"GTCSR001"
+CACHE_HEADER = struct.Struct("<8sQQQQ32s4s4s4s")       # see 'save_cache'
+CACHE_DATA = 128        # offset of the arrays in the cache file
+
+
+def file_digest(filename):
+    """Hash (blake2b, 32 bytes) of the contents of a file."""
+    h = hashlib.blake2b(digest_size=32)
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(CHUNKSIZE), b""):
+            h.update(block)
+    return h.digest()
+
+
+def save_cache(cachename, graph, source):
+    """Write 'graph' (a CSRGraph read from file 'source') into a binary cache.
+
+    The file has a fixed-size header (magic, n, number of arcs, size,
+    modification time and hash of the source file, dtypes of the arrays),
+    followed by the offsets, neighbors and (optionally) weights arrays.
+    It is written to a temporary file and renamed, so that concurrent
+    processes never see a partial cache.
+    """
+    st = os.stat(source)
+    arrays = [np.ascontiguousarray(graph.offsets), np.ascontiguousarray(graph.neighbors)]
+    if graph.weights is not None:
+        arrays.append(np.ascontiguousarray(graph.weights))
+    dtypes = [a.dtype.str.encode() for a in arrays] + [b""]*(3-len(arrays))
+    header = CACHE_HEADER.pack(CACHE_MAGIC, graph.n, len(graph.neighbors),
+                               st.st_size, st.st_mtime_ns, file_digest(source), *dtypes)
+    tmpname = "%s.%d.tmp" % (cachename, os.getpid())
+    with open(tmpname, "wb") as f:
+        f.write(header.ljust(CACHE_DATA, b"\0"))
+        for a in arrays:
+            f.write(a.tobytes())
+    os.replace(tmpname, cachename)
+
+
+def load_cache(cachename, source=None):
+    """Load a graph from a binary cache, with its arrays memory-mapped.
+
+    If 'source' is given, the cache is only used if it matches the current
+    contents of that file (checked by size and modification time or, if
+    these differ, by hash); otherwise None is returned.
+    """
+    try:
+        with open(cachename, "rb") as f:
+            header = f.read(CACHE_HEADER.size)
+    except IOError:
+        return None
+    if len(header) < CACHE_HEADER.size:
+        return None
+    magic, n, nnz, size, mtime, digest, *dtypes = CACHE_HEADER.unpack(header)
+    if magic != CACHE_MAGIC:
+        return None
+    if source is not None:
+        st = os.stat(source)
+        if (st.st_size, st.st_mtime_ns) != (size, mtime):
+            if st.st_size != size or file_digest(source) != digest:
+                return None
+            try:        # same contents (e.g., file was copied): refresh time stamp
+                with open(cachename, "r+b") as f:
+                    f.write(CACHE_HEADER.pack(magic, n, nnz, size, st.st_mtime_ns, digest, *dtypes))
+            except IOError:
+                pass
+
+    arrays = []
+    offset = CACHE_DATA
+    for dt, count in zip(dtypes, (n+1, nnz, nnz)):
+        dt = dt.rstrip(b"\0")
+        if not dt:
+            break
+        dt = np.dtype(dt.decode())
+        arrays.append(np.memmap(cachename, dtype=dt, mode="r", offset=offset, shape=(count,)))
+        offset += dt.itemsize * count
+    return CSRGraph(*arrays)
+
+
+def cached_graph(filename, read):
+    """Read the graph in 'filename' through its binary cache.
+
+    'read(filename)' is called for building a CSRGraph when there is no
+    valid cache, which is then written next to the file (if possible).
+    The returned graph shares its memory-mapped arrays with every other
+    process loading the same cache.
+    """
+    cachename = filename + CACHE_SUFFIX
+    graph = load_cache(cachename, filename)
+    if graph is not None:
+        return graph
+    graph = read(filename)
+    try:
+        save_cache(cachename, graph, filename)
+    except OSError:     # e.g., read-only directory: work without cache
+        return graph
+    return load_cache(cachename)
+
 
 def rnd_graph(n, prob):
     """Make a random graph with 'n' nodes, and edges created between
@@ -32,16 +309,22 @@ def rnd_adj(n, prob):
     return nodes, adj
 
 
-def rnd_adj_fast(n, prob):
+def rnd_adj_fast(n, prob, compact=False):
     """Make a random graph with 'n' nodes, and edges created between
        pairs of nodes with probability 'prob', running in  O(n+m)
        [n is the number of nodes and m is the number of edges].
        Returns a pair, consisting of the list of nodes and the list of edges.
+       If 'compact' is true, adjacency is returned as a CSRGraph.
       """
     nodes = range(n)
-    adj = [set([]) for i in nodes]
+    if compact:
+        ei, ej = [], []
+    else:
+        adj = [set([]) for i in nodes]
 
     if prob == 1:
+        if compact:
+            return nodes, CSRGraph.from_edges(n, [], []).complement()
         return nodes, [[j for j in nodes if j != i] for i in nodes]
 
     i = 1   # the first node index
@@ -56,13 +339,23 @@ def rnd_adj_fast(n, prob):
             i += 1
         if i < n:	# else, graph is ready
             #print( "add edge", (i,j))
-            adj[i].add(j)
-            adj[j].add(i)
+            if compact:
+                ei.append(i)
+                ej.append(j)
+            else:
+                adj[i].add(j)
+                adj[j].add(i)
+    if compact:
+        return nodes, CSRGraph.from_edges(n, ei, ej)
     return nodes, adj
 
 
-def adjacent(nodes, edges):
-    """Determine the adjacent nodes on the graph."""
+def adjacent(nodes, edges, compact=False):
+    """Determine the adjacent nodes on the graph.
+    If 'compact' is true, adjacency is returned as a CSRGraph."""
+    if compact:
+        e = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        return CSRGraph.from_edges(len(nodes), e[:,0], e[:,1])
     adj = [set([]) for i in nodes]
     for (i,j) in edges:
         adj[i].add(j)
@@ -96,119 +389,229 @@ def shuffle(nodes, adj):
 
 
 
-def read_gpp_graph(filename):
-    """Read a file in the format specified by David Johnson for the DIMACS
-    graph partitioning challenge.
-    Instances are available at ftp://dimacs.rutgers.edu/pub/dsj/partition
-    """
+def read_file(filename):
+    """Read the whole contents (bytes) of a file, possibly compressed with gzip."""
     try:
         if len(filename)>3 and filename[-3:] == ".gz":  # file compressed with gzip
             import gzip
             f = gzip.open(filename, "rb")
         else:   # usual, uncompressed file
-            f = open(filename)
+            f = open(filename, "rb")
     except IOError:
         print( "could not open file", filename)
         exit(-1)
+    with f:
+        return f.read()
+
+
+GPP_COORDS = re.compile(rb"^[^(\n]*\(([^,)\n]*),([^)\n]*)\)", re.M)   # '... (x, y)' at line start
+
+
+def read_gpp_data(filename):
+    """Parse a file in David Johnson's graph partitioning format.
 
-    lines = f.readlines()
-    f.close()
-    n = len(lines)
+    Each line holds the coordinates of a node, as '(x, y)', followed by
+    its degree and the (1-based) indices of its neighbors.  The whole file
+    is tokenized at once: coordinates are turned into plain numbers with
+    a regular expression, every token is converted by numpy, and tokens
+    are assigned to nodes from the positions of line breaks.
+
+    Returns the number of nodes, an n x 2 array of coordinates, and the
+    arrays 'src', 'dst' of the adjacency lists (neighbors of node 0 in
+    file order, then those of node 1, etc.; nodes index starting on 0).
+    """
+    data = read_file(filename)
+    data, ncoords = GPP_COORDS.subn(rb"\1 \2", data)
+
+    b = np.frombuffer(data, dtype=np.uint8)
+    blank = b <= 32
+    start = ~blank                      # first character of each token
+    start[1:] &= blank[:-1]
+    line = np.cumsum(b == 10)[start]    # line of each token
+    tokens = np.fromstring(data, dtype=np.float64, sep=" ")
+    if len(tokens) != len(line):
+        raise ValueError("invalid token in graph partitioning file %s" % filename)
+
+    newline = np.ones(len(line), dtype=bool)    # first token of each (non-empty) line
+    np.not_equal(line[1:], line[:-1], out=newline[1:])
+    first = np.flatnonzero(newline)
+    n = len(first)
+    if ncoords != n or (n and np.diff(np.append(first, len(tokens))).min() < 3):
+        raise ValueError("missing coordinates or degree in graph partitioning file %s" % filename)
+
+    pos = tokens[np.add.outer(first, [0, 1])]
+    node = np.cumsum(newline) - 1       # node of each token
+    isnbr = np.arange(len(tokens)) - first[node] >= 3   # skip x, y, degree
+    src = node[isnbr]
+    dst = tokens[isnbr].astype(np.int64) - 1    # -1 for having nodes index starting on 0
+    return n, pos, src, dst
+
+
+def read_gpp_graph(filename, compact=False, cache=False):
+    """Read a file in the format specified by David Johnson for the DIMACS
+    graph partitioning challenge.
+    Instances are available at ftp://dimacs.rutgers.edu/pub/dsj/partition
+    If 'compact' is true, adjacency is returned as a CSRGraph; otherwise,
+    as a list with the list of neighbors of each node (in file order, or
+    in increasing order if the graph is read through the cache).
+    If 'cache' is true, the graph is loaded through a binary cache
+    (see 'cached_graph').
+    """
+    if cache:
+        adj = cached_graph(filename, lambda fn: read_gpp_graph(fn, compact=True)[1])
+        if compact:
+            return range(adj.n), adj
+        nodes = range(adj.n)
+        offsets = adj.offsets.tolist()
+        dst = adj.neighbors.tolist()
+        return nodes, [dst[offsets[i]:offsets[i+1]] for i in nodes]
+
+    n, pos, src, dst = read_gpp_data(filename)
     nodes = range(n)
-    edges = set([])
-    adj = [[] for i in nodes]
-    pos = [None for i in nodes]
 
-    for i in nodes:
-        lparen = lines[i].find("(")
-        rparen = lines[i].find(")")+1
-        x, y = None, None
-        exec("x,y = %s" % lines[i][lparen:rparen])
-        pos[i] = (x,y)
-        paren = lines[i].find(")")+1
-        remain = lines[i][paren:].split()
-        for j_ in remain[1:]:
-            j = int(j_)-1 # -1 for having nodes index starting on 0
-            if j>i:
-                edges.add((i,j))
-            adj[i].append(j)
-    for (i,j) in edges:
-        assert i in adj[j] and j in adj[i]
+    # check symmetry: the sorted lists of arcs (i,j) and (j,i) must coincide
+    if not np.array_equal(np.sort(src*n + dst), np.sort(dst*n + src)):
+        raise ValueError("graph in file %s is not symmetric" % filename)
+
+    if compact:
+        return nodes, CSRGraph.from_edges(n, src, dst)
+    offsets = np.searchsorted(src, np.arange(n+1)).tolist()
+    dst = dst.tolist()
+    adj = [dst[offsets[i]:offsets[i+1]] for i in nodes]
     return nodes, adj
 
 
-def read_gpp_coords(filename):
+def read_gpp_coords(filename, compact=False):
     """Read coordinates for a graph in the format specified by David Johnson
     for the DIMACS graph partitioning challenge.
     Instances are available at ftp://dimacs.rutgers.edu/pub/dsj/partition
+    If 'compact' is true, coordinates are returned as an n x 2 array.
     """
-    try:
-        if len(filename)>3 and filename[-3:] == ".gz":  # file compressed with gzip
-            import gzip
-            f = gzip.open(filename, "rb")
-        else:   # usual, uncompressed file
-            f = open(filename)
-    except IOError:
-        print( "could not open file", filename)
-        exit(-1)
+    coords = GPP_COORDS.findall(read_file(filename))
+    pos = np.fromstring(b" ".join(x + b" " + y for x, y in coords), dtype=np.float64, sep=" ")
+    pos = pos.reshape(-1, 2)
+    if compact:
+        return pos
+    return [tuple(p) for p in pos.tolist()]
 
-    lines = f.readlines()
-    f.close()
-    n = len(lines)
-    nodes = range(n)
-    pos = [None for i in nodes]
-    for i in nodes:
-        lparen = lines[i].find("(")
-        rparen = lines[i].find(")")+1
-        x, y = None, None
-        exec("x,y = %s" % lines[i][lparen:rparen])
-        pos[i] = (x,y)
-    return pos
 
 
+CHUNKSIZE = 1 << 24    # bytes read at a time by the bulk readers
 
-def read_graph(filename):
-    """Read a graph from a file in the format specified by David Johnson
-    for the DIMACS clique challenge.
-    Instances are available at
-    ftp://dimacs.rutgers.edu/pub/challenge/graph/benchmarks/clique
+
+def _parse_dimacs_chunk(chunk, header):
+    """Extract the end points of the edges in 'chunk' (a bytes object with
+    complete lines of a DIMACS file) into a flat array [i1, j1, i2, j2, ...].
+    Information on the 'p' line, if present, is stored in 'header'.
+    """
+    start = 0       # skip leading comment/problem lines, usually the file's header
+    while start < len(chunk) and chunk[start] != ord("e"):
+        end = chunk.find(b"\n", start) + 1
+        if chunk.startswith(b"p", start):
+            p, name, n, m = chunk[start:end].split()
+            header["n"], header["m"] = int(n), int(m)
+        start = end
+    if start:
+        chunk = chunk[start:]
+    nlines = chunk.count(b"\n")
+    nedges = chunk.count(b"\ne") + chunk.startswith(b"e")
+    if nedges < nlines:    # there are other comment or problem lines: filter them
+        lines = chunk.split(b"\n")
+        for line in lines:
+            if line.startswith(b"p"):
+                p, name, n, m = line.split()
+                header["n"], header["m"] = int(n), int(m)
+        chunk = b"\n".join(line for line in lines if line.startswith(b"e"))
+    return np.fromstring(chunk.replace(b"e", b" "), dtype=np.int64, sep=" ")
+
+
+def read_dimacs_edges(filename):
+    """Read the edges of a graph in the DIMACS clique/coloring format.
+
+    The file (possibly compressed with gzip) is read in blocks of
+    CHUNKSIZE bytes, and each block is tokenized in bulk with numpy.
+    Returns the number of nodes and two arrays with the end points
+    of the edges (with nodes index starting on 0).
     """
     try:
         if len(filename)>3 and filename[-3:] == ".gz":  # file compressed with gzip
             import gzip
             f = gzip.open(filename, "rb")
         else:   # usual, uncompressed file
-            f = open(filename)
+            f = open(filename, "rb")
     except IOError:
         print( "could not open file", filename)
         exit(-1)
 
-    for line in f:
-        if line[0] == 'e':
-            e, i, j = line.split()
-            i,j = int(i)-1, int(j)-1 # -1 for having nodes index starting on 0
-            adj[i].add(j)
-            adj[j].add(i)
-        elif line[0] == 'c':
-            continue
-        elif line[0] == 'p':
-            p, name, n, nedges = line.split()
-            # assert name == 'clq'
-            n, nedges = int(n), int(nedges)
-            nodes = range(n)
-            adj = [set([]) for i in nodes]
-    f.close()
-    return nodes, adj
-
-
-
-def read_compl_graph(filename):
+    header = {}
+    parts = []
+    rest = b""
+    with f:
+        while True:
+            data = f.read(CHUNKSIZE)
+            if not data:
+                break
+            data = rest + data
+            cut = data.rfind(b"\n") + 1
+            rest = data[cut:]
+            if cut:
+                parts.append(_parse_dimacs_chunk(data[:cut], header))
+    if rest.strip():
+        parts.append(_parse_dimacs_chunk(rest + b"\n", header))
+
+    if "n" not in header:
+        raise ValueError("no problem line in DIMACS file %s" % filename)
+    e = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    if len(e) % 2:
+        raise ValueError("inconsistent edge lines in DIMACS file %s" % filename)
+    e -= 1      # -1 for having nodes index starting on 0
+    return header["n"], e[0::2], e[1::2]
+
+
+def read_graph(filename, compact=False, cache=False):
+    """Read a graph from a file in the format specified by David Johnson
+    for the DIMACS clique challenge.
+    Instances are available at
+    ftp://dimacs.rutgers.edu/pub/challenge/graph/benchmarks/clique
+    If 'compact' is true, adjacency is returned as a CSRGraph.
+    If 'cache' is true, the graph is loaded through a binary cache
+    (see 'cached_graph').
+    """
+    if cache:
+        adj = cached_graph(filename, lambda fn: CSRGraph.from_edges(*read_dimacs_edges(fn)))
+    else:
+        adj = CSRGraph.from_edges(*read_dimacs_edges(filename))
+    nodes = range(adj.n)
+    if compact:
+        return nodes, adj
+    return nodes, adj.to_adj()
+
+
+def write_graph(filename, nodes, adj, name="edge"):
+    """Write a graph in the DIMACS clique/coloring format."""
+    if isinstance(adj, CSRGraph):
+        i, j = adj.edges()
+    else:
+        i, j = CSRGraph.from_adj(adj).edges()
+    e = np.empty((len(i), 2), dtype=np.int64)
+    e[:,0], e[:,1] = i+1, j+1
+    with open(filename, "w") as f:
+        f.write("p %s %d %d\n" % (name, len(nodes), len(i)))
+        np.savetxt(f, e, fmt="e %d %d")
+
+
+
+def read_compl_graph(filename, compact=False, cache=False):
     """Produce complementary graph with respect to the one define in a file,
     in the format specified by David Johnson for the DIMACS clique challenge.
     Instances are available at
     ftp://dimacs.rutgers.edu/pub/challenge/graph/benchmarks/clique
+    If 'compact' is true, adjacency is returned as a CSRGraph.
     """
-    nodes,adj = read_graph(filename)
+    if compact:
+        nodes,adj = read_graph(filename, compact=True, cache=cache)
+        return nodes, adj.complement()
+    nodes,adj = read_graph(filename, cache=cache)
     nset = set(nodes)
     for i in nodes:
         adj[i] = nset - adj[i] - set([i])
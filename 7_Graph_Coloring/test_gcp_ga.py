@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+import gcp_ga
+from graphtools import rnd_adj_fast
+from gcp_ts import evaluate, rand_color
+from gcp_ga import color_classes, distance, gpx, hea, partition_key
+
+
+def test_partition_key():
+    assert partition_key([2, 2, 0, 1]) == partition_key([0, 0, 1, 2])
+    assert partition_key([2, 2, 0, 1]) != partition_key([0, 0, 1, 1])
+    assert partition_key([0, 1, 0, 1]) != partition_key([0, 1, 1, 0])
+    assert {partition_key([1, 0]), partition_key([0, 1])} == {partition_key([5, 3])}
+
+
+def test_distance():
+    s = np.array([0, 0, 1, 1, 2, 2])
+    assert distance(s, (s + 1) % 3, 3) == 0
+    assert distance(s, np.array([0, 0, 1, 1, 2, 1]), 3) == 1
+
+
+def test_gpx():
+    random.seed(0)
+    n, K = 40, 5
+    c1, c2 = rand_color(range(n), K), rand_color(range(n), K)
+    child = gpx(color_classes(c1, K), color_classes(c2, K), n, K)
+    assert len(child) == n and set(child) <= set(range(K))
+    # the first class of the child is the largest class of the first parent
+    largest = max(range(K), key=c1.count)
+    assert [i for i in range(n) if child[i] == 0] == [i for i in range(n) if c1[i] == largest]
+    # crossing a solution with itself keeps its partition
+    same = gpx(color_classes(c1, K), color_classes(c1, K), n, K)
+    assert partition_key(same) == partition_key(c1)
+
+
+def test_hea(capsys):
+    random.seed(1)
+    nodes, adj = rnd_adj_fast(60, 0.3)
+    best, obj = hea(nodes, adj, 8, 10, 6, 5, 200)
+    assert capsys.readouterr().out == ""
+    assert evaluate(nodes, adj, best) == obj
+
+
+def test_hea_log(capsys, monkeypatch):
+    monkeypatch.setattr(gcp_ga, "LOG", True)
+    random.seed(2)
+    nodes, adj = rnd_adj_fast(40, 0.3)
+    hea(nodes, adj, 4, 3, 4, 5, 50)
+    assert "generation 0" in capsys.readouterr().out
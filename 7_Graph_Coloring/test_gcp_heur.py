@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from graphtools import CSRGraph, rnd_adj_fast
+from gcp_heur import (SaturationQueue, adjacency_bits, dsatur, members, recursive_largest_fit_bits,
+                      seq_assignment, seq_assignment_bits)
+from gcp_ts import evaluate, rsatur
+
+
+def naive_dsatur(nodes, adj):
+    """DSatur recomputing the saturation of every uncolored vertex at each step."""
+    color = [None for i in nodes]
+    for step in nodes:
+        def priority(i):
+            return (len({color[j] for j in adj[i] if color[j] is not None}),
+                    sum(1 for j in adj[i] if color[j] is None), -i)
+        u = max((i for i in nodes if color[i] is None), key=priority)
+        used = {color[j] for j in adj[u]}
+        color[u] = min(k for k in range(len(nodes)) if k not in used)
+    return color, max(color) + 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_dsatur(seed):
+    random.seed(seed)
+    nodes, adj = rnd_adj_fast(60, 0.2)
+    color, K = dsatur(nodes, adj)
+    assert evaluate(nodes, adj, color) == 0 and len(set(color)) == K
+    assert (color, K) == naive_dsatur(nodes, adj)
+
+
+def test_saturation_queue():
+    random.seed(7)
+    nodes, adj = rnd_adj_fast(30, 0.3)
+    Q = SaturationQueue(nodes, adj)
+    color = [None for i in nodes]
+    while Q:
+        i = Q.pop()
+        assert color[i] is None
+        color[i] = random.randrange(4)
+        Q.color(i, color[i])
+        for j in nodes:
+            if color[j] is None:
+                assert Q.colors[j] == sum(1 << k for k in {color[v] for v in adj[j] if color[v] is not None})
+                assert Q.unc[j] == sum(1 for v in adj[j] if color[v] is None)
+    assert None not in color
+
+
+def test_rsatur():
+    random.seed(8)
+    nodes, adj = rnd_adj_fast(60, 0.2)
+    color = rsatur(nodes, adj, 3)
+    assert set(color) <= set(range(3))
+    color = rsatur(nodes, adj, len(nodes))
+    assert evaluate(nodes, adj, color) == 0
+
+
+def test_adjacency_bits():
+    random.seed(9)
+    nodes, adj = rnd_adj_fast(70, 0.1)
+    nbits = adjacency_bits(nodes, adj)
+    assert [set(members(x, len(nodes)).tolist()) for x in nbits] == [set(adj[i]) for i in nodes]
+    assert adjacency_bits(nodes, CSRGraph.from_adj(adj)) == nbits
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitset_heuristics(seed):
+    random.seed(seed)
+    nodes, adj = rnd_adj_fast(70, 0.2)
+    nbits = adjacency_bits(nodes, adj)
+    color, K = seq_assignment_bits(nodes, adj, nbits)
+    assert (color, K) == seq_assignment(nodes, adj)
+
+    # the set-based version scans vertices in set order, so only check
+    # that each class is a maximal stable set of the vertices left for it
+    color, K = recursive_largest_fit_bits(nodes, adj, nbits)
+    assert evaluate(nodes, adj, color) == 0 and len(set(color)) == K
+    for i in nodes:
+        assert all(any(color[j] == k for j in adj[i]) for k in range(color[i]))
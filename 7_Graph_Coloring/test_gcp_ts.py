@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+
+from graphtools import rnd_adj_fast
+from gcp_ts import (Conflicting, calc_bad_degree, chromatic_descent, csr, drop_color, evaluate, move, rand_color,
+                    tabu_search)
+
+
+def test_array_updated_in_place():
+    random.seed(3)
+    nodes, adj = rnd_adj_fast(60, 0.2)
+    color = np.array(rand_color(nodes, 6), dtype=np.int32)
+    seen = []
+    def report(obj, *args):
+        seen.append((obj, evaluate(nodes, adj, color)))
+
+    best, obj = tabu_search(nodes, adj, 6, color, 5, 300, report)
+    assert best is color
+    assert seen and all(a == b for a, b in seen)
+    assert evaluate(nodes, adj, color) == obj == seen[-1][0]
+
+
+def test_list_updated_at_end():
+    random.seed(3)
+    nodes, adj = rnd_adj_fast(60, 0.2)
+    color = rand_color(nodes, 6)
+    best, obj = tabu_search(nodes, adj, 6, color, 5, 300, lambda *args: None)
+    assert type(best) is list and color == best
+    assert all(type(k) is int for k in best)
+    assert evaluate(nodes, adj, best) == obj
+
+
+def brute_bad_degree(nodes, adj, color, K):
+    return [[sum(1 for j in adj[i] if color[j] == k) for k in range(K)] for i in nodes]
+
+
+def test_moves_keep_conflicts():
+    random.seed(4)
+    nodes, adj = rnd_adj_fast(40, 0.25)
+    K = 5
+    g = csr(nodes, adj)
+    color = np.array(rand_color(nodes, K), dtype=np.int32)
+    bad_degree = calc_bad_degree(g, color, K)
+    assert bad_degree.tolist() == brute_bad_degree(nodes, adj, color, K)
+    conflicting = Conflicting(bad_degree, color)
+    tabu = np.full((len(nodes), K), -1, dtype=np.int32)
+    for it in range(200):
+        i = random.choice(nodes)
+        k = random.choice([k for k in range(K) if k != color[i]])
+        move(g, color, bad_degree, conflicting, i, k, it, tabu, 7)
+        assert it < tabu[i].max() <= it + 8
+    assert bad_degree.tolist() == brute_bad_degree(nodes, adj, color, K)
+    expected = {i for i in nodes if any(color[j] == color[i] for j in adj[i])}
+    assert set(conflicting.array().tolist()) == expected and len(conflicting) == len(expected)
+    assert all(conflicting.items[conflicting.pos[i]] == i for i in expected)
+
+
+def test_drop_color():
+    random.seed(5)
+    nodes, adj = rnd_adj_fast(40, 0.2)
+    color = rand_color(nodes, 6)
+    new = drop_color(csr(nodes, adj), color, 6, 2)
+    assert set(new) <= set(range(5))
+    assert all(new[i] == color[i] for i in nodes if color[i] not in (2, 5))
+    assert all(new[i] == 2 for i in nodes if color[i] == 5)
+
+
+def test_chromatic_descent():
+    random.seed(6)
+    nodes, adj = rnd_adj_fast(50, 0.3)
+    found = []
+    best, K, trace = chromatic_descent(nodes, adj, 7, 2000, 1.0, lambda K, *args: found.append(K))
+    assert evaluate(nodes, adj, best) == 0 and len(set(best)) == K == max(best) + 1
+    assert [k for t, k in trace] == found
+    assert found == sorted(found, reverse=True) and found[-1] == K
+    assert len(found) > 1       # improves on DSatur
+    assert all(t <= 1.5 for t, k in trace)
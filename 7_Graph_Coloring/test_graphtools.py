@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pytest
+
+import graphtools
+from graphtools import CSRGraph, read_dimacs_edges, read_gpp_graph, read_graph, write_graph
+
+
+def test_csr_from_edges():
+    g = CSRGraph.from_edges(5, [0, 1, 3, 2, 2], [1, 0, 2, 2, 0])    # repeated edge, self-loop
+    assert g.n == 5 and g.nedges() == 3
+    assert g.to_adj() == [{1, 2}, {0}, {0, 3}, {2}, set()]
+    assert list(g[2]) == [0, 3] and 3 in g[2] and 4 not in g[2]
+    assert g.degrees().tolist() == [2, 1, 2, 1, 0]
+    assert [g.has_edge(0, 1), g.has_edge(1, 2), g.has_edge(4, 0)] == [True, False, False]
+    g.use_bitset()
+    assert [g.has_edge(0, 1), g.has_edge(1, 2), g.has_edge(4, 0)] == [True, False, False]
+    i, j = g.edges()
+    assert sorted(zip(i.tolist(), j.tolist())) == [(0, 1), (0, 2), (2, 3)]
+
+
+def test_csr_repeated_edge_weights():
+    g = CSRGraph.from_edges(3, [0, 1, 2, 1], [1, 0, 1, 2], [5, 7, 3, 9])
+    assert g.edge_weights(0).tolist() == [5]
+    assert g.edge_weights(1).tolist() == [5, 3]
+    assert g.edge_weights(2).tolist() == [3]
+
+
+def test_csr_from_adj_and_complement():
+    adj = [{1, 2}, {0}, {0, 3}, {2}]
+    g = CSRGraph.from_adj(adj)
+    assert g.to_adj() == adj
+    assert g[0] & {2, 3} == {2}
+    assert g.complement().to_adj() == [{3}, {2, 3}, {1}, {0, 1}]
+    assert CSRGraph.from_adj([]).complement().n == 0
+
+
+DIMACS = """\
+c a small graph
+p edge 6 5
+e 1 2
+e 2 3
+c comment between edges
+e 3 4
+e 5 6
+e 1 3"""     # no newline at the end
+
+
+@pytest.mark.parametrize("chunksize", [7, 1 << 24])
+def test_read_dimacs(tmp_path, monkeypatch, chunksize):
+    monkeypatch.setattr(graphtools, "CHUNKSIZE", chunksize)
+    path = tmp_path / "g.col"
+    path.write_text(DIMACS)
+    n, i, j = read_dimacs_edges(str(path))
+    assert n == 6
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1), (1, 2), (2, 3), (4, 5), (0, 2)]
+    nodes, adj = read_graph(str(path))
+    assert adj == [{1, 2}, {0, 2}, {0, 1, 3}, {2}, {5}, {4}]
+
+
+def test_read_dimacs_gzip(tmp_path):
+    import gzip
+    path = str(tmp_path / "g.col.gz")
+    with gzip.open(path, "wt") as f:
+        f.write(DIMACS)
+    nodes, adj = read_graph(path, compact=True)
+    assert isinstance(adj, CSRGraph) and adj.nedges() == 5
+
+
+GPP = """\
+(0.1, 0.2) 2 3 2
+(0.3, 0.4) 2 1 4
+(0.5, 0.6) 2 4 1
+(0.7, 0.8) 2 2 3
+"""
+
+
+@pytest.fixture
+def gpp_file(tmp_path):
+    path = tmp_path / "g.gpp"
+    path.write_text(GPP)
+    return str(path)
+
+
+def test_gpp_cache_round_trip(gpp_file):
+    nodes, adj = read_gpp_graph(gpp_file)
+    assert adj == [[2, 1], [0, 3], [3, 0], [1, 2]]     # file order
+
+    for compact in (False, True):
+        n1, first = read_gpp_graph(gpp_file, compact=compact, cache=True)    # writes the cache
+        assert os.path.exists(gpp_file + graphtools.CACHE_SUFFIX)
+        n2, second = read_gpp_graph(gpp_file, compact=compact, cache=True)   # reads it
+        assert list(n1) == list(n2) == list(nodes)
+        if compact:
+            assert isinstance(second, CSRGraph)
+            assert [sorted(a) for a in adj] == [list(second[i]) for i in nodes]
+        else:
+            assert first == second == [sorted(a) for a in adj]
+            assert all(type(a) is list for a in second)
+
+
+def test_cache_invalidated_on_change(gpp_file):
+    read_gpp_graph(gpp_file, cache=True)
+    with open(gpp_file, "a") as f:
+        f.write("(0.9, 1.0) 0\n(1.1, 1.2) 0\n")
+    nodes, adj = read_gpp_graph(gpp_file, cache=True)
+    assert len(nodes) == 6 and adj[5] == []
+
+
+def test_dimacs_cache_round_trip(tmp_path):
+    path = str(tmp_path / "g.col")
+    nodes, adj = range(5), [{1, 2}, {0}, {0, 3}, {2}, set()]
+    write_graph(path, nodes, adj)
+    for cache in (False, True, True):
+        n, g = read_graph(path, cache=cache)
+        assert list(n) == list(nodes) and g == adj
+
+
+def test_dimacs_file_closed_on_error(tmp_path, monkeypatch):
+    path = tmp_path / "bad.col"
+    path.write_text("p edge 3\ne 1 2\n")      # malformed problem line
+    files = []
+    def tracking_open(*args, **kwargs):
+        f = open(*args, **kwargs)
+        files.append(f)
+        return f
+    monkeypatch.setattr(graphtools, "open", tracking_open, raising=False)
+    with pytest.raises(ValueError):
+        read_dimacs_edges(str(path))
+    assert files and all(f.closed for f in files)
+
+
+def test_read_gpp_coords(gpp_file):
+    assert graphtools.read_gpp_coords(gpp_file) == [(0.1, 0.2), (0.3, 0.4), (0.5, 0.6), (0.7, 0.8)]
+    pos = graphtools.read_gpp_coords(gpp_file, compact=True)
+    assert pos.shape == (4, 2) and pos[3, 1] == 0.8
+
+
+def test_read_gpp_graph_formats(tmp_path):
+    path = tmp_path / "g.gpp"
+    path.write_text("( 1.5 , -2 ) 1 2\n(3e-1,4)  1  1\n")
+    nodes, adj = read_gpp_graph(str(path))
+    assert adj == [[1], [0]]
+    assert graphtools.read_gpp_coords(str(path)) == [(1.5, -2.0), (0.3, 4.0)]
+    nodes, g = read_gpp_graph(str(path), compact=True)
+    assert g.to_adj() == [{1}, {0}]
+
+
+@pytest.mark.parametrize("text", [
+    "(0, 0) 1 2\n(0, 1) 0\n",       # asymmetric
+    "(0, 0) 1 2\n1 1\n",            # missing coordinates
+])
+def test_read_gpp_graph_errors(tmp_path, text):
+    path = tmp_path / "bad.gpp"
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        read_gpp_graph(str(path))
@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+
+def _rnd_graph(n, prob, seed):
+    """Random graph with 'n' nodes, and edges between pairs of nodes with
+    probability 'prob'; returns the list of nodes and their adjacency sets."""
+    rng = random.Random(seed)
+    adj = [set() for i in range(n)]
+    for i in range(n):
+        for j in range(i+1, n):
+            if rng.random() < prob:
+                adj[i].add(j)
+                adj[j].add(i)
+    return list(range(n)), adj
+
+
+@pytest.fixture
+def rnd_graph():
+    """Factory of reproducible random graphs, 'rnd_graph(n, prob, seed)'."""
+    return _rnd_graph
@@ -0,0 +1,6 @@
+"""
+opt100: code shared by the chapters of the book.
+
+  - multistart: parallel multi-start runner and shared elite pool for the local searches
+  - journal: undo log for keeping the best solution of a local search
+"""
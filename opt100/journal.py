@@ -0,0 +1,59 @@
+"""
+journal.py: undo log for keeping the best solution of a local search.
+
+Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
+"""
+import copy
+from collections.abc import MutableSet
+
+
+class Journal:
+    """Undo log, for keeping the best solution found without copying it.
+
+    'mark()' declares the current solution 'sol' (changed in place by the
+    search) the best one; changes to 'sol' after that are recorded with
+    'record(i, old)', 'old' being the previous value of 'sol[i]'.
+    'best()' rebuilds the best solution by undoing them on a copy of 'sol'.
+    If more than 'cap' changes (default: len(sol)) are recorded, the best
+    solution is rebuilt and saved, and recording stops until the next
+    mark; thus, the cost per change is O(1) amortized.
+
+    'sol' may be a list or a numpy array, indexed by node, or a set of
+    nodes; for sets, 'old' tells whether node 'i' was in the set, and
+    'cap' should be given (e.g., the number of nodes).  'best', if given,
+    is the best solution, saved.
+    """
+
+    def __init__(self, sol, best=None, cap=None):
+        self.sol = sol
+        self.cap = len(sol) if cap is None else cap
+        self.log = None         # changes since the best solution, or None if it is in 'saved'
+        self.saved = best
+
+    def mark(self):
+        self.log = []
+        self.saved = None
+
+    def record(self, i, old):
+        log = self.log
+        if log is not None:
+            log.append((i, old))
+            if len(log) > self.cap:
+                self.saved = self.best()
+                self.log = None
+
+    def best(self):
+        """Copy of the best solution (None, if there was no mark)."""
+        if self.log is None:
+            return None if self.saved is None else copy.copy(self.saved)
+        best = copy.copy(self.sol)
+        if isinstance(best, MutableSet):
+            for i, old in reversed(self.log):
+                if old:
+                    best.add(i)
+                else:
+                    best.discard(i)
+        else:
+            for i, old in reversed(self.log):
+                best[i] = old
+        return best
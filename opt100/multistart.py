@@ -0,0 +1,312 @@
+"""
+multistart.py: parallel multi-start runner for the local searches.
+
+Independent runs of a search, each with its own random seed, are executed
+on a pool of processes.  The instance data (graph, or flow/distance
+matrices) is installed once in each worker, and with the 'fork' start
+method it is shared read-only with the parent process instead of being
+copied for every run.
+
+The search to run is given by a function 'solver(*shared, report=...)',
+returning a pair (solution, objective), and calling 'report(obj, ...)'
+whenever it finds a new best solution -- as all the searches in this
+repository do.  For example, for graph partitioning:
+
+    from functools import partial
+    from opt100.multistart import multistart
+    from gpp_ts import construct, tabu_search
+
+    def gpp_run(nodes, adj, max_iter, tabulen, report=None):
+        sol = construct(nodes)
+        report.sol = sol        # optional: see below
+        return tabu_search(nodes, adj, sol, max_iter, tabulen, report)
+
+    solver = partial(gpp_run, max_iter=10000, tabulen=10)
+    sol, cost, stats = multistart(solver, (nodes, adj), nruns=32, time_limit=60)
+
+Functions defined in a notebook can be used as solvers with 'fork'
+(the default here, where available).
+
+Runs are stopped early (when the target objective or the time limit is
+reached) cooperatively: 'report' raises 'StopRun' when it is called after
+the run should stop, and solvers may also check 'report.stopped()', or
+pass 'report.deadline' (the wall-clock limit, as time.time(), or None) to
+searches taking one, such as gcp_ts.tabu_search or the Deadline schedule
+of gpp_sa.  Runs not returning within GRACE seconds of being stopped are
+killed, with the whole pool of processes.  The solution of a stopped run
+is only known if the solver sets 'report.sol' to the solution object that
+the search updates in place (as gpp_ts, gcp_ts, and the clique tabu search
+do): a copy of it is kept on each call to 'report'.
+
+Cooperative runs share an 'ElitePool' (passed in 'shared'), where each
+run publishes its best solutions and from which it restarts; see
+'ts_intens_divers' in gpp_ts_intdiv and in the clique tabu search.
+The pool must not be used after runs were killed, as they may have been
+holding its lock.
+
+Copyright (c) by Joao Pedro PEDROSO and Mikio KUBO, 2007
+"""
+import copy
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import numpy as np
+
+LOG = False     # whether or not to print information on each finished run
+GRACE = 1.0     # time (seconds) given to stopped runs for returning, before being killed
+
+
+class StopRun(Exception):
+    """Raised in a worker, from 'report', for stopping the current run."""
+
+
+# worker state, set by '_init'
+_shared = None          # instance data, passed to every run
+_stop = None            # shared flag (lock-free), set when all runs should stop
+_events = None          # queue for sending (run, time, obj) to the parent (obj None: start)
+_deadline = None        # wall-clock time limit (time.time()), or None
+
+
+class ElitePool:
+    """Pool of elite solutions shared by processes, in shared memory.
+
+    Keeps up to 'size' distinct solutions, each a vector of 'n' integers
+    (e.g., the partition of each node, or the indicator vector of a
+    clique), with their objectives.  It must be created before the worker
+    processes, and passed to them (e.g., in the 'shared' tuple of
+    'multistart'); all operations are protected by a lock.
+    """
+
+    def __init__(self, n, size=10, minimize=True, mp_context=None):
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+        self.n, self.size, self.minimize = n, size, minimize
+        self.lock = mp_context.Lock()
+        self.count = mp_context.RawValue("i", 0)
+        self.objs = mp_context.RawArray("d", size)
+        self.sols = mp_context.RawArray("i", size*n)
+
+    def _arrays(self):
+        objs = np.frombuffer(self.objs, dtype=np.float64)
+        sols = np.frombuffer(self.sols, dtype=np.int32).reshape(self.size, self.n)
+        return objs[:self.count.value], sols[:self.count.value]
+
+    def _better(self, a, b):
+        return a < b if self.minimize else a > b
+
+    def publish(self, obj, sol):
+        """Insert solution 'sol' with objective 'obj', if it is not in the
+        pool and the pool is not full of better solutions.
+        Returns True if the solution was inserted."""
+        sol = np.asarray(sol, dtype=np.int32)
+        with self.lock:
+            objs, sols = self._arrays()
+            if (sols == sol).all(axis=1).any():
+                return False
+            k = len(objs)
+            if k == self.size:
+                k = int(objs.argmax() if self.minimize else objs.argmin())  # worst element
+                if not self._better(obj, objs[k]):
+                    return False
+            else:
+                self.count.value += 1
+            objs, sols = self._arrays()
+            objs[k], sols[k] = obj, sol
+            return True
+
+    def best(self):
+        """Best solution in the pool, as a pair (obj, sol), or None if empty."""
+        with self.lock:
+            objs, sols = self._arrays()
+            if len(objs) == 0:
+                return None
+            k = int(objs.argmin() if self.minimize else objs.argmax())
+            return objs[k].item(), sols[k].tolist()
+
+    def fetch(self):
+        """Random solution from the pool, as a pair (obj, sol), or None if empty."""
+        with self.lock:
+            objs, sols = self._arrays()
+            if len(objs) == 0:
+                return None
+            k = random.randrange(len(objs))
+            return objs[k].item(), sols[k].tolist()
+
+    def __len__(self):
+        return self.count.value
+
+
+def _init(shared, stop, events, deadline):
+    global _shared, _stop, _events, _deadline
+    _shared, _stop, _events, _deadline = shared, stop, events, deadline
+
+
+def reached(obj, target, minimize):
+    """Check whether objective 'obj' is at least as good as 'target'."""
+    return target is not None and obj is not None and \
+        (obj <= target if minimize else obj >= target)
+
+
+def _must_stop():
+    return _stop.value or (_deadline is not None and time.time() >= _deadline)
+
+
+def _run(solver, run, seed, target, minimize):
+    """Execute run number 'run' in a worker; returns its statistics."""
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    start = time.time()
+    stats = {"run": run, "seed": seed, "pid": os.getpid(), "obj": None, "sol": None,
+             "status": "done", "trace": []}
+    if _must_stop():
+        stats["status"] = "cancelled"
+        stats["time"] = 0.0
+        return stats
+    _events.put((run, start, None))
+
+    snapshot = [None]
+    def report(obj, *args):
+        now = time.time()
+        stats["trace"].append((now - start, obj))
+        if report.sol is not None:
+            snapshot[0] = copy.copy(report.sol)
+        _events.put((run, now, obj))
+        if reached(obj, target, minimize):
+            _stop.value = 1     # others should stop
+            raise StopRun
+        if _must_stop():
+            raise StopRun
+    report.sol = None
+    report.deadline = _deadline
+    report.stopped = _must_stop
+
+    try:
+        stats["sol"], stats["obj"] = solver(*_shared, report=report)
+    except StopRun:
+        stats["status"] = "stopped"
+        if stats["trace"]:
+            stats["obj"] = stats["trace"][-1][1]
+            stats["sol"] = snapshot[0]
+    stats["time"] = time.time() - start
+    return stats
+
+
+def multistart(solver, shared, nruns, workers=None, seed=0, target=None, time_limit=None,
+               minimize=True, mp_context=None):
+    """Execute 'nruns' independent runs of 'solver' on a process pool.
+
+    Parameters:
+     * solver - function called as 'solver(*shared, report=report)', returning (sol, obj)
+     * shared - tuple with the instance data, installed once in each worker
+     * nruns - number of runs; run r uses seed 'seed + r'
+     * workers - number of processes (default: all the cores)
+     * target - stop all runs as soon as one reaches this objective
+     * time_limit - wall-clock limit, in seconds, for the whole set of runs
+     * minimize - whether the objective is to be minimized or maximized
+     * mp_context - multiprocessing context (default: 'fork', where available)
+
+    When the target or time limit is reached, runs not yet started are
+    cancelled, and runs in progress are stopped (see module documentation);
+    if some run does not return within GRACE seconds, the pool is killed.
+    The objective, time line and elapsed time of killed runs are kept,
+    but not their solution.
+
+    Returns the best solution, its objective, and a list with statistics
+    for each run: dictionaries with keys 'run', 'seed', 'pid', 'status'
+    ('done', 'stopped', 'cancelled', or 'killed'), 'sol', 'obj', 'time'
+    and 'trace', a list of pairs (elapsed time, objective) of the
+    improvements found.
+    """
+    if mp_context is None:
+        methods = multiprocessing.get_all_start_methods()
+        mp_context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    deadline = None if time_limit is None else time.time() + time_limit
+
+    stop = mp_context.RawValue("b", 0)     # no lock: a killed worker cannot leave it held
+    events = mp_context.Queue()
+    results = queue.Queue()     # filled by the pool's result thread
+    pool = mp_context.Pool(workers, initializer=_init, initargs=(shared, stop, events, deadline))
+    for r in range(nruns):
+        pool.apply_async(_run, (solver, r, seed + r, target, minimize),
+                         callback=results.put, error_callback=results.put)
+    stats = [None] * nruns
+    starts = [None] * nruns                # start time of each run, and
+    traces = [[] for r in range(nruns)]    # its improvements, as received through 'events'
+
+    def drain():
+        while True:
+            try:
+                r, t, obj = events.get_nowait()
+            except queue.Empty:
+                return
+            if obj is None:
+                starts[r] = t
+            else:
+                traces[r].append((t - starts[r], obj))
+
+    def collect(timeout):
+        """Wait up to 'timeout' seconds (None: no limit) for a run to return."""
+        try:
+            s = results.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        if isinstance(s, BaseException):
+            raise s
+        stats[s["run"]] = s
+        if LOG:
+            print("run %d (seed %d): %s, obj = %s" % (s["run"], s["seed"], s["status"], s["obj"]))
+        if reached(s["obj"], target, minimize):
+            stop.value = 1
+        return True
+
+    pending = nruns
+    killed = False
+    try:
+        while pending and not stop.value:
+            if deadline is None:
+                timeout = None
+            else:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+            if collect(timeout):
+                pending -= 1
+            drain()
+        stop.value = 1      # runs in progress stop, those not yet started return at once
+        limit = time.time() + GRACE
+        while pending and collect(max(0, limit - time.time())):
+            pending -= 1
+    finally:
+        stop.value = 1
+        if pending:
+            pool.terminate()
+            killed = True
+        else:
+            pool.close()
+        pool.join()
+    end = time.time()
+    drain()
+    while killed and not results.empty():      # returned while the pool was being killed
+        collect(0)
+
+    for r in range(nruns):
+        if stats[r] is not None:
+            continue
+        status = "cancelled" if starts[r] is None else "killed"
+        obj = traces[r][-1][1] if traces[r] else None
+        elapsed = 0.0 if starts[r] is None else end - starts[r]
+        stats[r] = {"run": r, "seed": seed + r, "pid": None, "obj": obj, "sol": None,
+                    "status": status, "time": elapsed, "trace": traces[r]}
+
+    best_sol, best_obj = None, None
+    for s in stats:
+        if s["sol"] is None:
+            continue
+        if best_obj is None or (s["obj"] < best_obj if minimize else s["obj"] > best_obj):
+            best_sol, best_obj = s["sol"], s["obj"]
+    return best_sol, best_obj, stats
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from opt100.journal import Journal
+
+
+def walk(sol, journal, steps, rng, change):
+    for t in range(steps):
+        i = rng.randrange(len(sol)) if not isinstance(sol, set) else rng.randrange(20)
+        journal.record(i, change(sol, i))
+
+
+def set_value(sol, i):
+    old = sol[i]
+    sol[i] = 1 - old
+    return old
+
+
+def toggle(sol, i):
+    old = i in sol
+    if old:
+        sol.discard(i)
+    else:
+        sol.add(i)
+    return old
+
+
+@pytest.mark.parametrize("make", [list, lambda x: np.array(x, dtype=np.int32)])
+@pytest.mark.parametrize("steps", [0, 5, 50])
+def test_sequence(make, steps):
+    rng = random.Random(steps)
+    sol = make([rng.randint(0, 1) for i in range(20)])
+    journal = Journal(sol)
+    assert journal.best() is None
+    walk(sol, journal, 7, rng, set_value)
+    journal.mark()
+    best = list(sol)
+    walk(sol, journal, steps, rng, set_value)
+    rebuilt = journal.best()
+    assert type(rebuilt) is type(sol) and rebuilt is not sol
+    assert list(rebuilt) == best
+    assert (journal.log is None) == (steps > len(sol))
+
+
+@pytest.mark.parametrize("steps", [3, 40])
+def test_set(steps):
+    rng = random.Random(steps)
+    sol = {1, 5, 7}
+    journal = Journal(sol, cap=20)
+    journal.mark()
+    walk(sol, journal, steps, rng, toggle)
+    assert journal.best() == {1, 5, 7}
+
+
+def test_saved_best():
+    sol = [0, 1, 1, 0]
+    journal = Journal(sol, [1, 1, 0, 0])
+    best = journal.best()
+    assert best == [1, 1, 0, 0] and best is not journal.saved
@@ -0,0 +1,100 @@
+import random
+import time
+from functools import partial
+
+import pytest
+
+from opt100 import multistart as ms
+from opt100.multistart import ElitePool, multistart
+
+
+def descent(n, steps=50, report=None):
+    """Toy search: minimize the number of ones in a random 0/1 vector."""
+    sol = [random.randint(0, 1) for i in range(n)]
+    report.sol = sol
+    for step in range(steps):
+        ones = [i for i in range(n) if sol[i]]
+        if not ones:
+            break
+        sol[random.choice(ones)] = 0
+        report(sum(sol))
+    return list(sol), sum(sol)
+
+
+def endless(n, report=None, cooperative=True):
+    sol = [1] * n
+    report.sol = sol
+    report(n)
+    while not cooperative or not report.stopped():
+        time.sleep(0.001)
+    return list(sol), n
+
+
+def failing(n, report=None):
+    raise ValueError("bad instance")
+
+
+def test_elite_pool():
+    pool = ElitePool(3, size=2)
+    assert pool.best() is None and pool.fetch() is None
+    assert pool.publish(5, [1, 0, 1])
+    assert not pool.publish(5, [1, 0, 1])      # duplicate
+    assert pool.publish(3, [0, 0, 1])
+    assert not pool.publish(7, [1, 1, 1])      # full of better solutions
+    assert pool.publish(4, [0, 1, 0])          # replaces the worst
+    assert len(pool) == 2
+    assert pool.best() == (3.0, [0, 0, 1])
+    assert pool.fetch()[1] in ([0, 0, 1], [0, 1, 0])
+
+
+def test_elite_pool_maximize():
+    pool = ElitePool(2, size=1, minimize=False)
+    pool.publish(1, [1, 0])
+    pool.publish(2, [1, 1])
+    assert pool.best() == (2.0, [1, 1])
+
+
+def test_all_runs_done():
+    sol, obj, stats = multistart(partial(descent, 20, steps=100), (), nruns=4, workers=2)
+    assert obj == 0 and sol == [0] * 20
+    assert [s["status"] for s in stats] == ["done"] * 4
+    assert [s["seed"] for s in stats] == [0, 1, 2, 3]
+    assert all(s["trace"][-1][1] == 0 for s in stats)
+
+
+def test_target_stops_runs():
+    sol, obj, stats = multistart(partial(descent, 20, steps=100), (), nruns=4, workers=1, target=15)
+    assert obj <= 15 and sum(sol) == obj
+    assert stats[0]["status"] == "stopped"
+    assert [s["status"] for s in stats[1:]] == ["cancelled"] * 3
+
+
+def test_time_limit_cooperative():
+    start = time.time()
+    sol, obj, stats = multistart(partial(endless, 10), (), nruns=3, workers=2, time_limit=0.3)
+    assert time.time() - start < 0.3 + ms.GRACE
+    assert obj == 10 and sol == [1] * 10
+    assert {s["status"] for s in stats} <= {"done", "cancelled"}
+    assert stats[0]["status"] == "done"
+
+
+def test_time_limit_kills_stuck_runs(monkeypatch):
+    monkeypatch.setattr(ms, "GRACE", 0.2)
+    start = time.time()
+    sol, obj, stats = multistart(partial(endless, 10, cooperative=False), (), nruns=2, workers=1,
+                                 time_limit=0.2)
+    assert time.time() - start < 2
+    assert sol is None
+    assert stats[0]["status"] == "killed" and stats[0]["obj"] == 10
+    assert stats[1]["status"] == "cancelled"
+    assert 0.2 <= stats[0]["time"] < 2 and stats[1]["time"] == 0.0
+
+
+def test_every_run_has_time():
+    sol, obj, stats = multistart(partial(descent, 20, steps=100), (), nruns=4, workers=1, target=15)
+    assert all(s["time"] >= 0 for s in stats)
+
+
+def test_error_is_raised():
+    with pytest.raises(ValueError):
+        multistart(partial(failing, 3), (), nruns=2, workers=1)